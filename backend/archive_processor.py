@@ -0,0 +1,314 @@
+"""
+压缩包批量脱敏
+逐个读取 ZIP 条目，分发到 FileProcessor 的解析执行器并行解析和脱敏，
+脱敏结果连同逐文件的实体清单（manifest.json）以 ZIP 流式输出，
+整个过程不需要把压缩包解压到磁盘
+
+命令行用法（在 backend 目录下）:
+    python archive_processor.py 证据材料.zip -o 脱敏结果.zip --rules PHONE,IDCARD
+"""
+
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import os
+import posixpath
+import time
+import zipfile
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple
+
+from file_processor import FileProcessor
+from json_response import dumps
+from rule_anonymizer import get_anonymizer
+from upload_storage import MAX_UPLOAD_BYTES
+
+
+# 按扩展名识别的条目类型，与上传接口支持的类型一致
+ENTRY_TYPES = {
+    ".pdf": "application/pdf",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".doc": "application/msword",
+}
+
+# 单个压缩包最多处理的条目数
+MAX_ARCHIVE_ENTRIES = int(os.getenv("MAX_ARCHIVE_ENTRIES", "2000"))
+
+# 单个条目解压后的最大字节数
+MAX_ENTRY_BYTES = MAX_UPLOAD_BYTES
+
+# 同时在处理中（已读入内存、结果尚未写出）的条目解压后的总字节数上限
+MAX_INFLIGHT_BYTES = int(os.getenv("MAX_ARCHIVE_INFLIGHT_BYTES", 512 * 1024 * 1024))
+
+MANIFEST_NAME = "manifest.json"
+
+
+class _StreamBuffer(io.RawIOBase):
+    """只写缓冲区，zipfile 写入的数据在每个条目完成后取出并发送"""
+    
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def list_entries(archive_path: str) -> List[zipfile.ZipInfo]:
+    """
+    列出压缩包中的文件条目
+    
+    Args:
+        archive_path: ZIP 文件路径
+    
+    Returns:
+        List[ZipInfo]: 文件条目（不含目录）
+    
+    Raises:
+        ValueError: 不是有效的 ZIP 文件或条目数超出上限
+    """
+    if not zipfile.is_zipfile(archive_path):
+        raise ValueError("不是有效的 ZIP 文件")
+    
+    with zipfile.ZipFile(archive_path) as archive:
+        entries = [info for info in archive.infolist() if not info.is_dir()]
+    
+    if len(entries) > MAX_ARCHIVE_ENTRIES:
+        raise ValueError(f"压缩包条目过多（{len(entries)}），最多支持 {MAX_ARCHIVE_ENTRIES} 个")
+    return entries
+
+
+def output_name(entry_name: str) -> str:
+    """条目对应的脱敏结果文件名，去掉绝对路径和上级目录引用"""
+    name = posixpath.normpath(entry_name.replace("\\", "/")).lstrip("/")
+    if name.startswith(".."):
+        name = posixpath.basename(name)
+    root, _ = posixpath.splitext(name)
+    return f"{root}_脱敏结果.txt"
+
+
+def _entry_type(info: zipfile.ZipInfo) -> Tuple[Optional[str], Optional[str]]:
+    """条目的 (文件类型, 跳过原因)，需要跳过时文件类型为 None"""
+    content_type = ENTRY_TYPES.get(posixpath.splitext(info.filename)[1].lower())
+    if content_type is None:
+        return None, "不支持的文件类型"
+    if info.file_size > MAX_ENTRY_BYTES:
+        return None, f"文件过大，最大支持 {MAX_ENTRY_BYTES // (1024 * 1024)} MB"
+    return content_type, None
+
+
+def _entry_cost(info: zipfile.ZipInfo) -> int:
+    """处理条目时读入内存的字节数，跳过的条目不读取"""
+    content_type, _ = _entry_type(info)
+    return info.file_size if content_type is not None else 0
+
+
+async def _process_entry(archive: zipfile.ZipFile, info: zipfile.ZipInfo,
+                         file_processor: FileProcessor, config: Dict[str, Any]) -> tuple:
+    """解析并脱敏单个条目，返回 (清单记录, 脱敏文本)"""
+    record = {
+        "name": info.filename,
+        "size": info.file_size,
+    }
+    
+    content_type, skip_reason = _entry_type(info)
+    if content_type is None:
+        record.update({"status": "skipped", "error": skip_reason})
+        return record, None
+    
+    loop = asyncio.get_event_loop()
+    try:
+        data = await loop.run_in_executor(file_processor.executor, archive.read, info)
+        content_hash = hashlib.sha256(data).hexdigest()
+        record["sha256"] = content_hash
+        
+        extracted = await file_processor.extract_bytes(data, content_type, content_hash=content_hash)
+        del data
+        
+        anonymizer = get_anonymizer(config.get("enabled_rules"))
+        masked_text, entities = await loop.run_in_executor(
+            file_processor.executor,
+            anonymizer.anonymize_compact,
+            extracted["content"],
+            config.get("mask_char", "●"),
+            config.get("keep_prefix", 2),
+            config.get("keep_suffix", 2)
+        )
+    except Exception as e:
+        record.update({"status": "failed", "error": str(e)})
+        return record, None
+    
+    record.update({
+        "status": "completed",
+        "text_length": len(extracted["content"]),
+        "entity_count": len(entities),
+        "entity_statistics": entities.counts(),
+        "entities": entities.to_offsets(),
+        "metadata": extracted.get("metadata", {}),
+    })
+    return record, masked_text
+
+
+async def anonymize_archive(archive_path: str, file_processor: FileProcessor,
+                            config: Optional[Dict[str, Any]] = None,
+                            concurrency: Optional[int] = None,
+                            entries: Optional[List[zipfile.ZipInfo]] = None,
+                            max_inflight_bytes: int = MAX_INFLIGHT_BYTES) -> AsyncIterator[bytes]:
+    """
+    流式脱敏压缩包
+    
+    按压缩包顺序输出，同时最多 concurrency 个条目在解析中，且这些条目解压后的总大小
+    不超过 max_inflight_bytes（单个更大的条目独自处理），内存占用与条目总数无关。
+    输出 ZIP 中每个成功处理的条目对应一个脱敏文本文件，末尾为 manifest.json，
+    记录每个条目的状态、SHA-256 和实体位置（[start, end, type]，相对脱敏文本）。
+    
+    Args:
+        archive_path: 输入 ZIP 文件路径
+        file_processor: 文件处理器
+        config: 脱敏配置（enabled_rules / mask_char / keep_prefix / keep_suffix）
+        concurrency: 同时处理的条目数，默认为解析进程数的两倍
+        entries: 已通过 list_entries 读取的条目，省略时自动读取
+        max_inflight_bytes: 处理中条目解压后的总字节数上限
+    
+    Yields:
+        bytes: 输出 ZIP 的数据块
+    """
+    config = config or {}
+    concurrency = concurrency or file_processor.max_workers * 2
+    if entries is None:
+        entries = list_entries(archive_path)
+    
+    started = time.perf_counter()
+    records = []
+    buffer = _StreamBuffer()
+    loop = asyncio.get_event_loop()
+    
+    with zipfile.ZipFile(archive_path) as archive, \
+            zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as output:
+        pending = deque()
+        waiting = deque(entries)
+        used_names = set()
+        inflight_bytes = 0
+        
+        def schedule():
+            nonlocal inflight_bytes
+            while waiting and len(pending) < concurrency:
+                cost = _entry_cost(waiting[0])
+                if pending and inflight_bytes + cost > max_inflight_bytes:
+                    return
+                inflight_bytes += cost
+                pending.append((cost, asyncio.ensure_future(
+                    _process_entry(archive, waiting.popleft(), file_processor, config)
+                )))
+        
+        try:
+            schedule()
+            while pending:
+                cost, future = pending.popleft()
+                record, masked_text = await future
+                records.append(record)
+                if masked_text is not None:
+                    # 不同扩展名的同名文件输出名相同，追加序号区分
+                    name = output_name(record["name"])
+                    root, ext = posixpath.splitext(name)
+                    suffix = 2
+                    while name in used_names:
+                        name = f"{root}_{suffix}{ext}"
+                        suffix += 1
+                    used_names.add(name)
+                    record["output"] = name
+                    
+                    await loop.run_in_executor(
+                        file_processor.executor, output.writestr,
+                        record["output"], masked_text.encode("utf-8")
+                    )
+                    del masked_text
+                # 结果写出后才释放额度，在此之前它仍占用内存
+                inflight_bytes -= cost
+                schedule()
+                if "output" in record:
+                    yield buffer.drain()
+        finally:
+            for _, future in pending:
+                future.cancel()
+        
+        entity_stats = {}
+        for record in records:
+            for entity_type, count in record.get("entity_statistics", {}).items():
+                entity_stats[entity_type] = entity_stats.get(entity_type, 0) + count
+        
+        manifest = {
+            "archive": os.path.basename(archive_path),
+            "generated_at": datetime.now().isoformat(),
+            "config": config,
+            "summary": {
+                "files": len(records),
+                "completed": sum(1 for record in records if record["status"] == "completed"),
+                "failed": sum(1 for record in records if record["status"] == "failed"),
+                "skipped": sum(1 for record in records if record["status"] == "skipped"),
+                "entities": sum(record.get("entity_count", 0) for record in records),
+                "entity_statistics": entity_stats,
+                "elapsed_seconds": round(time.perf_counter() - started, 3),
+            },
+            "files": records,
+        }
+        output.writestr(MANIFEST_NAME, dumps(manifest))
+    
+    yield buffer.drain()
+
+
+async def _run_cli(args: argparse.Namespace):
+    config = {
+        "enabled_rules": args.rules.split(",") if args.rules else None,
+        "mask_char": args.mask_char,
+        "keep_prefix": args.keep_prefix,
+        "keep_suffix": args.keep_suffix,
+    }
+    file_processor = FileProcessor(max_workers=args.workers)
+    try:
+        with open(args.output, "wb") as f:
+            async for chunk in anonymize_archive(args.archive, file_processor, config):
+                f.write(chunk)
+    finally:
+        file_processor.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="压缩包批量脱敏")
+    parser.add_argument("archive", help="输入 ZIP 文件")
+    parser.add_argument("-o", "--output", required=True, help="输出 ZIP 文件")
+    parser.add_argument("--rules", help="启用的规则，逗号分隔，默认全部")
+    parser.add_argument("--mask-char", default="●")
+    parser.add_argument("--keep-prefix", type=int, default=2)
+    parser.add_argument("--keep-suffix", type=int, default=2)
+    parser.add_argument("--workers", type=int, help="解析进程数，默认为CPU核数")
+    args = parser.parse_args()
+    
+    started = time.perf_counter()
+    asyncio.run(_run_cli(args))
+    
+    with zipfile.ZipFile(args.output) as result:
+        summary = json.loads(result.read(MANIFEST_NAME))["summary"]
+    print(f"处理 {summary['files']} 个文件：成功 {summary['completed']}，"
+          f"失败 {summary['failed']}，跳过 {summary['skipped']}，"
+          f"发现 {summary['entities']} 个敏感实体，耗时 {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""
+目录批量脱敏命令行工具
+遍历目录中的 PDF 和 Word 文档，使用进程池并行解析脱敏并写出脱敏文本，
+不依赖 HTTP 服务。输出目录中的清单文件记录每个文件的内容摘要，
+再次运行时跳过自上次以来未变化的文件，并删除源文件已不存在的脱敏结果
+
+用法（在 backend 目录下）:
+    python batch_anonymize.py /data/archive -o /data/archive_masked --workers 8
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from archive_processor import ENTRY_TYPES, output_name
+from file_processor import FileProcessor, default_worker_count
+from rule_anonymizer import get_anonymizer
+
+
+MANIFEST_NAME = ".anonymize_manifest.json"
+
+# 每完成多少个文件保存一次清单，中途中断时已完成的文件下次不必重做
+MANIFEST_SAVE_INTERVAL = 100
+
+
+def config_digest(config: Dict[str, Any]) -> str:
+    """脱敏配置的摘要，配置变化时所有文件都需要重新处理"""
+    normalized = dict(config)
+    if normalized.get("enabled_rules"):
+        normalized["enabled_rules"] = sorted(normalized["enabled_rules"])
+    return hashlib.sha256(
+        json.dumps(normalized, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()[:16]
+
+
+def load_manifest(path: str) -> Dict[str, Any]:
+    """读取清单，不存在或损坏时返回空清单"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"files": {}}
+
+
+def save_manifest(path: str, manifest: Dict[str, Any]):
+    """先写临时文件再替换，避免中断时留下半个清单"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def scan_directory(input_dir: str) -> List[str]:
+    """按路径排序列出目录下支持的文档（相对路径，使用 / 分隔）"""
+    files = []
+    for root, dirs, names in os.walk(input_dir):
+        dirs.sort()
+        for name in sorted(names):
+            if os.path.splitext(name)[1].lower() in ENTRY_TYPES:
+                path = os.path.join(root, name)
+                files.append(os.path.relpath(path, input_dir).replace(os.sep, "/"))
+    return files
+
+
+def assign_outputs(files: List[str]) -> Dict[str, str]:
+    """为每个文件分配脱敏结果路径，同名不同扩展名的文件追加序号区分"""
+    outputs = {}
+    used = set()
+    for rel_path in files:
+        name = output_name(rel_path)
+        root, ext = os.path.splitext(name)
+        suffix = 2
+        while name in used:
+            name = f"{root}_{suffix}{ext}"
+            suffix += 1
+        used.add(name)
+        outputs[rel_path] = name
+    return outputs
+
+
+def prune_outputs(output_dir: str, stale: List[str]) -> int:
+    """
+    删除不再对应任何源文件的脱敏结果，以及因此变空的子目录
+    
+    Args:
+        output_dir: 输出目录
+        stale: 上次清单中记录、本次不再使用的输出路径（相对输出目录）
+    
+    Returns:
+        int: 删除的文件数
+    """
+    root = os.path.abspath(output_dir)
+    removed = 0
+    for name in stale:
+        path = os.path.abspath(os.path.join(root, name))
+        if path.startswith(root + os.sep):
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                continue  # 已被删除或无法删除
+            parent = os.path.dirname(path)
+            while parent != root:
+                try:
+                    os.rmdir(parent)
+                except OSError:
+                    break  # 目录非空
+                parent = os.path.dirname(parent)
+    return removed
+
+
+def process_file(source_path: str, output_path: str, config: Dict[str, Any],
+                 known_hash: Optional[str] = None) -> Dict[str, Any]:
+    """
+    解析并脱敏单个文件，在工作进程中执行
+    
+    Args:
+        source_path: 源文件路径
+        output_path: 脱敏文本输出路径
+        config: 脱敏配置
+        known_hash: 上次处理时的内容摘要，与当前内容一致时跳过处理
+    
+    Returns:
+        Dict: 处理记录，status 为 completed / unchanged / failed
+    """
+    started = time.perf_counter()
+    try:
+        with open(source_path, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        return {"status": "failed", "error": str(e)}
+    
+    content_hash = hashlib.sha256(data).hexdigest()
+    record = {"sha256": content_hash, "size": len(data)}
+    if content_hash == known_hash and os.path.exists(output_path):
+        record["status"] = "unchanged"
+        return record
+    
+    content_type = ENTRY_TYPES[os.path.splitext(source_path)[1].lower()]
+    try:
+        extracted = FileProcessor._extract_bytes_sync(data, content_type)
+        del data
+        
+        anonymizer = get_anonymizer(config.get("enabled_rules"))
+        masked_text, entities = anonymizer.anonymize_compact(
+            extracted["content"],
+            config.get("mask_char", "●"),
+            config.get("keep_prefix", 2),
+            config.get("keep_suffix", 2)
+        )
+        
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(masked_text)
+    except Exception as e:
+        record.update({"status": "failed", "error": str(e)})
+        return record
+    
+    record.update({
+        "status": "completed",
+        "text_length": len(extracted["content"]),
+        "entity_count": len(entities),
+        "entity_statistics": entities.counts(),
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+    })
+    return record
+
+
+def run(input_dir: str, output_dir: str, config: Dict[str, Any],
+        workers: Optional[int] = None, force: bool = False,
+        verbose: bool = False) -> Dict[str, Any]:
+    """
+    批量处理目录
+    
+    Args:
+        input_dir: 输入目录
+        output_dir: 输出目录
+        config: 脱敏配置
+        workers: 进程数，默认为CPU核数
+        force: 忽略清单，全部重新处理
+        verbose: 逐个输出文件处理结果
+    
+    Returns:
+        Dict: 本次运行的统计信息
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    digest = config_digest(config)
+    
+    previous = load_manifest(manifest_path)
+    # 上次写出的所有结果，不论配置是否变化；本次不再使用的在结束时删除
+    previous_outputs = {
+        entry["output"] for entry in previous.get("files", {}).values() if entry.get("output")
+    }
+    if force or previous.get("config_digest") != digest:
+        previous = {"files": {}}
+    known = previous.get("files", {})
+    
+    files = scan_directory(input_dir)
+    outputs = assign_outputs(files)
+    manifest = {"config": config, "config_digest": digest, "files": {}}
+    
+    stats = {"total": len(files), "completed": 0, "unchanged": 0, "failed": 0,
+             "removed": 0, "bytes": 0, "entities": 0}
+    pending = []
+    for rel_path in files:
+        source_path = os.path.join(input_dir, rel_path)
+        entry = known.get(rel_path)
+        stat = os.stat(source_path)
+        
+        # 大小和修改时间都未变化时不必重新计算摘要
+        if (entry and entry.get("status") == "completed"
+                and entry.get("output") == outputs[rel_path]
+                and entry.get("size") == stat.st_size
+                and entry.get("mtime_ns") == stat.st_mtime_ns
+                and os.path.exists(os.path.join(output_dir, outputs[rel_path]))):
+            manifest["files"][rel_path] = entry
+            stats["unchanged"] += 1
+            continue
+        
+        # 修改时间变化但内容可能相同，交给工作进程比对摘要
+        known_hash = None
+        if entry and entry.get("status") == "completed" and entry.get("output") == outputs[rel_path]:
+            known_hash = entry.get("sha256")
+        pending.append((rel_path, stat.st_mtime_ns, entry, known_hash))
+    
+    started = time.perf_counter()
+    workers = workers or default_worker_count()
+    with ProcessPoolExecutor(max_workers=workers,
+                             mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = {}
+        for rel_path, mtime_ns, entry, known_hash in pending:
+            future = executor.submit(
+                process_file,
+                os.path.join(input_dir, rel_path),
+                os.path.join(output_dir, outputs[rel_path]),
+                config,
+                known_hash
+            )
+            futures[future] = (rel_path, mtime_ns, entry)
+        
+        for done, future in enumerate(as_completed(futures), 1):
+            rel_path, mtime_ns, entry = futures[future]
+            record = future.result()
+            status = record["status"]
+            
+            if status == "unchanged":
+                # 内容未变，只刷新修改时间
+                record = {**entry, "mtime_ns": mtime_ns}
+                stats["unchanged"] += 1
+            else:
+                record.update({"output": outputs[rel_path], "mtime_ns": mtime_ns,
+                               "processed_at": datetime.now().isoformat()})
+                stats[status] += 1
+                if status == "completed":
+                    stats["bytes"] += record["size"]
+                    stats["entities"] += record["entity_count"]
+            
+            manifest["files"][rel_path] = record
+            if verbose:
+                print(f"[{done}/{len(pending)}] {status:<9} {rel_path}"
+                      + (f" ({record['error']})" if record.get("error") else ""))
+            if done % MANIFEST_SAVE_INTERVAL == 0:
+                save_manifest(manifest_path, {**manifest, "files": {**known, **manifest["files"]}})
+    
+    # 源文件已删除或改名，其结果不再列入清单，也不留在输出目录中
+    stats["removed"] = prune_outputs(output_dir, sorted(previous_outputs - set(outputs.values())))
+    
+    elapsed = time.perf_counter() - started
+    stats.update({
+        "workers": workers,
+        "elapsed_seconds": round(elapsed, 3),
+        "documents_per_second": round(stats["completed"] / elapsed, 2) if elapsed > 0 else 0.0,
+        "mb_per_second": round(stats["bytes"] / (1024 * 1024) / elapsed, 2) if elapsed > 0 else 0.0,
+    })
+    manifest["last_run"] = {"finished_at": datetime.now().isoformat(), **stats}
+    save_manifest(manifest_path, manifest)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="目录批量脱敏")
+    parser.add_argument("input_dir", help="输入目录")
+    parser.add_argument("-o", "--output-dir", required=True, help="输出目录")
+    parser.add_argument("--rules", help="启用的规则，逗号分隔，默认全部")
+    parser.add_argument("--mask-char", default="●")
+    parser.add_argument("--keep-prefix", type=int, default=2)
+    parser.add_argument("--keep-suffix", type=int, default=2)
+    parser.add_argument("--workers", type=int, help="进程数，默认为CPU核数")
+    parser.add_argument("--force", action="store_true", help="忽略清单，全部重新处理")
+    parser.add_argument("-v", "--verbose", action="store_true", help="逐个输出文件处理结果")
+    args = parser.parse_args()
+    
+    if not os.path.isdir(args.input_dir):
+        parser.error(f"输入目录不存在: {args.input_dir}")
+    
+    config = {
+        "enabled_rules": args.rules.split(",") if args.rules else None,
+        "mask_char": args.mask_char,
+        "keep_prefix": args.keep_prefix,
+        "keep_suffix": args.keep_suffix,
+    }
+    stats = run(args.input_dir, args.output_dir, config,
+                workers=args.workers, force=args.force, verbose=args.verbose)
+    
+    print(f"共 {stats['total']} 个文件：处理 {stats['completed']}，未变化跳过 {stats['unchanged']}，"
+          f"失败 {stats['failed']}，删除过期结果 {stats['removed']}，发现 {stats['entities']} 个敏感实体")
+    print(f"耗时 {stats['elapsed_seconds']:.2f}s（{stats['workers']} 进程），"
+          f"{stats['documents_per_second']} 文档/s，{stats['mb_per_second']} MB/s")
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+实体表示基准测试
+对比字典列表与紧凑实体集合（EntityList）在识别、计数、遮罩上的耗时和内存占用
+
+用法（在 backend 目录下）:
+    python benchmarks/bench_entity_list.py --entities 10000 50000 --repeat 3
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rule_anonymizer import get_anonymizer, apply_masks
+
+
+FILLER = "本院认为，被告人的行为已构成犯罪，依法应予惩处。"
+SAMPLES = [
+    "13800138000",
+    "(2023)京01民初123号",
+    "110101199003078765",
+    "zhang.san@example.com",
+]
+
+
+def build_document(entity_count: int) -> str:
+    """生成包含 entity_count 个敏感实体的合成文本"""
+    return "".join(
+        FILLER + "：" + SAMPLES[i % len(SAMPLES)] + "，" for i in range(entity_count)
+    )
+
+
+def run_dicts(anonymizer, text: str):
+    """原流程：字典列表 + 逐个统计 + apply_masks"""
+    entities = anonymizer.extract_entities(text)
+    stats = {}
+    for entity in entities:
+        stats[entity["type"]] = stats.get(entity["type"], 0) + 1
+    masked = apply_masks(text, entities, "●")
+    return entities, stats, masked
+
+
+def run_compact(anonymizer, text: str):
+    """紧凑流程：EntityList 上直接计数和遮罩"""
+    entities = anonymizer.find_entities(text)
+    return entities, entities.counts(), entities.mask_text("●")
+
+
+def measure(func, anonymizer, text: str, repeat: int):
+    """返回最优耗时和结果保留的内存峰值（字节）"""
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func(anonymizer, text)
+        best = min(best, time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    result = func(anonymizer, text)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return best, current
+
+
+def main():
+    parser = argparse.ArgumentParser(description="实体表示基准测试")
+    parser.add_argument("--entities", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    anonymizer = get_anonymizer()
+
+    print(f"{'实体数':>8} {'字典(s)':>10} {'紧凑(s)':>10} {'字典内存(KB)':>14} {'紧凑内存(KB)':>14}")
+    for count in args.entities:
+        text = build_document(count)
+
+        dict_result = run_dicts(anonymizer, text)
+        compact_result = run_compact(anonymizer, text)
+        assert compact_result[0].to_dicts() == dict_result[0]
+        assert compact_result[1] == dict_result[1]
+        assert compact_result[2] == dict_result[2]
+
+        dict_time, dict_mem = measure(run_dicts, anonymizer, text, args.repeat)
+        compact_time, compact_mem = measure(run_compact, anonymizer, text, args.repeat)
+        print(f"{count:>8} {dict_time:>10.4f} {compact_time:>10.4f} "
+              f"{dict_mem // 1024:>14} {compact_mem // 1024:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+实体提取基准测试
+对比组合匹配器（单次扫描）与逐条规则 finditer 的耗时
+
+用法（在 backend 目录下）:
+    python benchmarks/bench_extract_entities.py --sizes 1 5 20 --repeat 3
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rule_anonymizer import RuleAnonymizer
+
+
+FILLER = "本院认为，被告人的行为已构成犯罪，依法应予惩处。"
+SAMPLES = [
+    "110101199003078765",
+    "13800138000",
+    "zhang.san@example.com",
+    "6222 0212 3456 7890",
+    "(2023)京01民初123号",
+    "13800138000@qq.com",
+    "6222021234567890123",
+]
+
+
+def build_document(size_mb: float, seed: int = 42) -> str:
+    """生成指定大小（按字符数近似）的合成判决书文本"""
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    parts = []
+    length = 0
+    while length < target:
+        chunk = FILLER * rng.randint(1, 5) + "：" + rng.choice(SAMPLES) + "，"
+        parts.append(chunk)
+        length += len(chunk)
+    return "".join(parts)
+
+
+def extract_per_rule(anonymizer: RuleAnonymizer, text: str) -> list:
+    """逐条规则扫描全文提取实体（组合匹配器之前的做法，作为对比基线）"""
+    entities = []
+    for rule_type in anonymizer.enabled_rules:
+        if rule_type not in anonymizer.patterns:
+            continue
+        for match in anonymizer.patterns[rule_type].finditer(text):
+            entities.append({
+                "start": match.start(),
+                "end": match.end(),
+                "type": rule_type,
+                "original": match.group()
+            })
+    entities.sort(key=lambda entity: entity["start"])
+    return entities
+
+
+def best_of(func, text: str, repeat: int) -> float:
+    """多次运行取最短耗时"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="实体提取基准测试")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 5, 20], help="文档大小（MB）")
+    parser.add_argument("--repeat", type=int, default=3, help="每组重复次数")
+    args = parser.parse_args()
+
+    anonymizer = RuleAnonymizer()
+    print(f"{'大小(MB)':>8} {'实体数':>8} {'逐条规则(s)':>12} {'组合匹配(s)':>12} {'加速比':>8}")
+
+    for size in args.sizes:
+        text = build_document(size)
+        expected = extract_per_rule(anonymizer, text)
+        actual = anonymizer.extract_entities(text)
+        if actual != expected:
+            raise SystemExit(f"{size}MB 文档的组合匹配结果与逐条规则不一致")
+
+        per_rule = best_of(lambda text: extract_per_rule(anonymizer, text), text, args.repeat)
+        combined = best_of(anonymizer.extract_entities, text, args.repeat)
+        print(f"{size:>8g} {len(actual):>8} {per_rule:>12.3f} {combined:>12.3f} {per_rule / combined:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+响应序列化基准测试
+对比标准库 json 与 orjson 序列化大文档脱敏结果的耗时
+
+用法（在 backend 目录下）:
+    python benchmarks/bench_json_response.py --entities 10000 50000 --repeat 5
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json_response
+from rule_anonymizer import get_anonymizer
+
+
+FILLER = "本院认为，被告人的行为已构成犯罪，依法应予惩处。"
+SAMPLES = [
+    "13800138000",
+    "(2023)京01民初123号",
+    "110101199003078765",
+    "zhang.san@example.com",
+]
+
+
+def build_response(entity_count: int) -> dict:
+    """构造与 /api/upload 结构一致的大文档响应"""
+    text = "".join(
+        FILLER + "：" + SAMPLES[i % len(SAMPLES)] + "，" for i in range(entity_count)
+    )
+    anonymized_text, entities = get_anonymizer().anonymize_text(text, mask_char="●")
+
+    entity_stats = {}
+    for entity in entities:
+        entity_stats[entity["type"]] = entity_stats.get(entity["type"], 0) + 1
+
+    return {
+        "file_id": "bench",
+        "filename": "bench.pdf",
+        "original_content": text,
+        "anonymized_content": anonymized_text,
+        "sensitive_entities": entities,
+        "entity_statistics": entity_stats,
+        "processing_info": {
+            "original_length": len(text),
+            "anonymized_length": len(anonymized_text),
+            "entities_found": len(entities),
+        },
+    }
+
+
+def measure(func, content, repeat: int):
+    """返回最优耗时和输出字节数"""
+    best = float("inf")
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = len(func(content))
+        best = min(best, time.perf_counter() - start)
+    return best, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="响应序列化基准测试")
+    parser.add_argument("--entities", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if json_response.orjson is None:
+        print("未安装 orjson，仅测试标准库")
+
+    print(f"{'实体数':>8} {'字节数':>12} {'stdlib(s)':>10} {'orjson(s)':>10} {'加速比':>8}")
+    for count in args.entities:
+        content = build_response(count)
+        stdlib_time, size = measure(json_response.stdlib_dumps, content, args.repeat)
+
+        if json_response.orjson is None:
+            print(f"{count:>8} {size:>12} {stdlib_time:>10.4f} {'-':>10} {'-':>8}")
+            continue
+
+        orjson_time, _ = measure(json_response.dumps, content, args.repeat)
+        assert json_response.orjson.loads(json_response.dumps(content)) == content
+        print(f"{count:>8} {size:>12} {stdlib_time:>10.4f} {orjson_time:>10.4f} "
+              f"{stdlib_time / orjson_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+服务启动基准测试
+在全新子进程中测量导入 main_langchain 的耗时，以及启动后首个健康检查、
+文档处理和对话请求的延迟（首次对话会触发 LangChain 的延迟加载）
+
+用法（在 backend 目录下）:
+    python benchmarks/bench_startup.py --repeat 5
+    python benchmarks/bench_startup.py --root /path/to/other/backend   # 对比其他版本
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+PARAGRAPH = "原告张三（身份证号110101199003078765，电话13800138000）诉被告一案，案号(2023)京01民初123号。"
+
+
+def build_docx(path: str, paragraphs: int = 200):
+    """生成测试用的 Word 文档"""
+    from docx import Document
+    doc = Document()
+    for _ in range(paragraphs):
+        doc.add_paragraph(PARAGRAPH)
+    doc.save(path)
+
+
+def child(root: str, docx_path: str):
+    """子进程：导入应用并依次发送首个请求，以 JSON 输出各阶段耗时"""
+    sys.path.insert(0, root)
+    timings = {}
+
+    start = time.perf_counter()
+    import main_langchain
+    timings["import"] = time.perf_counter() - start
+
+    from fastapi.testclient import TestClient
+    with TestClient(main_langchain.app) as client:
+        start = time.perf_counter()
+        client.get("/api/health").raise_for_status()
+        timings["first_health"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with open(docx_path, "rb") as f:
+            client.post(
+                "/api/upload-and-process",
+                files={"file": ("bench.docx", f, DOCX_TYPE)}
+            ).raise_for_status()
+        timings["first_process"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        client.post("/api/chat", json={"message": "你好"}).raise_for_status()
+        timings["first_chat"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        client.post("/api/chat", json={"message": "你好"}).raise_for_status()
+        timings["second_chat"] = time.perf_counter() - start
+
+    print(json.dumps(timings))
+
+
+def run_once(root: str, docx_path: str) -> dict:
+    """在全新解释器中运行一次，工作目录为临时目录，避免写入上传和导出文件"""
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ, JOB_DB_PATH=os.path.join(workdir, "jobs.db"))
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", "--root", root, "--docx", docx_path],
+            cwd=workdir, env=env, capture_output=True, text=True, check=True
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="服务启动基准测试")
+    parser.add_argument("--root", default=BACKEND_DIR, help="被测 backend 目录")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--docx", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    root = os.path.abspath(args.root)
+    if args.child:
+        child(root, args.docx)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        docx_path = os.path.join(tmp, "bench.docx")
+        build_docx(docx_path)
+        runs = [run_once(root, docx_path) for _ in range(args.repeat)]
+
+    print(f"被测目录: {root}（{args.repeat} 次，取中位数）")
+    for key, label in (("import", "导入 main_langchain"),
+                       ("first_health", "首个 /api/health"),
+                       ("first_process", "首个 /api/upload-and-process"),
+                       ("first_chat", "首个 /api/chat"),
+                       ("second_chat", "第二个 /api/chat")):
+        values = [run[key] for run in runs]
+        print(f"{label:<30} {statistics.median(values) * 1000:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""
+脱敏流水线基准测试套件
+使用合成文书测量实体识别、遮罩、PDF/Word 解析（含各 PDF 提取引擎的速度和实体召回率）和端到端 API 延迟，
+结果以 JSON 输出，并可与保存的基线对比，耗时超出阈值时以非零状态退出
+
+用法（在 backend 目录下）:
+    python benchmarks/run_benchmarks.py                                  # 运行并与 baseline.json 对比
+    python benchmarks/run_benchmarks.py --only extract,mask --size 2000000
+    python benchmarks/run_benchmarks.py -o results.json --save-baseline  # 更新基线
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from file_processor import FileProcessor, PDF_ENGINES
+from rule_anonymizer import get_anonymizer
+from synthetic import generate_text, parse_mix, write_docx, write_pdf
+
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+def measure(func, repeat: int, warmup: int = 1) -> dict:
+    """运行 warmup 次预热后计时 repeat 次，返回耗时统计（秒）"""
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "repeat": repeat,
+    }
+
+
+def bench_extract(ctx: dict) -> dict:
+    anonymizer = get_anonymizer()
+    text = ctx["text"]
+    found = anonymizer.find_entities(text).counts()
+    result = measure(lambda: anonymizer.find_entities(text), ctx["repeat"])
+    result.update({
+        "chars": len(text),
+        "chars_per_second": len(text) / result["median"],
+        "entities": sum(found.values()),
+        # 合成文书中的实体应全部被识别
+        "recall_ok": found == {k: v for k, v in ctx["expected"].items() if v},
+    })
+    return result
+
+
+def bench_mask(ctx: dict) -> dict:
+    entities = get_anonymizer().find_entities(ctx["text"])
+    result = measure(lambda: entities.mask_text("●", 2, 2), ctx["repeat"])
+    result.update({"entities": len(entities), "entities_per_second": len(entities) / result["median"]})
+    return result
+
+
+def bench_anonymize(ctx: dict) -> dict:
+    anonymizer = get_anonymizer()
+    text = ctx["text"]
+    result = measure(lambda: anonymizer.anonymize_compact(text, "●", 2, 2), ctx["repeat"])
+    result.update({"chars": len(text), "chars_per_second": len(text) / result["median"]})
+    return result
+
+
+def bench_parse_docx(ctx: dict) -> dict:
+    path = ctx["docx_path"]
+    result = measure(lambda: FileProcessor._extract_word_sync(path), ctx["repeat"])
+    result.update({"bytes": os.path.getsize(path), "bytes_per_second": os.path.getsize(path) / result["median"]})
+    return result
+
+
+def bench_parse_pdf(ctx: dict) -> dict:
+    path = ctx.get("pdf_path")
+    if path is None:
+        return {"skipped": "未安装 reportlab，无法生成 PDF"}
+    pages = FileProcessor._read_pdf_metadata(path)["pages"]
+    result = measure(lambda: FileProcessor._extract_pdf_sync(path), ctx["repeat"])
+    result.update({"pages": pages, "pages_per_second": pages / result["median"]})
+    return result
+
+
+def bench_pdf_engines(ctx: dict) -> dict:
+    """
+    各 PDF 提取引擎在同一文档上的解析耗时和实体召回率
+
+    召回率按类型计：识别数（不超过合成时写入的实体数）之和 / 写入的实体数。
+    PDF 按固定宽度折行，跨行的实体任何引擎都无法识别，召回率用于引擎间对比
+    """
+    path = ctx.get("pdf_path")
+    if path is None:
+        return {"skipped": "未安装 reportlab，无法生成 PDF"}
+    pages = FileProcessor._read_pdf_metadata(path)["pages"]
+    expected = ctx["doc_expected"]
+    anonymizer = get_anonymizer()
+
+    results = {}
+    for engine in PDF_ENGINES:
+        try:
+            text = FileProcessor._extract_pdf_sync(path, engine)["content"]
+        except ValueError as e:
+            # pypdf 为可选依赖
+            results[engine] = {"skipped": str(e)}
+            continue
+        found = anonymizer.find_entities(text).counts()
+        result = measure(lambda: FileProcessor._extract_pdf_sync(path, engine), ctx["repeat"])
+        result.update({
+            "pages": pages,
+            "pages_per_second": pages / result["median"],
+            "chars": len(text),
+            "entities": sum(found.values()),
+            "recall": sum(min(found.get(k, 0), v) for k, v in expected.items()) / max(sum(expected.values()), 1),
+        })
+        results[engine] = result
+    return results
+
+
+def bench_api(ctx: dict) -> dict:
+    """端到端 API 延迟：/api/anonymize（文本）和 /api/upload（Word 文档）"""
+    from fastapi.testclient import TestClient
+
+    # 重复上传同一文件会命中解析结果缓存，测量端到端延迟时关闭缓存
+    os.environ["EXTRACTION_CACHE_MEMORY_BYTES"] = "0"
+    os.environ.pop("EXTRACTION_CACHE_DIR", None)
+
+    # 应用会在工作目录下创建上传目录，切换到临时目录避免写入仓库
+    cwd = os.getcwd()
+    os.chdir(ctx["workdir"])
+    try:
+        import main
+        with TestClient(main.app) as client:
+            text = ctx["text"][:ctx["api_chars"]]
+
+            def anonymize():
+                client.post("/api/anonymize", json={
+                    "text": text, "include_original": False, "entity_format": "offsets"
+                }).raise_for_status()
+
+            def upload():
+                with open(ctx["docx_path"], "rb") as f:
+                    client.post(
+                        "/api/upload?include_original=false&entity_format=offsets",
+                        files={"file": ("bench.docx", f, DOCX_TYPE)}
+                    ).raise_for_status()
+
+            return {
+                "anonymize_text": {**measure(anonymize, ctx["repeat"]), "chars": len(text)},
+                "upload_docx": measure(upload, ctx["repeat"]),
+            }
+    finally:
+        os.chdir(cwd)
+
+
+BENCHMARKS = {
+    "extract": bench_extract,
+    "mask": bench_mask,
+    "anonymize": bench_anonymize,
+    "parse_docx": bench_parse_docx,
+    "parse_pdf": bench_parse_pdf,
+    "pdf_engines": bench_pdf_engines,
+    "api": bench_api,
+}
+
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    """取出所有含 median 的测量项，键为 a.b 形式的路径"""
+    items = {}
+    for name, value in results.items():
+        if not isinstance(value, dict):
+            continue
+        if "median" in value:
+            items[prefix + name] = value["median"]
+        else:
+            items.update(flatten(value, f"{prefix}{name}."))
+    return items
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    与基线对比中位耗时
+
+    Returns:
+        list: [(测量项, 基线耗时, 当前耗时, 变化比例, 是否退化)]
+    """
+    current = flatten(results)
+    previous = flatten(baseline.get("results", {}))
+    rows = []
+    for name, value in current.items():
+        if name not in previous:
+            continue
+        change = value / previous[name] - 1
+        rows.append((name, previous[name], value, change, change > threshold))
+    return rows
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="脱敏流水线基准测试套件")
+    parser.add_argument("--size", type=int, default=1_000_000, help="合成文本长度（字符数）")
+    parser.add_argument("--density", type=float, default=5.0, help="每千字符的敏感实体数")
+    parser.add_argument("--mix", help="实体类型比例，如 PHONE=3,IDCARD=1，默认等比例")
+    parser.add_argument("--doc-size", type=int, default=50_000, help="解析和上传测试的文档长度（字符数）")
+    parser.add_argument("--api-chars", type=int, default=100_000, help="/api/anonymize 测试的文本长度")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", help=f"只运行指定测试，逗号分隔：{','.join(BENCHMARKS)}")
+    parser.add_argument("-o", "--output", help="结果 JSON 输出路径")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="基线 JSON 路径")
+    parser.add_argument("--save-baseline", action="store_true", help="将本次结果保存为基线")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="中位耗时超出基线该比例视为退化，默认 0.15")
+    args = parser.parse_args()
+
+    selected = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in selected if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"未知的测试: {', '.join(unknown)}")
+
+    mix = parse_mix(args.mix)
+    text, expected = generate_text(args.size, args.density, mix, args.seed)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        ctx = {
+            "text": text,
+            "expected": expected,
+            "repeat": args.repeat,
+            "api_chars": args.api_chars,
+            "workdir": workdir,
+        }
+        if {"parse_docx", "parse_pdf", "pdf_engines", "api"} & set(selected):
+            doc_text, ctx["doc_expected"] = generate_text(args.doc_size, args.density, mix, args.seed)
+            ctx["docx_path"] = os.path.join(workdir, "bench.docx")
+            write_docx(doc_text, ctx["docx_path"])
+            try:
+                ctx["pdf_path"] = os.path.join(workdir, "bench.pdf")
+                write_pdf(doc_text, ctx["pdf_path"])
+            except ImportError:
+                ctx["pdf_path"] = None
+
+        results = {}
+        for name in selected:
+            print(f"运行 {name} ...", file=sys.stderr)
+            results[name] = BENCHMARKS[name](ctx)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "params": {
+                "size": args.size,
+                "density": args.density,
+                "mix": mix,
+                "doc_size": args.doc_size,
+                "api_chars": args.api_chars,
+                "repeat": args.repeat,
+                "seed": args.seed,
+            },
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"{'测量项':<28} {'中位耗时(ms)':>14}")
+    for name, value in flatten(results).items():
+        print(f"{name:<28} {value * 1000:>14.2f}")
+
+    exit_code = 0
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"已保存基线: {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("params") != report["meta"]["params"]:
+            print("注意：基线的测试参数与本次不同，对比结果仅供参考")
+        print(f"\n与基线对比（{baseline['meta'].get('commit') or '未知版本'}，阈值 {args.threshold:.0%}）")
+        print(f"{'测量项':<28} {'基线(ms)':>10} {'当前(ms)':>10} {'变化':>8}")
+        for name, before, after, change, regressed in compare(results, baseline, args.threshold):
+            print(f"{name:<28} {before * 1000:>10.2f} {after * 1000:>10.2f} {change:>+8.1%}"
+                  + ("  退化" if regressed else ""))
+            if regressed:
+                exit_code = 1
+
+    if results.get("extract", {}).get("recall_ok") is False:
+        print("错误：实体识别结果与合成文书中的实体数不一致")
+        exit_code = 1
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
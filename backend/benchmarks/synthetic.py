@@ -0,0 +1,193 @@
+"""
+合成法律文书生成器
+按指定长度、实体密度和实体类型比例生成判决书风格的文本，并可写出为 Word / PDF 文档，
+供基准测试使用。生成结果由随机种子决定，同一参数每次生成的文本相同
+
+用法（在 backend 目录下）:
+    python benchmarks/synthetic.py --size 200000 --density 8 --mix PHONE=3,IDCARD=1 -o sample.docx
+"""
+
+import argparse
+import os
+import random
+from typing import Dict, Optional, Tuple
+
+
+ENTITY_TYPES = ("IDCARD", "PHONE", "EMAIL", "BANKCARD", "CASE_NUMBER")
+
+SENTENCES = [
+    "本院认为，被告人的行为已构成犯罪，依法应予惩处。",
+    "经审理查明，双方于合同签订后未按约定履行付款义务。",
+    "上述事实，有当事人陈述、书证及庭审笔录等证据在案佐证。",
+    "原告的诉讼请求具有事实和法律依据，本院予以支持。",
+    "被告经本院合法传唤，无正当理由拒不到庭参加诉讼。",
+    "依照《中华人民共和国民事诉讼法》的相关规定，判决如下：",
+]
+
+LABELS = {
+    "IDCARD": ("身份证号码", "公民身份号码"),
+    "PHONE": ("联系电话", "手机号码"),
+    "EMAIL": ("电子邮箱", "送达邮箱"),
+    "BANKCARD": ("银行账号", "收款账户"),
+    "CASE_NUMBER": ("案号", "原审案号"),
+}
+
+REGIONS = ("110101", "310104", "440305", "330106", "510107")
+COURTS = ("京01", "沪0101", "粤03", "浙0106", "川01")
+CASE_TYPES = ("民初", "民终", "刑初", "执", "行初")
+EMAIL_DOMAINS = ("example.com", "lawfirm.cn", "court.gov.cn")
+
+
+def _idcard(rng: random.Random) -> str:
+    body = (f"{rng.choice(REGIONS)}{rng.randint(1950, 2005)}"
+            f"{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}{rng.randint(0, 999):03d}")
+    return body + rng.choice("0123456789X")
+
+
+def _phone(rng: random.Random) -> str:
+    return f"1{rng.randint(3, 9)}{rng.randint(0, 999999999):09d}"
+
+
+def _email(rng: random.Random) -> str:
+    name = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 10)))
+    return f"{name}{rng.randint(1, 999)}@{rng.choice(EMAIL_DOMAINS)}"
+
+
+def _bankcard(rng: random.Random) -> str:
+    length = rng.choice((16, 19))
+    return "62" + "".join(str(rng.randint(0, 9)) for _ in range(length - 2))
+
+
+def _case_number(rng: random.Random) -> str:
+    return f"({rng.randint(2015, 2024)}){rng.choice(COURTS)}{rng.choice(CASE_TYPES)}{rng.randint(1, 9999)}号"
+
+
+GENERATORS = {
+    "IDCARD": _idcard,
+    "PHONE": _phone,
+    "EMAIL": _email,
+    "BANKCARD": _bankcard,
+    "CASE_NUMBER": _case_number,
+}
+
+
+def parse_mix(spec: Optional[str]) -> Dict[str, float]:
+    """解析 "PHONE=3,IDCARD=1" 形式的实体比例，省略时各类型等比例"""
+    if not spec:
+        return {entity_type: 1.0 for entity_type in ENTITY_TYPES}
+    mix = {}
+    for item in spec.split(","):
+        entity_type, _, weight = item.partition("=")
+        entity_type = entity_type.strip().upper()
+        if entity_type not in GENERATORS:
+            raise ValueError(f"不支持的实体类型: {entity_type}")
+        mix[entity_type] = float(weight) if weight else 1.0
+    return mix
+
+
+def generate_text(size: int, density: float = 5.0, mix: Optional[Dict[str, float]] = None,
+                  seed: int = 42) -> Tuple[str, Dict[str, int]]:
+    """
+    生成合成文书文本
+
+    Args:
+        size: 文本长度（字符数，近似）
+        density: 每千字符的敏感实体数
+        mix: 各实体类型的权重，省略时等比例
+        seed: 随机种子
+
+    Returns:
+        tuple: (文本, 各类型实体数)
+    """
+    rng = random.Random(seed)
+    mix = mix or parse_mix(None)
+    types = list(mix)
+    weights = [mix[entity_type] for entity_type in types]
+    counts = {entity_type: 0 for entity_type in types}
+
+    # 每个实体之间平均插入的正文字符数
+    gap = 1000 / density if density > 0 else float("inf")
+
+    parts = []
+    length = 0
+    pending = rng.expovariate(1 / gap) if density > 0 else float("inf")
+    while length < size:
+        sentence = rng.choice(SENTENCES)
+        parts.append(sentence)
+        length += len(sentence)
+        pending -= len(sentence)
+        while pending <= 0 and length < size:
+            entity_type = rng.choices(types, weights)[0]
+            # 实体前后使用标点分隔，保证与规则中的单词边界一致
+            snippet = f"{rng.choice(LABELS[entity_type])}：{GENERATORS[entity_type](rng)}。"
+            parts.append(snippet)
+            length += len(snippet)
+            counts[entity_type] += 1
+            pending += rng.expovariate(1 / gap)
+        if rng.random() < 0.1:
+            parts.append("\n")
+            length += 1
+    return "".join(parts), counts
+
+
+def write_docx(text: str, path: str, paragraph_chars: int = 300):
+    """按段落写出 Word 文档"""
+    from docx import Document
+    doc = Document()
+    for line in text.split("\n"):
+        for offset in range(0, len(line), paragraph_chars):
+            doc.add_paragraph(line[offset:offset + paragraph_chars])
+    doc.save(path)
+
+
+def write_pdf(text: str, path: str, chars_per_line: int = 40, lines_per_page: int = 45):
+    """
+    写出 PDF 文档（需要 reportlab，使用内置的宋体 CID 字体，无需字体文件）
+
+    Raises:
+        ImportError: 未安装 reportlab
+    """
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+    from reportlab.pdfgen import canvas
+
+    pdfmetrics.registerFont(UnicodeCIDFont("STSong-Light"))
+    pdf = canvas.Canvas(path)
+    lines = [
+        line[offset:offset + chars_per_line]
+        for line in text.split("\n")
+        for offset in range(0, max(len(line), 1), chars_per_line)
+    ]
+    for first in range(0, len(lines), lines_per_page):
+        pdf.setFont("STSong-Light", 11)
+        y = 800
+        for line in lines[first:first + lines_per_page]:
+            pdf.drawString(40, y, line)
+            y -= 17
+        pdf.showPage()
+    pdf.save()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="合成法律文书生成器")
+    parser.add_argument("--size", type=int, default=100000, help="文本长度（字符数）")
+    parser.add_argument("--density", type=float, default=5.0, help="每千字符的敏感实体数")
+    parser.add_argument("--mix", help="实体类型比例，如 PHONE=3,IDCARD=1，默认等比例")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("-o", "--output", required=True, help="输出文件（.txt / .docx / .pdf）")
+    args = parser.parse_args()
+
+    text, counts = generate_text(args.size, args.density, parse_mix(args.mix), args.seed)
+    ext = os.path.splitext(args.output)[1].lower()
+    if ext == ".docx":
+        write_docx(text, args.output)
+    elif ext == ".pdf":
+        write_pdf(text, args.output)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(f"已生成 {args.output}：{len(text)} 字符，实体 {counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Word 文档原位脱敏
+直接在 DOCX 的文本节点上遮罩敏感实体并另存为 .docx，保留段落、表格、字体等全部格式。
+一次加载、一次保存，逐段落识别，不拼接全文，内存占用与文档结构相当，而不是与文本副本相当
+
+命令行用法（在 backend 目录下）:
+    python docx_redactor.py 起诉状.docx -o 起诉状_脱敏.docx --rules PHONE,IDCARD
+"""
+
+import argparse
+import bisect
+import os
+from typing import Dict, Any, BinaryIO, Iterable, Iterator, List, Optional, Tuple, Union
+
+from docx import Document
+from docx.opc.constants import CONTENT_TYPE as CT
+from docx.opc.part import XmlPart
+from lxml import etree
+
+from rule_anonymizer import EntityList, get_anonymizer, mask_value
+
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+
+W_P = W_NS + "p"
+W_R = W_NS + "r"
+
+# 可改写的文本节点：正文、修订中删除的文本。域代码（w:instrText，如 HYPERLINK、MERGEFIELD）
+# 不参与识别和遮盖，否则会破坏域；域的显示结果是普通的 w:t，照常遮盖
+TEXT_TAGS = frozenset({W_NS + "t", W_NS + "delText"})
+
+# 占一个字符位置但不可改写的节点，参与实体边界判断
+SEPARATOR_TAGS = {
+    W_NS + "tab": "\t",
+    W_NS + "ptab": "\t",
+    W_NS + "br": "\n",
+    W_NS + "cr": "\n",
+    W_NS + "noBreakHyphen": "-",
+}
+
+# 包含正文文本的部件
+TEXT_PARTS = frozenset({
+    CT.WML_DOCUMENT_MAIN, CT.WML_HEADER, CT.WML_FOOTER,
+    CT.WML_FOOTNOTES, CT.WML_ENDNOTES, CT.WML_COMMENTS,
+})
+
+
+def _iter_runs(element) -> Iterator:
+    """段落中按文档顺序的 w:r，包括超链接、修订等容器内的，不含文本框内的嵌套段落"""
+    for child in element:
+        if child.tag == W_R:
+            yield child
+        elif child.tag != W_P:
+            yield from _iter_runs(child)
+
+
+def paragraph_atoms(paragraph) -> List[Tuple[Optional[Any], str]]:
+    """
+    段落的文本片段
+    
+    Returns:
+        List[tuple]: [(文本节点, 文本), ...]，制表符、换行等不可改写的片段节点为 None
+    """
+    atoms = []
+    for run in _iter_runs(paragraph):
+        for child in run:
+            tag = child.tag
+            if tag in TEXT_TAGS:
+                if child.text:
+                    atoms.append((child, child.text))
+            elif tag in SEPARATOR_TAGS:
+                atoms.append((None, SEPARATOR_TAGS[tag]))
+    return atoms
+
+
+def mask_segments(entities: EntityList, mask_char: str = '*', keep_prefix: int = 2,
+                  keep_suffix: int = 2) -> Iterator[Tuple[int, int, str]]:
+    """
+    按 EntityList.mask_text 的重叠处理规则产出替换片段
+    
+    Yields:
+        tuple: (开始位置, 结束位置, 替换文本)，互不重叠且按位置排列
+    """
+    text, starts, ends = entities.text, entities.starts, entities.ends
+    cursor = 0
+    for index in entities.order():
+        start, end = starts[index], ends[index]
+        if end <= cursor:
+            continue
+        masked = mask_value(text[start:end], mask_char, keep_prefix, keep_suffix)
+        if start < cursor:
+            # 与前一个实体重叠，只替换未覆盖的部分
+            masked = masked[cursor - start:]
+            start = cursor
+        yield start, end, masked
+        cursor = end
+
+
+def apply_segments(atoms: List[Tuple[Optional[Any], str]],
+                   segments: Iterable[Tuple[int, int, str]]) -> int:
+    """
+    把替换片段写回文本节点
+    
+    替换文本与原文等长时逐字符落到对应节点上，跨越多个 run 的实体各部分保留原有格式；
+    不等长时（如多字符遮罩）整段替换文本写入实体所在的第一个节点，其余节点删去被覆盖的部分。
+    
+    Returns:
+        int: 改写的节点数
+    """
+    offsets = []
+    position = 0
+    for _, text in atoms:
+        offsets.append(position)
+        position += len(text)
+    
+    edits: Dict[int, List[Tuple[int, int, str]]] = {}
+    for start, end, replacement in segments:
+        same_length = len(replacement) == end - start
+        placed = False
+        index = bisect.bisect_right(offsets, start) - 1
+        while index < len(atoms) and offsets[index] < end:
+            node, text = atoms[index]
+            atom_start = offsets[index]
+            low, high = max(start, atom_start), min(end, atom_start + len(text))
+            if node is not None and high > low:
+                if same_length:
+                    piece = replacement[low - start:high - start]
+                else:
+                    piece = "" if placed else replacement
+                    placed = True
+                edits.setdefault(index, []).append((low - atom_start, high - atom_start, piece))
+            index += 1
+    
+    for index, changes in edits.items():
+        node, text = atoms[index]
+        parts = []
+        cursor = 0
+        for low, high, piece in changes:
+            parts.append(text[cursor:low])
+            parts.append(piece)
+            cursor = high
+        parts.append(text[cursor:])
+        new_text = "".join(parts)
+        node.text = new_text
+        if new_text != new_text.strip():
+            node.set(XML_SPACE, "preserve")
+    return len(edits)
+
+
+def redact_element(root, anonymizer, mask_char: str = '*', keep_prefix: int = 2,
+                   keep_suffix: int = 2, counts: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """
+    遮罩一个 XML 部件中所有段落里的敏感实体
+    
+    实体按段落识别，跨段落的文本不会被识别为同一实体。
+    
+    Args:
+        root: 部件的根元素
+        anonymizer: 规则脱敏器
+        counts: 累加各类型实体数的字典，省略时新建
+    
+    Returns:
+        Dict: 各类型实体数
+    """
+    counts = {} if counts is None else counts
+    for paragraph in root.iter(W_P):
+        atoms = paragraph_atoms(paragraph)
+        if not atoms:
+            continue
+        entities = anonymizer.find_entities("".join(text for _, text in atoms))
+        if not entities:
+            continue
+        apply_segments(atoms, mask_segments(entities, mask_char, keep_prefix, keep_suffix))
+        for entity_type, count in entities.counts().items():
+            counts[entity_type] = counts.get(entity_type, 0) + count
+    return counts
+
+
+def redact_docx(source: Union[str, BinaryIO], destination: Union[str, BinaryIO],
+                enabled_rules: Optional[List[str]] = None, mask_char: str = '*',
+                keep_prefix: int = 2, keep_suffix: int = 2) -> Dict[str, Any]:
+    """
+    原位脱敏 Word 文档并另存
+    
+    处理正文（含表格、文本框）、页眉页脚、脚注尾注和批注。超链接目标地址保存在
+    关系部件中，不做处理。可直接提交给进程池执行。
+    
+    Args:
+        source: 源 .docx 路径或文件对象
+        destination: 输出 .docx 路径或文件对象
+        enabled_rules: 启用的规则列表，None 表示使用所有规则
+        mask_char: 遮罩字符
+        keep_prefix: 保留前缀字符数
+        keep_suffix: 保留后缀字符数
+    
+    Returns:
+        Dict: {"entity_statistics": 各类型实体数, "entities_count": 实体总数, "parts": 处理的部件数}
+    """
+    document = Document(source)
+    anonymizer = get_anonymizer(enabled_rules)
+    
+    counts: Dict[str, int] = {}
+    parts = 0
+    for part in document.part.package.iter_parts():
+        if part.content_type not in TEXT_PARTS:
+            continue
+        if isinstance(part, XmlPart):
+            redact_element(part.element, anonymizer, mask_char, keep_prefix, keep_suffix, counts)
+        else:
+            # python-docx 把脚注、尾注、批注加载为二进制部件，在本地解析后写回
+            root = etree.fromstring(part.blob)
+            found = sum(counts.values())
+            redact_element(root, anonymizer, mask_char, keep_prefix, keep_suffix, counts)
+            if sum(counts.values()) > found:
+                part._blob = etree.tostring(root, encoding="UTF-8", standalone=True)
+        parts += 1
+    
+    document.save(destination)
+    return {
+        "entity_statistics": counts,
+        "entities_count": sum(counts.values()),
+        "parts": parts,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Word 文档原位脱敏")
+    parser.add_argument("input", help="输入 .docx 文件")
+    parser.add_argument("-o", "--output", help="输出 .docx 文件，默认在输入文件名后追加 _脱敏")
+    parser.add_argument("--rules", help="启用的规则，逗号分隔，默认全部规则")
+    parser.add_argument("--mask-char", default="●")
+    parser.add_argument("--keep-prefix", type=int, default=2)
+    parser.add_argument("--keep-suffix", type=int, default=2)
+    args = parser.parse_args()
+    
+    output = args.output or "{}_脱敏{}".format(*os.path.splitext(args.input))
+    result = redact_docx(
+        args.input, output,
+        enabled_rules=args.rules.split(",") if args.rules else None,
+        mask_char=args.mask_char, keep_prefix=args.keep_prefix, keep_suffix=args.keep_suffix
+    )
+    print(f"已输出 {output}：{result['entities_count']} 个实体 {result['entity_statistics']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+文档解析结果缓存
+以上传文件内容的 SHA-256 为键缓存 FileProcessor.extract_content 的结果，
+同一文件重复上传时跳过 PDF/Word 解析，只重新执行脱敏
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+
+def sha256_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    分块计算文件的 SHA-256
+    
+    Args:
+        file_path: 文件路径
+        chunk_size: 每次读取的字节数
+    
+    Returns:
+        str: 十六进制摘要
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """
+    内容寻址的解析结果缓存
+    
+    内存层按占用字节数做 LRU 淘汰；指定 cache_dir 时同时持久化到磁盘，
+    磁盘层同样按总字节数做 LRU 淘汰（以文件修改时间记录最近访问）。
+    所有方法线程安全，可在线程池中调用。
+    """
+    
+    def __init__(self, memory_bytes: int = 256 * 1024 * 1024,
+                 cache_dir: Optional[str] = None,
+                 disk_bytes: int = 1024 * 1024 * 1024):
+        """
+        初始化缓存
+        
+        Args:
+            memory_bytes: 内存层最大占用字节数，0 表示不使用内存层
+            cache_dir: 磁盘缓存目录，None 表示不持久化
+            disk_bytes: 磁盘层最大占用字节数
+        """
+        self.memory_bytes = memory_bytes
+        self.cache_dir = cache_dir
+        self.disk_bytes = disk_bytes
+        
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._memory_size = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_size = 0
+        
+        self.hits = 0
+        self.misses = 0
+        
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._load_disk_index()
+    
+    @classmethod
+    def from_env(cls) -> "ExtractionCache":
+        """
+        根据环境变量创建缓存
+        
+        EXTRACTION_CACHE_MEMORY_BYTES: 内存层上限，默认 256MB
+        EXTRACTION_CACHE_DIR: 磁盘缓存目录，未设置时不持久化
+        EXTRACTION_CACHE_DISK_BYTES: 磁盘层上限，默认 1GB
+        """
+        return cls(
+            memory_bytes=int(os.getenv("EXTRACTION_CACHE_MEMORY_BYTES", 256 * 1024 * 1024)),
+            cache_dir=os.getenv("EXTRACTION_CACHE_DIR") or None,
+            disk_bytes=int(os.getenv("EXTRACTION_CACHE_DISK_BYTES", 1024 * 1024 * 1024)),
+        )
+    
+    @property
+    def enabled(self) -> bool:
+        """是否启用了任一缓存层"""
+        return self.memory_bytes > 0 or bool(self.cache_dir)
+    
+    @staticmethod
+    def make_key(content_hash: str, content_type: str, variant: str = "") -> str:
+        """由文件摘要和内容类型生成缓存键，variant 区分同一文件的不同提取方式（如PDF引擎）"""
+        type_digest = hashlib.sha256(content_type.encode('utf-8')).hexdigest()[:8]
+        key = f"{content_hash}-{type_digest}"
+        return f"{key}-{variant}" if variant else key
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        读取缓存的解析结果
+        
+        Args:
+            key: 缓存键
+        
+        Returns:
+            Optional[Dict]: {"content": ..., "metadata": ...}，未命中返回 None
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._copy(entry[0])
+            on_disk = key in self._disk
+        
+        if on_disk:
+            result = self._read_disk(key)
+            if result is not None:
+                with self._lock:
+                    self.hits += 1
+                    self._remember(key, result)
+                return self._copy(result)
+        
+        with self._lock:
+            self.misses += 1
+        return None
+    
+    def put(self, key: str, result: Dict[str, Any]):
+        """
+        写入解析结果
+        
+        Args:
+            key: 缓存键
+            result: FileProcessor.extract_content 的返回值
+        """
+        result = self._copy(result)
+        with self._lock:
+            self._remember(key, result)
+        if self.cache_dir:
+            self._write_disk(key, result)
+    
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计信息"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_size,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_size,
+            }
+    
+    @staticmethod
+    def _copy(result: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "content": result["content"],
+            "metadata": dict(result.get("metadata", {}))
+        }
+    
+    @staticmethod
+    def _estimate_size(result: Dict[str, Any]) -> int:
+        # 按 UTF-8 编码长度估算文本占用
+        return len(result["content"].encode('utf-8')) + 1024
+    
+    def _remember(self, key: str, result: Dict[str, Any]):
+        """写入内存层并按容量淘汰，调用方需持有锁"""
+        if self.memory_bytes <= 0:
+            return
+        size = self._estimate_size(result)
+        if size > self.memory_bytes:
+            return
+        
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_size -= previous[1]
+        self._memory[key] = (result, size)
+        self._memory_size += size
+        
+        while self._memory_size > self.memory_bytes:
+            _, (_, evicted_size) = self._memory.popitem(last=False)
+            self._memory_size -= evicted_size
+    
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+    
+    def _load_disk_index(self):
+        """扫描磁盘缓存目录，按修改时间重建 LRU 顺序"""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for filename in files:
+                if not filename.endswith(".json"):
+                    continue
+                stat = os.stat(os.path.join(root, filename))
+                entries.append((stat.st_mtime, filename[:-5], stat.st_size))
+        
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_size += size
+        self._evict_disk()
+    
+    def _read_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            with self._lock:
+                size = self._disk.pop(key, 0)
+                self._disk_size -= size
+            return None
+        
+        with self._lock:
+            if key in self._disk:
+                self._disk.move_to_end(key)
+        return result
+    
+    def _write_disk(self, key: str, result: Dict[str, Any]):
+        path = self._disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        # 先写临时文件再替换，避免并发读到半个文件
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        
+        with self._lock:
+            self._disk_size -= self._disk.pop(key, 0)
+            self._disk[key] = size
+            self._disk_size += size
+            self._evict_disk()
+    
+    def _evict_disk(self):
+        """按 LRU 顺序删除超出容量的磁盘缓存，调用方需持有锁"""
+        while self._disk_size > self.disk_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_size -= size
+            try:
+                os.remove(self._disk_path(key))
+            except OSError:
+                pass
@@ -1,66 +1,582 @@
 import pdfplumber
+from pdfminer.pdfdevice import PDFTextDevice
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdffont import PDFUnicodeNotDefined
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdftypes import resolve1
 from docx import Document
+import contextlib
+import hashlib
+import io
 import os
-from typing import Dict, Any
+import threading
+from typing import Dict, Any, AsyncIterator, Iterator, Optional, Tuple
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from extraction_cache import ExtractionCache, sha256_file
+from metrics import timed
+
+
+# PDF 文本提取引擎：pdfplumber 做完整的版面分析（最慢，换行与阅读顺序最可靠）；
+# pdfminer 只按内容流顺序收集字符、基线变化时换行，不创建版面对象；
+# pypdf 为另一种纯文本提取（可选依赖）
+PDF_ENGINES = ("pdfplumber", "pdfminer", "pypdf")
+
+# 接口可选的引擎，auto 按页数在 pdfplumber 和快速引擎之间选择
+PDF_ENGINE_CHOICES = ("auto",) + PDF_ENGINES
+
+
+def default_worker_count() -> int:
+    """当前进程可用的CPU核数"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class _CountingThreadPoolExecutor(ThreadPoolExecutor):
+    """记录已提交、尚未完成（排队或正在执行）任务数的线程池"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._count_lock = threading.Lock()
+        self.in_flight = 0
+    
+    def submit(self, fn, /, *args, **kwargs):
+        future = super().submit(fn, *args, **kwargs)
+        with self._count_lock:
+            self.in_flight += 1
+        future.add_done_callback(self._task_done)
+        return future
+    
+    def _task_done(self, future):
+        with self._count_lock:
+            self.in_flight -= 1
+
+
+class _PlainTextDevice(PDFTextDevice):
+    """只收集字符的 pdfminer 输出设备：不创建 LTChar 等版面对象，基线变化时换行"""
+    
+    def __init__(self, rsrcmgr: PDFResourceManager):
+        super().__init__(rsrcmgr)
+        self.parts = []
+        self.baseline = None
+    
+    def render_char(self, matrix, font, fontsize, scaling, rise, cid, *args) -> float:
+        try:
+            text = font.to_unichr(cid)
+        except PDFUnicodeNotDefined:
+            text = ""
+        baseline = matrix[5]
+        if self.baseline is not None and abs(baseline - self.baseline) > fontsize / 2:
+            self.parts.append("\n")
+        self.baseline = baseline
+        self.parts.append(text)
+        # 前进宽度与 pdfminer 版面分析中的 LTChar.adv 相同
+        return font.char_width(cid) * fontsize * scaling
+    
+    def take_text(self) -> str:
+        """取出当前页的文本并清空"""
+        text = "".join(self.parts).strip()
+        self.parts = []
+        self.baseline = None
+        return text
+
 
 class FileProcessor:
-    def __init__(self):
-        self.executor = ThreadPoolExecutor(max_workers=4)
+    def __init__(self, backend: Optional[str] = None, max_workers: Optional[int] = None,
+                 parallel_pages: Optional[int] = None, cache: Optional[ExtractionCache] = None,
+                 pdf_engine: Optional[str] = None, fast_pdf_pages: Optional[int] = None):
+        """
+        初始化文件处理器
+        
+        Args:
+            backend: 整篇解析使用的执行器，"process" 为进程池（绕开GIL，多核并行），
+                "thread" 为线程池；默认读取环境变量 FILE_PROCESSOR_BACKEND，未设置时为 "process"
+            max_workers: 解析进程/线程数；默认读取环境变量 FILE_PROCESSOR_WORKERS，
+                未设置时进程池取CPU核数、线程池为 4
+            parallel_pages: 进程池模式下，页数不少于该值的PDF拆分为多个页段并行解析，
+                0 表示不拆分；默认读取环境变量 FILE_PROCESSOR_PARALLEL_PAGES，未设置时为 50
+            cache: 解析结果缓存，默认按环境变量创建（见 ExtractionCache.from_env）
+            pdf_engine: 默认的PDF提取引擎（见 PDF_ENGINE_CHOICES），请求未指定引擎时使用；
+                默认读取环境变量 FILE_PROCESSOR_PDF_ENGINE，未设置时为 "auto"
+            fast_pdf_pages: auto 模式下页数不少于该值的PDF改用快速引擎，0 表示始终使用 pdfplumber；
+                默认读取环境变量 FILE_PROCESSOR_FAST_PDF_PAGES，未设置时为 100。
+                快速引擎由环境变量 FILE_PROCESSOR_FAST_PDF_ENGINE 指定，默认 "pdfminer"
+        """
+        self.backend = backend or os.getenv("FILE_PROCESSOR_BACKEND", "process")
+        if max_workers is None and os.getenv("FILE_PROCESSOR_WORKERS"):
+            max_workers = int(os.getenv("FILE_PROCESSOR_WORKERS"))
+        if parallel_pages is None:
+            parallel_pages = int(os.getenv("FILE_PROCESSOR_PARALLEL_PAGES", "50"))
+        self.parallel_pages = parallel_pages
+        self.max_workers = max_workers or (default_worker_count() if self.backend == "process" else 4)
+        self.cache = cache if cache is not None else ExtractionCache.from_env()
+        
+        self.pdf_engine = pdf_engine or os.getenv("FILE_PROCESSOR_PDF_ENGINE", "auto")
+        if fast_pdf_pages is None:
+            fast_pdf_pages = int(os.getenv("FILE_PROCESSOR_FAST_PDF_PAGES", "100"))
+        self.fast_pdf_pages = fast_pdf_pages
+        self.fast_pdf_engine = os.getenv("FILE_PROCESSOR_FAST_PDF_ENGINE", "pdfminer")
+        FileProcessor.check_pdf_engine(self.pdf_engine)
+        if self.fast_pdf_engine not in PDF_ENGINES:
+            raise ValueError(f"不支持的PDF提取引擎: {self.fast_pdf_engine}")
+        
+        # 逐页流式解析需要在同一进程内推进生成器，始终使用线程池
+        self.executor = _CountingThreadPoolExecutor(max_workers=4)
+        
+        if self.backend == "process":
+            # 使用 spawn 启动工作进程，避免在多线程的服务进程中 fork
+            self.extract_executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        elif self.backend == "thread":
+            self.extract_executor = (
+                _CountingThreadPoolExecutor(max_workers=max_workers) if max_workers else self.executor
+            )
+        else:
+            raise ValueError(f"不支持的执行器类型: {self.backend}")
+    
+    def shutdown(self):
+        """关闭执行器及工作进程"""
+        if self.extract_executor is not self.executor:
+            self.extract_executor.shutdown(wait=False, cancel_futures=True)
+        self.executor.shutdown(wait=False, cancel_futures=True)
     
-    async def extract_content(self, file_path: str, content_type: str) -> Dict[str, Any]:
+    def queue_depths(self) -> Dict[str, int]:
+        """
+        各执行器中排队或正在执行的任务数
+        
+        Returns:
+            Dict: {"io": 线程池任务数, "extract": 解析执行器任务数}，
+                解析与 IO 共用线程池时只返回 "io"
+        """
+        depths = {"io": FileProcessor._executor_depth(self.executor)}
+        if self.extract_executor is not self.executor:
+            depths["extract"] = FileProcessor._executor_depth(self.extract_executor)
+        return depths
+    
+    @staticmethod
+    def _executor_depth(executor) -> int:
+        # 线程池自行计数；进程池提交后到完成前的任务都在 _pending_work_items 中
+        if isinstance(executor, _CountingThreadPoolExecutor):
+            return executor.in_flight
+        return len(getattr(executor, "_pending_work_items", ()))
+    
+    @staticmethod
+    def check_pdf_engine(engine: str):
+        """检查PDF提取引擎名称，不支持时抛出 ValueError"""
+        if engine not in PDF_ENGINE_CHOICES:
+            raise ValueError(f"不支持的PDF提取引擎: {engine}，可选: {', '.join(PDF_ENGINE_CHOICES)}")
+    
+    async def resolve_pdf_engine(self, source, pdf_engine: Optional[str] = None) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        确定本次提取使用的PDF引擎
+        
+        auto 模式下读取页数（不解析页面内容），页数不少于 fast_pdf_pages 时使用快速引擎。
+        
+        Args:
+            source: PDF文件路径或内存中的PDF内容（bytes）
+            pdf_engine: 请求指定的引擎，省略时使用默认引擎
+        
+        Returns:
+            tuple: (引擎名称, 为选择引擎读取的PDF元数据，未读取时为 None)
+        """
+        engine = pdf_engine or self.pdf_engine
+        FileProcessor.check_pdf_engine(engine)
+        if engine != "auto":
+            return engine, None
+        if not self.fast_pdf_pages:
+            return "pdfplumber", None
+        
+        if isinstance(source, bytes):
+            source = io.BytesIO(source)
+        loop = asyncio.get_event_loop()
+        metadata = await loop.run_in_executor(self.executor, FileProcessor._read_pdf_metadata, source)
+        engine = self._auto_pdf_engine(metadata["pages"])
+        metadata["extraction_method"] = engine
+        return engine, metadata
+    
+    def _auto_pdf_engine(self, pages: int) -> str:
+        """auto 模式按页数选择的引擎"""
+        if self.fast_pdf_pages and pages >= self.fast_pdf_pages:
+            return self.fast_pdf_engine
+        return "pdfplumber"
+    
+    async def lookup_pdf_cache(self, content_hash: str,
+                               pdf_engine: Optional[str] = None) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """
+        在缓存中查找PDF的解析结果，不打开文件
+        
+        auto 模式下引擎取决于页数：依次查找各候选引擎的缓存，命中结果的元数据带有页数，
+        据此确定引擎，命中的不是该引擎时再查一次。
+        
+        Args:
+            content_hash: 文件内容的 SHA-256
+            pdf_engine: 请求指定的引擎，省略时使用默认引擎
+        
+        Returns:
+            tuple: (引擎名称, 缓存的解析结果)；未命中时结果为 None，auto 模式下
+                各候选都未命中时引擎也为 None，需由 resolve_pdf_engine 读取页数确定
+        """
+        engine = pdf_engine or self.pdf_engine
+        FileProcessor.check_pdf_engine(engine)
+        loop = asyncio.get_event_loop()
+        
+        def lookup(candidate: str):
+            return loop.run_in_executor(
+                self.executor, self.cache.get,
+                FileProcessor.cache_key(content_hash, "application/pdf", candidate)
+            )
+        
+        if engine != "auto":
+            return engine, await lookup(engine)
+        if not self.fast_pdf_pages:
+            return "pdfplumber", await lookup("pdfplumber")
+        
+        for candidate in dict.fromkeys(("pdfplumber", self.fast_pdf_engine)):
+            cached = await lookup(candidate)
+            if cached is None or "pages" not in cached.get("metadata", {}):
+                continue
+            engine = self._auto_pdf_engine(cached["metadata"]["pages"])
+            if engine == candidate:
+                return engine, cached
+            return engine, await lookup(engine)
+        return None, None
+    
+    async def extract_content(self, file_path: str, content_type: str,
+                              content_hash: Optional[str] = None,
+                              pdf_engine: Optional[str] = None) -> Dict[str, Any]:
         """
         异步提取文件内容
+        
+        启用缓存时先以文件内容的 SHA-256 查找已有的解析结果，命中则不再打开文件；
+        不同引擎提取的PDF文本不同，分别缓存（见 lookup_pdf_cache）。
+        
+        Args:
+            file_path: 文件路径
+            content_type: 文件MIME类型
+            content_hash: 文件内容的 SHA-256，调用方已计算时传入可省去一次读文件
+            pdf_engine: PDF提取引擎（见 PDF_ENGINE_CHOICES），省略时使用默认引擎
+        """
+        is_pdf = content_type == "application/pdf"
+        engine, metadata = None, None
+        if not self.cache.enabled:
+            if is_pdf:
+                engine, metadata = await self.resolve_pdf_engine(file_path, pdf_engine)
+            return await self._extract_uncached(file_path, content_type, engine, metadata)
+        
+        # 先按内容摘要查缓存，命中时不打开文件（auto 模式的引擎由缓存的页数确定）
+        loop = asyncio.get_event_loop()
+        if content_hash is None:
+            content_hash = await loop.run_in_executor(self.executor, sha256_file, file_path)
+        if is_pdf:
+            engine, cached = await self.lookup_pdf_cache(content_hash, pdf_engine)
+            if cached is None and engine is None:
+                engine, metadata = await self.resolve_pdf_engine(file_path, pdf_engine)
+        else:
+            cached = await loop.run_in_executor(
+                self.executor, self.cache.get, FileProcessor.cache_key(content_hash, content_type)
+            )
+        if cached is not None:
+            return cached
+        
+        cache_key = FileProcessor.cache_key(content_hash, content_type, engine)
+        result = await self._extract_uncached(file_path, content_type, engine, metadata)
+        await loop.run_in_executor(self.executor, self.cache.put, cache_key, result)
+        return result
+    
+    async def extract_bytes(self, data: bytes, content_type: str,
+                            content_hash: Optional[str] = None,
+                            pdf_engine: Optional[str] = None) -> Dict[str, Any]:
+        """
+        异步提取内存中的文件内容（如压缩包条目），无需先写入磁盘
+        
+        Args:
+            data: 文件内容
+            content_type: 文件MIME类型
+            content_hash: 文件内容的 SHA-256，未传入时自动计算
+            pdf_engine: PDF提取引擎，省略时使用默认引擎
+        """
+        is_pdf = content_type == "application/pdf"
+        engine = None
+        if not self.cache.enabled:
+            if is_pdf:
+                engine, _ = await self.resolve_pdf_engine(data, pdf_engine)
+            return await self._extract_bytes_uncached(data, content_type, engine)
+        
+        loop = asyncio.get_event_loop()
+        if content_hash is None:
+            content_hash = hashlib.sha256(data).hexdigest()
+        if is_pdf:
+            engine, cached = await self.lookup_pdf_cache(content_hash, pdf_engine)
+            if cached is None and engine is None:
+                engine, _ = await self.resolve_pdf_engine(data, pdf_engine)
+        else:
+            cached = await loop.run_in_executor(
+                self.executor, self.cache.get, FileProcessor.cache_key(content_hash, content_type)
+            )
+        if cached is not None:
+            return cached
+        
+        cache_key = FileProcessor.cache_key(content_hash, content_type, engine)
+        result = await self._extract_bytes_uncached(data, content_type, engine)
+        await loop.run_in_executor(self.executor, self.cache.put, cache_key, result)
+        return result
+    
+    @staticmethod
+    def cache_key(content_hash: str, content_type: str, engine: Optional[str] = None) -> str:
+        """
+        解析结果的缓存键
+        
+        Args:
+            content_hash: 文件内容的 SHA-256
+            content_type: 文件MIME类型
+            engine: 已确定的PDF提取引擎（见 resolve_pdf_engine），非PDF文档为 None
+        """
+        # pdfplumber 的结果沿用不带引擎的缓存键，与 PDF 遮盖输出写入的缓存共用
+        variant = "" if engine in (None, "pdfplumber") else engine
+        return ExtractionCache.make_key(content_hash, content_type, variant)
+    
+    async def _extract_bytes_uncached(self, data: bytes, content_type: str,
+                                      engine: Optional[str] = None) -> Dict[str, Any]:
+        loop = asyncio.get_event_loop()
+        with timed("parse"):
+            return await loop.run_in_executor(
+                self.extract_executor, FileProcessor._extract_bytes_sync, data, content_type,
+                engine or "pdfplumber"
+            )
+    
+    @staticmethod
+    def _extract_bytes_sync(data: bytes, content_type: str, engine: str = "pdfplumber") -> Dict[str, Any]:
+        """
+        同步提取内存中的文件内容，可直接提交给进程池
+        """
+        stream = io.BytesIO(data)
+        if content_type == "application/pdf":
+            return FileProcessor._extract_pdf_sync(stream, engine)
+        elif content_type in [
+            "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+            "application/msword"
+        ]:
+            return FileProcessor._extract_word_sync(stream)
+        else:
+            raise ValueError(f"不支持的文件类型: {content_type}")
+    
+    async def _extract_uncached(self, file_path: str, content_type: str, engine: Optional[str] = None,
+                                metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        按文件类型解析文件内容
         """
         if content_type == "application/pdf":
-            return await self._extract_pdf_content(file_path)
+            with timed("parse"):
+                return await self._extract_pdf_content(file_path, engine or "pdfplumber", metadata)
         elif content_type in [
             "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
             "application/msword"
         ]:
-            return await self._extract_word_content(file_path)
+            with timed("parse"):
+                return await self._extract_word_content(file_path)
         else:
             raise ValueError(f"不支持的文件类型: {content_type}")
     
-    async def _extract_pdf_content(self, file_path: str) -> Dict[str, Any]:
+    async def _extract_pdf_content(self, file_path: str, engine: str = "pdfplumber",
+                                   metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         提取PDF文件内容
+        
+        Args:
+            file_path: PDF文件路径
+            engine: 提取引擎（见 PDF_ENGINES）
+            metadata: 已读取的PDF元数据（可选，选择引擎时读取过则复用）
         """
         loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(self.executor, self._extract_pdf_sync, file_path)
+        
+        if self.backend == "process" and self.parallel_pages and self.max_workers > 1:
+            if metadata is None:
+                metadata = await loop.run_in_executor(self.executor, FileProcessor._read_pdf_metadata, file_path)
+            if metadata["pages"] >= self.parallel_pages:
+                return await self._extract_pdf_parallel(file_path, metadata, engine)
+        
+        return await loop.run_in_executor(self.extract_executor, FileProcessor._extract_pdf_sync, file_path, engine)
     
-    def _extract_pdf_sync(self, file_path: str) -> Dict[str, Any]:
+    async def _extract_pdf_parallel(self, file_path: str, metadata: Dict[str, Any],
+                                    engine: str = "pdfplumber") -> Dict[str, Any]:
         """
-        同步提取PDF内容
+        将PDF按页段拆分，由多个工作进程各自打开文件并行解析，再按页序拼接
+        
+        Args:
+            file_path: PDF文件路径
+            metadata: 已读取的PDF元数据（含页数）
+            engine: 提取引擎
+            
+        Returns:
+            Dict: 与 _extract_pdf_sync 相同的结构
+        """
+        loop = asyncio.get_event_loop()
+        total_pages = metadata["pages"]
+        chunk_size = -(-total_pages // min(self.max_workers, total_pages))
+        
+        futures = [
+            loop.run_in_executor(
+                self.extract_executor,
+                FileProcessor._extract_pdf_page_range,
+                file_path,
+                first_page,
+                min(first_page + chunk_size - 1, total_pages),
+                engine
+            )
+            for first_page in range(1, total_pages + 1, chunk_size)
+        ]
+        content = "".join(await asyncio.gather(*futures))
+        
+        if not content.strip():
+            raise Exception("PDF文件中未找到可提取的文本内容")
+        
+        return {
+            "content": content.strip(),
+            "metadata": {**metadata, "extraction_method": engine}
+        }
+    
+    @staticmethod
+    def _read_pdf_metadata(file_path: str) -> Dict[str, Any]:
+        """
+        读取PDF页数和文档属性，不解析页面内容
         """
-        content = ""
         metadata = {
             "pages": 0,
             "extraction_method": "pdfplumber"
         }
         
         try:
-            # 使用pdfplumber提取PDF内容
             with pdfplumber.open(file_path) as pdf:
-                metadata["pages"] = len(pdf.pages)
-                for page_num, page in enumerate(pdf.pages, 1):
+                try:
+                    metadata["pages"] = int(resolve1(pdf.doc.catalog["Pages"])["Count"])
+                except Exception:
+                    metadata["pages"] = len(pdf.pages)
+                metadata.update(FileProcessor._pdf_properties(pdf))
+        except Exception as e:
+            raise Exception(f"PDF提取失败: {str(e)}")
+        
+        return metadata
+    
+    @staticmethod
+    def _pdf_properties(pdf) -> Dict[str, Any]:
+        """获取PDF元数据"""
+        if not pdf.metadata:
+            return {}
+        return {
+            "title": pdf.metadata.get("Title", ""),
+            "author": pdf.metadata.get("Author", ""),
+            "creator": pdf.metadata.get("Creator", ""),
+            "creation_date": str(pdf.metadata.get("CreationDate", "")),
+        }
+    
+    @staticmethod
+    def _format_page(page_num: int, page_text: Optional[str]) -> str:
+        """为页面文本加上页标记，无文本的页面返回空字符串"""
+        if not page_text:
+            return ""
+        return f"\n--- 第 {page_num} 页 ---\n{page_text}\n"
+    
+    @staticmethod
+    def _iter_pdf_page_texts(source, engine: str = "pdfplumber", first_page: int = 1,
+                             last_page: Optional[int] = None) -> Iterator[Tuple[int, Optional[str]]]:
+        """
+        用指定引擎逐页提取PDF文本
+        
+        Args:
+            source: PDF文件路径或文件对象
+            engine: 提取引擎（见 PDF_ENGINES）
+            first_page: 起始页码（从1开始，含）
+            last_page: 结束页码（含），省略时到最后一页
+        
+        Yields:
+            tuple: (页码, 页面文本)
+        """
+        if engine == "pdfplumber":
+            pages = list(range(first_page, last_page + 1)) if last_page else None
+            with pdfplumber.open(source, pages=pages) as pdf:
+                for page in pdf.pages:
+                    if page.page_number < first_page:
+                        continue
                     page_text = page.extract_text()
-                    if page_text:
-                        content += f"\n--- 第 {page_num} 页 ---\n"
-                        content += page_text + "\n"
-                
-                # 获取PDF元数据
-                if pdf.metadata:
-                    metadata.update({
-                        "title": pdf.metadata.get("Title", ""),
-                        "author": pdf.metadata.get("Author", ""),
-                        "creator": pdf.metadata.get("Creator", ""),
-                        "creation_date": str(pdf.metadata.get("CreationDate", "")),
-                    })
+                    page.flush_cache()
+                    yield page.page_number, page_text
+        
+        elif engine == "pdfminer":
+            opened = open(source, "rb") if isinstance(source, str) else contextlib.nullcontext(source)
+            with opened as fp:
+                rsrcmgr = PDFResourceManager(caching=True)
+                device = _PlainTextDevice(rsrcmgr)
+                interpreter = PDFPageInterpreter(rsrcmgr, device)
+                for page_num, page in enumerate(PDFPage.create_pages(PDFDocument(PDFParser(fp))), 1):
+                    if page_num < first_page:
+                        continue
+                    if last_page and page_num > last_page:
+                        break
+                    interpreter.process_page(page)
+                    yield page_num, device.take_text()
+        
+        elif engine == "pypdf":
+            try:
+                from pypdf import PdfReader
+            except ImportError:
+                raise ValueError("未安装 pypdf，无法使用 pypdf 提取引擎")
+            reader = PdfReader(source)
+            for page_num in range(first_page, (last_page or len(reader.pages)) + 1):
+                yield page_num, reader.pages[page_num - 1].extract_text()
         
+        else:
+            raise ValueError(f"不支持的PDF提取引擎: {engine}")
+    
+    @staticmethod
+    def _extract_pdf_page_range(file_path: str, first_page: int, last_page: int,
+                                engine: str = "pdfplumber") -> str:
+        """
+        提取PDF指定页段的内容，供工作进程独立打开文件并行解析
+        
+        Args:
+            file_path: PDF文件路径
+            first_page: 起始页码（从1开始，含）
+            last_page: 结束页码（含）
+            engine: 提取引擎
+            
+        Returns:
+            str: 该页段带页标记的文本
+        """
+        try:
+            return "".join(
+                FileProcessor._format_page(page_num, page_text)
+                for page_num, page_text in FileProcessor._iter_pdf_page_texts(
+                    file_path, engine, first_page, last_page
+                )
+            )
         except Exception as e:
             raise Exception(f"PDF提取失败: {str(e)}")
+    
+    @staticmethod
+    def _extract_pdf_sync(file_path, engine: str = "pdfplumber") -> Dict[str, Any]:
+        """
+        同步提取PDF内容
+        
+        静态方法，可直接提交给进程池；返回值只含文本和元数据，回传开销小。
+        
+        Args:
+            file_path: PDF文件路径或文件对象
+            engine: 提取引擎（见 PDF_ENGINES）
+        """
+        metadata = {
+            "pages": 0,
+            "extraction_method": engine
+        }
+        
+        content = "".join(
+            page["content"] for page in FileProcessor._iter_pdf_pages(file_path, metadata, engine)
+        )
         
         if not content.strip():
             raise Exception("PDF文件中未找到可提取的文本内容")
@@ -70,14 +586,109 @@ class FileProcessor:
             "metadata": metadata
         }
     
+    @staticmethod
+    def _iter_pdf_pages(file_path, metadata: Optional[Dict[str, Any]] = None,
+                        engine: str = "pdfplumber") -> Iterator[Dict[str, Any]]:
+        """
+        逐页提取PDF内容的生成器
+        
+        每页提取完立即产出并释放该页缓存，内存占用与页数无关。
+        
+        Args:
+            file_path: PDF文件路径或文件对象
+            metadata: 可选的元数据字典，打开文件后写入页数和文档属性
+            engine: 提取引擎（见 PDF_ENGINES）
+            
+        Yields:
+            Dict: {"page": 页码, "total_pages": 总页数, "content": 带页标记的页面文本}，
+                无文本的页面 content 为空字符串
+        """
+        if metadata is None:
+            metadata = {}
+        metadata["extraction_method"] = engine
+        
+        if engine != "pdfplumber":
+            # 其他引擎的页数和文档属性由 pdfplumber 读取，不解析页面内容；读取失败时已带有错误前缀
+            metadata.update(FileProcessor._read_pdf_metadata(file_path))
+            metadata["extraction_method"] = engine
+            if not isinstance(file_path, str):
+                file_path.seek(0)
+        
+        try:
+            if engine == "pdfplumber":
+                # 使用pdfplumber提取PDF内容
+                with pdfplumber.open(file_path) as pdf:
+                    metadata["pages"] = len(pdf.pages)
+                    
+                    # 获取PDF元数据
+                    metadata.update(FileProcessor._pdf_properties(pdf))
+                    
+                    for page_num, page in enumerate(pdf.pages, 1):
+                        page_text = page.extract_text()
+                        page.flush_cache()
+                        
+                        yield {
+                            "page": page_num,
+                            "total_pages": metadata["pages"],
+                            "content": FileProcessor._format_page(page_num, page_text)
+                        }
+                return
+            
+            for page_num, page_text in FileProcessor._iter_pdf_page_texts(file_path, engine):
+                yield {
+                    "page": page_num,
+                    "total_pages": metadata["pages"],
+                    "content": FileProcessor._format_page(page_num, page_text)
+                }
+        
+        except Exception as e:
+            raise Exception(f"PDF提取失败: {str(e)}")
+    
+    async def stream_pdf_pages(self, file_path: str, metadata: Optional[Dict[str, Any]] = None,
+                               pdf_engine: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        异步逐页提取PDF内容
+        
+        在线程池中逐页推进生成器，每提取完一页立即产出，
+        调用方无需等待整个文档解析完成。
+        
+        Args:
+            file_path: PDF文件路径
+            metadata: 可选的元数据字典，打开文件后写入页数和文档属性
+            pdf_engine: PDF提取引擎，省略时使用默认引擎
+            
+        Yields:
+            Dict: 同 _iter_pdf_pages
+        """
+        engine, _ = await self.resolve_pdf_engine(file_path, pdf_engine)
+        pages = self._iter_pdf_pages(file_path, metadata, engine)
+        done = object()
+        future = None
+        
+        try:
+            while True:
+                future = self.executor.submit(next, pages, done)
+                with timed("parse_page"):
+                    page = await asyncio.wrap_future(future)
+                if page is done:
+                    break
+                yield page
+        finally:
+            if future is not None and not future.done():
+                # 调用方被取消时工作线程仍在推进生成器，等其完成后再关闭
+                future.add_done_callback(lambda _: pages.close())
+            else:
+                pages.close()
+    
     async def _extract_word_content(self, file_path: str) -> Dict[str, Any]:
         """
         提取Word文档内容
         """
         loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(self.executor, self._extract_word_sync, file_path)
+        return await loop.run_in_executor(self.extract_executor, FileProcessor._extract_word_sync, file_path)
     
-    def _extract_word_sync(self, file_path: str) -> Dict[str, Any]:
+    @staticmethod
+    def _extract_word_sync(file_path: str) -> Dict[str, Any]:
         """
         同步提取Word内容
         """
@@ -0,0 +1,580 @@
+"""
+异步任务队列
+长耗时的文档处理以任务形式提交，提交后立即返回任务 ID，由固定数量的后台
+worker 依次处理；调用方轮询任务状态或订阅进度事件获取结果。
+任务记录保存在本地 SQLite 中，结束的任务超过保留时间后自动清理
+"""
+
+import asyncio
+import functools
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Any, List, Optional, Callable, AsyncIterator
+
+from json_response import dumps_str
+
+
+# 任务状态
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+TERMINAL_STATUSES = (COMPLETED, FAILED, CANCELLED)
+
+
+class QueueFullError(Exception):
+    """任务队列已满，调用方应稍后重试"""
+
+
+class JobStore:
+    """
+    基于 SQLite 的任务记录存储
+    
+    progress、result、meta 以 JSON 文本保存。所有方法线程安全，
+    写入较大结果时可在线程池中调用。
+    """
+    
+    def __init__(self, db_path: str = ":memory:"):
+        """
+        初始化存储
+        
+        Args:
+            db_path: SQLite 数据库路径，":memory:" 表示仅保存在内存中
+        """
+        self.db_path = db_path
+        if db_path != ":memory:" and os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            if db_path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    expires_at REAL,
+                    progress TEXT,
+                    result TEXT,
+                    error TEXT,
+                    meta TEXT,
+                    owner TEXT
+                )
+                """
+            )
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "owner" not in columns:
+                # 旧版本创建的数据库没有 owner 列
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_expires ON jobs (expires_at)")
+    
+    def create(self, job_id: str, meta: Optional[Dict[str, Any]] = None, owner: Optional[str] = None):
+        """
+        新建排队中的任务
+        
+        Args:
+            job_id: 任务 ID
+            meta: 随任务保存的信息
+            owner: 处理该任务的实例标识（见 JobQueue.instance_id）
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, status, created_at, meta, owner) VALUES (?, ?, ?, ?, ?)",
+                (job_id, QUEUED, time.time(), dumps_str(meta or {}), owner)
+            )
+    
+    def update(self, job_id: str, expected_status: Optional[str] = None, **fields) -> bool:
+        """
+        更新任务字段
+        
+        Args:
+            job_id: 任务 ID
+            expected_status: 只在任务仍处于该状态时更新，用于状态切换时避免覆盖并发的修改
+            **fields: 要更新的列，progress / result 传入字典时自动序列化
+        
+        Returns:
+            bool: 是否有记录被更新
+        """
+        for key in ("progress", "result"):
+            if isinstance(fields.get(key), dict):
+                fields[key] = dumps_str(fields[key])
+        
+        columns = ", ".join(f"{key} = ?" for key in fields)
+        condition, params = "job_id = ?", [job_id]
+        if expected_status is not None:
+            condition += " AND status = ?"
+            params.append(expected_status)
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET {columns} WHERE {condition}",
+                (*fields.values(), *params)
+            )
+        return cursor.rowcount > 0
+    
+    def get(self, job_id: str, include_result: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        读取任务记录
+        
+        Args:
+            job_id: 任务 ID
+            include_result: 是否读取并解析处理结果
+        
+        Returns:
+            Optional[Dict]: 任务记录，不存在时返回 None
+        """
+        columns = "*" if include_result else (
+            "job_id, status, created_at, started_at, finished_at, expires_at, progress, error, meta"
+        )
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {columns} FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        
+        job = dict(row)
+        for key in ("progress", "result", "meta"):
+            if job.get(key) is not None:
+                job[key] = json.loads(job[key])
+        return job
+    
+    def delete(self, job_id: str) -> bool:
+        """删除任务记录"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+        return cursor.rowcount > 0
+    
+    def purge_expired(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        删除超过保留时间的任务
+        
+        Returns:
+            List[Dict]: 被删除的任务 {"job_id": 任务 ID, "result": 处理结果，无结果时为 None}，
+                供调用方清理结果引用的文件
+        """
+        now = time.time() if now is None else now
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT job_id, result FROM jobs WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)
+            ).fetchall()
+            self._conn.execute(
+                "DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)
+            )
+        return [
+            {"job_id": row["job_id"], "result": json.loads(row["result"]) if row["result"] else None}
+            for row in rows
+        ]
+    
+    def fail_unfinished(self, error: str, ttl: float,
+                        owner_alive: Optional[Callable[[Optional[str]], bool]] = None) -> int:
+        """
+        将未结束的任务标记为失败（用于服务重启后清理中断的任务）
+        
+        Args:
+            error: 写入任务的错误信息
+            ttl: 任务结束后保留的秒数
+            owner_alive: 判断任务所属实例是否仍在运行，运行中实例的任务保持不变；
+                省略时处理全部未结束的任务
+        
+        Returns:
+            int: 受影响的任务数
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT job_id, owner FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            ).fetchall()
+            job_ids = [
+                row["job_id"] for row in rows
+                if owner_alive is None or not owner_alive(row["owner"])
+            ]
+            self._conn.executemany(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ?, expires_at = ? "
+                "WHERE job_id = ? AND status IN (?, ?)",
+                [(FAILED, error, now, now + ttl, job_id, QUEUED, RUNNING) for job_id in job_ids]
+            )
+        return len(job_ids)
+    
+    def counts(self) -> Dict[str, int]:
+        """按状态统计任务数"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) AS count FROM jobs GROUP BY status"
+            ).fetchall()
+        return {row["status"]: row["count"] for row in rows}
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JobQueue:
+    """
+    有界异步任务队列
+    
+    handler 接收任务参数，返回异步事件迭代器，事件格式与
+    LegalDocumentAnonymizerAgent.process_document_stream 一致：
+    progress 事件更新任务进度，complete 事件携带 result，error 事件携带 message。
+    排队任务数达到 max_pending 时拒绝新任务，由调用方返回 503 实现背压。
+    
+    多个服务进程（如 uvicorn 多 worker 或滚动重启）可共用同一个数据库：每个任务记录
+    所属实例（主机名:进程号），启动时只把所属进程已不存在的未结束任务标记为失败。
+    
+    协程方法中的数据库读写都在线程池中执行，不阻塞事件循环；同步方法 get / stats
+    供调用方放到线程池中调用。
+    """
+    
+    def __init__(self, handler: Callable[[Dict[str, Any]], AsyncIterator[Dict[str, Any]]],
+                 store: Optional[JobStore] = None, workers: int = 2, max_pending: int = 32,
+                 ttl: float = 3600, on_discard: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 on_delete: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        初始化任务队列
+        
+        Args:
+            handler: 任务处理函数
+            store: 任务记录存储，默认使用内存 SQLite
+            workers: 并发处理的任务数
+            max_pending: 最多排队的任务数
+            ttl: 任务结束后保留的秒数
+            on_discard: 任务未被处理即丢弃（取消或服务关闭）时的回调，用于清理上传文件
+            on_delete: 已结束的任务记录被删除（过期清理或调用方删除）时以处理结果调用，
+                用于清理结果引用的导出文件；失败的任务没有结果，不调用
+        """
+        self.handler = handler
+        self.store = store if store is not None else JobStore()
+        self.workers = workers
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self.on_discard = on_discard
+        self.on_delete = on_delete
+        self.instance_id = f"{socket.gethostname()}:{os.getpid()}"
+        
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._progress: Dict[str, Dict[str, Any]] = {}
+        self._subscribers: Dict[str, set] = {}
+        self._running = 0
+    
+    @classmethod
+    def from_env(cls, handler: Callable[[Dict[str, Any]], AsyncIterator[Dict[str, Any]]],
+                 on_discard: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 on_delete: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 default_db_path: str = os.path.join("data", "jobs.db")) -> "JobQueue":
+        """
+        根据环境变量创建任务队列
+        
+        JOB_DB_PATH: SQLite 数据库路径，默认 default_db_path
+        JOB_WORKERS: 并发处理的任务数，默认 2
+        JOB_QUEUE_SIZE: 最多排队的任务数，默认 32
+        JOB_TTL_SECONDS: 任务结束后保留的秒数，默认 3600
+        """
+        return cls(
+            handler,
+            store=JobStore(os.getenv("JOB_DB_PATH", default_db_path)),
+            workers=int(os.getenv("JOB_WORKERS", "2")),
+            max_pending=int(os.getenv("JOB_QUEUE_SIZE", "32")),
+            ttl=float(os.getenv("JOB_TTL_SECONDS", "3600")),
+            on_discard=on_discard,
+            on_delete=on_delete,
+        )
+    
+    async def start(self):
+        """启动 worker 和过期清理任务"""
+        if self._tasks:
+            return
+        # 已退出的进程留下的未结束任务无法恢复，其他仍在运行的进程的任务不受影响
+        await self._in_thread(self.store.fail_unfinished, "服务重启，任务已中断", self.ttl, self._owner_alive)
+        
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._cleanup_loop()))
+    
+    async def stop(self):
+        """停止 worker，丢弃仍在排队的任务"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        
+        while self._queue is not None and not self._queue.empty():
+            job_id, payload = self._queue.get_nowait()
+            await self._discard(job_id, payload, "服务关闭，任务已取消")
+    
+    @staticmethod
+    async def _in_thread(func: Callable, *args, **kwargs):
+        """在线程池中执行数据库读写"""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+    
+    @staticmethod
+    def _owner_alive(owner: Optional[str]) -> bool:
+        """任务所属实例是否仍在运行；其他主机上的实例无法判断，视为运行中"""
+        if not owner:
+            return False
+        host, _, pid = owner.rpartition(":")
+        if host != socket.gethostname():
+            return True
+        if not pid.isdigit() or int(pid) == os.getpid():
+            # 本进程刚启动，同一进程号的记录来自已退出的旧进程
+            return False
+        if os.name == "nt":
+            # Windows 下 os.kill 会结束目标进程，无法用来探测，按已退出处理
+            return False
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+    
+    @property
+    def full(self) -> bool:
+        """排队任务数是否已达上限"""
+        return self._queue is not None and self._queue.full()
+    
+    @property
+    def pending(self) -> int:
+        """排队等待执行的任务数"""
+        return self._queue.qsize() if self._queue is not None else 0
+    
+    async def submit(self, payload: Dict[str, Any], meta: Optional[Dict[str, Any]] = None) -> str:
+        """
+        提交任务
+        
+        Args:
+            payload: 传给 handler 的任务参数
+            meta: 随任务记录保存、查询时原样返回的信息
+        
+        Returns:
+            str: 任务 ID
+        
+        Raises:
+            QueueFullError: 排队任务数已达上限
+            RuntimeError: 任务队列尚未启动或已停止
+        """
+        if self._queue is None:
+            raise RuntimeError("任务队列尚未启动")
+        if self._queue.full():
+            raise QueueFullError(f"任务队列已满（{self.max_pending}），请稍后重试")
+        
+        job_id = str(uuid.uuid4())
+        await self._in_thread(self.store.create, job_id, meta, owner=self.instance_id)
+        # 写入记录期间队列可能已满或已停止
+        try:
+            if self._queue is None or not self._tasks:
+                raise RuntimeError("任务队列已停止")
+            self._queue.put_nowait((job_id, payload))
+        except asyncio.QueueFull:
+            await self._in_thread(self.store.delete, job_id)
+            raise QueueFullError(f"任务队列已满（{self.max_pending}），请稍后重试")
+        except RuntimeError:
+            await self._in_thread(self.store.delete, job_id)
+            raise
+        return job_id
+    
+    def get(self, job_id: str, include_result: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        查询任务状态（同步读数据库，调用方在线程池中执行）
+        
+        Returns:
+            Optional[Dict]: 任务记录，运行中的任务附带最新进度；不存在时返回 None
+        """
+        job = self.store.get(job_id, include_result)
+        if job is not None and job_id in self._progress:
+            job["progress"] = self._progress[job_id]
+        return job
+    
+    async def cancel(self, job_id: str) -> Optional[str]:
+        """
+        取消排队中的任务或删除已结束的任务
+        
+        Returns:
+            Optional[str]: 操作前的任务状态，任务不存在时返回 None；
+                运行中的任务不能取消，原样返回 running
+        """
+        job = await self._in_thread(self.store.get, job_id, include_result=False)
+        if job is None:
+            return None
+        
+        if job["status"] == QUEUED:
+            # worker 从队列取出时检查状态并跳过；读取之后任务可能已开始处理
+            if not await self._in_thread(self._finish, job_id, CANCELLED, error="任务已取消",
+                                         expected_status=QUEUED):
+                return RUNNING
+            self._publish(job_id, self._terminal_event(job_id, CANCELLED, "任务已取消"))
+        elif job["status"] in TERMINAL_STATUSES:
+            await self._in_thread(self._delete, job_id)
+        return job["status"]
+    
+    async def events(self, job_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        订阅任务事件，直到任务结束
+        
+        首个事件为当前状态快照，之后依次为 progress 事件和一个结束事件
+        （complete / error / cancelled，不含处理结果，结果通过 get 查询）。
+        
+        Yields:
+            Dict: 任务事件
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        try:
+            job = await self._in_thread(self.get, job_id, include_result=False)
+            if job is None:
+                return
+            if job["status"] in TERMINAL_STATUSES:
+                yield self._terminal_event(job_id, job["status"], job.get("error"))
+                return
+            
+            yield {"type": "status", "job_id": job_id, "status": job["status"],
+                   "progress": job.get("progress")}
+            while True:
+                event = await queue.get()
+                yield event
+                if event["type"] in ("complete", "error", "cancelled"):
+                    return
+        finally:
+            subscribers = self._subscribers.get(job_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[job_id]
+    
+    def stats(self) -> Dict[str, Any]:
+        """队列统计信息"""
+        return {
+            "workers": self.workers,
+            "running": self._running,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "jobs": self.store.counts(),
+        }
+    
+    def _publish(self, job_id: str, event: Dict[str, Any]):
+        for queue in self._subscribers.get(job_id, ()):
+            queue.put_nowait(event)
+    
+    @staticmethod
+    def _terminal_event(job_id: str, status: str, error: Optional[str] = None) -> Dict[str, Any]:
+        event_type = {COMPLETED: "complete", FAILED: "error", CANCELLED: "cancelled"}[status]
+        event = {"type": event_type, "job_id": job_id, "status": status}
+        if error:
+            event["message"] = error
+        return event
+    
+    def _finish(self, job_id: str, status: str, result: Optional[str] = None,
+                error: Optional[str] = None, expected_status: Optional[str] = None) -> bool:
+        """写入结束状态，调用方在线程池中执行"""
+        now = time.time()
+        return self.store.update(
+            job_id, expected_status, status=status, result=result, error=error,
+            finished_at=now, expires_at=now + self.ttl
+        )
+    
+    async def _discard(self, job_id: str, payload: Dict[str, Any], error: str):
+        if self.on_discard is not None:
+            self.on_discard(payload)
+        # 已取消或已删除的任务不受影响
+        await self._in_thread(self._finish, job_id, CANCELLED, error=error, expected_status=QUEUED)
+        self._publish(job_id, self._terminal_event(job_id, CANCELLED, error))
+    
+    async def _worker(self):
+        while True:
+            job_id, payload = await self._queue.get()
+            try:
+                # 仅在任务仍在排队时切换为运行中，与 cancel 的状态切换互斥
+                started = await self._in_thread(
+                    self.store.update, job_id, QUEUED, status=RUNNING, started_at=time.time()
+                )
+                if not started:
+                    await self._discard(job_id, payload, "任务已取消")
+                    continue
+                
+                self._running += 1
+                try:
+                    await self._run(job_id, payload)
+                finally:
+                    self._running -= 1
+            finally:
+                self._queue.task_done()
+    
+    async def _run(self, job_id: str, payload: Dict[str, Any]):
+        self._publish(job_id, {"type": "status", "job_id": job_id, "status": RUNNING})
+        
+        result = None
+        error = None
+        try:
+            async for event in self.handler(payload):
+                event_type = event.get("type")
+                if event_type == "progress":
+                    self._progress[job_id] = event
+                    self._publish(job_id, {"job_id": job_id, **event})
+                    # 逐页进度只保存在内存中，步骤变化时才写入数据库
+                    if "page" not in event:
+                        await self._in_thread(self.store.update, job_id, progress=event)
+                elif event_type == "complete":
+                    result = event["result"]
+                elif event_type == "error":
+                    error = event.get("message", "处理失败")
+        except asyncio.CancelledError:
+            error = "服务关闭，任务已中断"
+            raise
+        except Exception as e:
+            error = f"处理过程中发生错误: {str(e)}"
+        finally:
+            self._progress.pop(job_id, None)
+            status = FAILED if error is not None or result is None else COMPLETED
+            if status == FAILED and error is None:
+                error = "处理未返回结果"
+            
+            # 结果可能很大，在线程池中序列化并写入
+            loop = asyncio.get_event_loop()
+            finish = loop.run_in_executor(
+                None, lambda: self._finish(
+                    job_id, status,
+                    result=dumps_str(result) if result is not None else None,
+                    error=error
+                )
+            )
+            await asyncio.shield(finish)
+            self._publish(job_id, self._terminal_event(job_id, status, error))
+    
+    def _delete(self, job_id: str):
+        """删除已结束的任务及其结果引用的文件，在线程池中执行"""
+        job = self.store.get(job_id)
+        if self.store.delete(job_id) and job is not None and job.get("result") is not None:
+            self._release(job["result"])
+    
+    def _purge_expired(self):
+        """删除过期任务及其结果引用的文件，在线程池中执行"""
+        for job in self.store.purge_expired():
+            if job["result"] is not None:
+                self._release(job["result"])
+    
+    def _release(self, result: Dict[str, Any]):
+        if self.on_delete is not None:
+            try:
+                self.on_delete(result)
+            except Exception:
+                pass  # 清理失败不影响任务记录的删除
+    
+    async def _cleanup_loop(self):
+        interval = max(1.0, min(self.ttl, 60.0))
+        while True:
+            await asyncio.sleep(interval)
+            await self._in_thread(self._purge_expired)
@@ -0,0 +1,88 @@
+"""
+高性能 JSON 序列化
+优先使用 orjson 编码响应，未安装时回退到标准库 json，
+两种后端输出的 JSON 语义一致（UTF-8、不转义中文、紧凑分隔符，NaN 和无穷大输出为 null）
+"""
+
+import json
+import math
+import os
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+from metrics import timed
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖
+    orjson = None
+
+
+# JSON_BACKEND: auto（默认，有 orjson 时使用）/ orjson / stdlib
+JSON_BACKEND = os.getenv("JSON_BACKEND", "auto").lower()
+
+if JSON_BACKEND == "orjson" and orjson is None:
+    raise ImportError("JSON_BACKEND=orjson 需要安装 orjson")
+
+USE_ORJSON = orjson is not None and JSON_BACKEND != "stdlib"
+
+
+def _replace_non_finite(content: Any) -> Any:
+    """把 NaN 和无穷大替换为 None，与 orjson 的输出一致"""
+    if isinstance(content, float):
+        return content if math.isfinite(content) else None
+    if isinstance(content, dict):
+        return {key: _replace_non_finite(value) for key, value in content.items()}
+    if isinstance(content, (list, tuple)):
+        return [_replace_non_finite(value) for value in content]
+    return content
+
+
+def stdlib_dumps(content: Any) -> bytes:
+    """使用标准库序列化，参数与 JSONResponse 默认行为一致；NaN 和无穷大输出为 null"""
+    options = dict(ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"))
+    try:
+        return json.dumps(content, **options).encode("utf-8")
+    except ValueError as e:
+        if "Out of range float" not in str(e):
+            raise
+        # 只在含 NaN 或无穷大时才遍历替换，常规响应没有额外开销
+        return json.dumps(_replace_non_finite(content), **options).encode("utf-8")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    序列化为 UTF-8 编码的 JSON
+    
+    Args:
+        content: 可 JSON 序列化的对象
+    
+    Returns:
+        bytes: JSON 字节串
+    """
+    with timed("serialize"):
+        if USE_ORJSON:
+            try:
+                return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+            except TypeError:
+                # orjson 不支持的类型（如整数超出 64 位）交给标准库处理
+                pass
+        return stdlib_dumps(content)
+
+
+def dumps_str(content: Any) -> str:
+    """序列化为 JSON 字符串（用于 SSE 等文本协议）"""
+    return dumps(content).decode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """使用 dumps 编码的 JSONResponse，可直接替换 JSONResponse"""
+    
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def backend_name() -> str:
+    """当前使用的序列化后端名称"""
+    return "orjson" if USE_ORJSON else "stdlib"
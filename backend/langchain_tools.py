@@ -3,13 +3,12 @@ LangChain 工具模块
 为法律文件脱敏智能体提供可调用的工具
 """
 
-from langchain.tools import tool
 from typing import Dict, List, Any, Optional, Union
 from file_processor import FileProcessor
-from rule_anonymizer import RuleAnonymizer
+from pipeline import AnonymizePipeline
+from rule_anonymizer import get_anonymizer, apply_masks
+import functools
 import json
-import os
-import aiofiles
 from datetime import datetime
 
 
@@ -18,33 +17,25 @@ class DocumentAnonymizerTools:
     
     def __init__(self):
         self.file_processor = FileProcessor()
-        self.rule_anonymizer = RuleAnonymizer()
+        self.rule_anonymizer = get_anonymizer()
+        self.pipeline = AnonymizePipeline(self.file_processor)
     
-    async def parse_document(self, file_path: str) -> Dict[str, Any]:
+    async def parse_document(self, file_path: str, content_hash: Optional[str] = None) -> Dict[str, Any]:
         """
         解析文档并提取文本内容
         
         Args:
             file_path: 文档文件路径
+            content_hash: 文件内容的 SHA-256（可选，用于解析结果缓存）
             
         Returns:
             Dict: 包含提取的文本内容和元数据
         """
         try:
-            # 根据文件扩展名确定内容类型
-            file_ext = os.path.splitext(file_path)[1].lower()
-            content_type_map = {
-                '.pdf': 'application/pdf',
-                '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-                '.doc': 'application/msword'
-            }
-            
-            content_type = content_type_map.get(file_ext)
-            if not content_type:
-                raise ValueError(f"不支持的文件类型: {file_ext}")
+            content_type = self.pipeline.content_type_for(file_path)
             
             # 提取文档内容
-            result = await self.file_processor.extract_content(file_path, content_type)
+            result = await self.pipeline.parse(file_path, content_type, content_hash)
             
             return {
                 "success": True,
@@ -75,26 +66,17 @@ class DocumentAnonymizerTools:
             Dict: 包含提取的实体列表
         """
         try:
-            # 创建脱敏器实例
-            if enabled_rules:
-                anonymizer = RuleAnonymizer(enabled_rules=set(enabled_rules))
-            else:
-                anonymizer = self.rule_anonymizer
+            # 获取指定规则集的脱敏器
+            anonymizer = get_anonymizer(enabled_rules)
             
             # 提取敏感实体
-            entities = anonymizer.extract_entities(text)
-            
-            # 统计实体类型
-            entity_stats = {}
-            for entity in entities:
-                entity_type = entity['type']
-                entity_stats[entity_type] = entity_stats.get(entity_type, 0) + 1
+            entities = anonymizer.find_entities(text)
             
             return {
                 "success": True,
-                "entities": entities,
+                "entities": entities.to_dicts(),
                 "entity_count": len(entities),
-                "entity_statistics": entity_stats,
+                "entity_statistics": entities.counts(),
                 "enabled_rules": enabled_rules or list(anonymizer.get_enabled_rules()),
                 "text_length": len(text),
                 "timestamp": datetime.now().isoformat()
@@ -134,32 +116,16 @@ class DocumentAnonymizerTools:
                     "timestamp": datetime.now().isoformat()
                 }
             
-            # 从后往前替换，避免位置偏移
-            masked_text = text
-            entities_sorted = sorted(mapped_entities, key=lambda x: x.get("start", 0), reverse=True)
+            valid_entities = [
+                entity for entity in mapped_entities
+                if all(key in entity for key in ["start", "end", "original"])
+            ]
+            processed_count = len(valid_entities)
             
-            processed_count = 0
-            for entity in entities_sorted:
-                if not all(key in entity for key in ["start", "end", "original"]):
-                    continue
-                    
-                start, end = entity["start"], entity["end"]
-                original = entity["original"]
-                
-                # 计算脱敏规则
-                if len(original) <= keep_prefix + keep_suffix:
-                    # 如果字符串太短，全部用遮罩字符
-                    masked = mask_char * len(original)
-                else:
-                    # 保留前缀和后缀，中间用遮罩字符
-                    prefix = original[:keep_prefix]
-                    suffix = original[-keep_suffix:] if keep_suffix > 0 else ""
-                    middle_length = len(original) - keep_prefix - keep_suffix
-                    masked = prefix + mask_char * middle_length + suffix
-                
-                # 替换文本
-                masked_text = masked_text[:start] + masked + masked_text[end:]
-                processed_count += 1
+            # 单遍拼接生成脱敏文本；逆序传入使同一起点的实体以列表中靠后者为准
+            masked_text = apply_masks(
+                text, valid_entities[::-1], mask_char, keep_prefix, keep_suffix
+            )
             
             return {
                 "success": True,
@@ -196,29 +162,8 @@ class DocumentAnonymizerTools:
             Dict: 导出结果信息
         """
         try:
-            # 确保导出目录存在
-            os.makedirs(export_dir, exist_ok=True)
-            
-            # 生成唯一文件名
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            name, ext = os.path.splitext(filename)
-            if not ext:
-                ext = ".txt"
-            
-            export_filename = f"{name}_anonymized_{timestamp}{ext}"
-            export_path = os.path.join(export_dir, export_filename)
-            
-            # 写入文件
-            async with aiofiles.open(export_path, 'w', encoding='utf-8') as f:
-                await f.write(content)
-            
-            return {
-                "success": True,
-                "export_path": export_path,
-                "export_filename": export_filename,
-                "file_size": len(content.encode('utf-8')),
-                "timestamp": datetime.now().isoformat()
-            }
+            export_info = await self.pipeline.export(content, filename, export_dir)
+            return {"success": True, **export_info}
             
         except Exception as e:
             return {
@@ -231,8 +176,7 @@ class DocumentAnonymizerTools:
 # 创建全局工具实例
 _tools_instance = DocumentAnonymizerTools()
 
-# 定义 LangChain 工具
-@tool
+# LangChain 工具函数，由 get_anonymizer_tools 包装为 LangChain 工具
 async def parse_document(file_path: str) -> Dict[str, Any]:
     """
     解析文档文件并提取文本内容
@@ -245,7 +189,6 @@ async def parse_document(file_path: str) -> Dict[str, Any]:
     return await _tools_instance.parse_document(file_path)
 
 
-@tool 
 def rule_anonymizer(text: str, enabled_rules: Optional[List[str]] = None) -> Dict[str, Any]:
     """
     使用规则从文本中提取敏感实体
@@ -259,7 +202,6 @@ def rule_anonymizer(text: str, enabled_rules: Optional[List[str]] = None) -> Dic
     return _tools_instance.rule_anonymizer_extract(text, enabled_rules)
 
 
-@tool
 def replace_text(text: str, mapped_entities: str, mask_char: str = "●", 
                 keep_prefix: int = 2, keep_suffix: int = 2) -> Dict[str, Any]:
     """
@@ -291,7 +233,6 @@ def replace_text(text: str, mapped_entities: str, mask_char: str = "●",
         }
 
 
-@tool
 async def export_file(content: str, filename: str, export_dir: str = "exports") -> Dict[str, Any]:
     """
     导出脱敏后的内容到文件
@@ -306,5 +247,19 @@ async def export_file(content: str, filename: str, export_dir: str = "exports")
     return await _tools_instance.export_file(content, filename, export_dir)
 
 
-# 导出工具列表
-ANONYMIZER_TOOLS = [parse_document, rule_anonymizer, replace_text, export_file]
+@functools.lru_cache(maxsize=None)
+def get_anonymizer_tools() -> List[Any]:
+    """
+    创建 LangChain 工具列表
+    
+    首次调用时才导入 LangChain，只使用脱敏流水线的进程不需要加载 LangChain。
+    """
+    from langchain.tools import tool
+    return [tool(func) for func in (parse_document, rule_anonymizer, replace_text, export_file)]
+
+
+def __getattr__(name: str):
+    # 兼容原有的 ANONYMIZER_TOOLS 模块属性，访问时才创建工具列表
+    if name == "ANONYMIZER_TOOLS":
+        return get_anonymizer_tools()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
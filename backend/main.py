@@ -1,16 +1,35 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import aiofiles
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
+import asyncio
+import functools
 import os
 from datetime import datetime
 import uuid
-from file_processor import FileProcessor
-from rule_anonymizer import RuleAnonymizer, quick_extract, quick_anonymize
+from urllib.parse import quote
+from file_processor import FileProcessor, PDF_ENGINE_CHOICES
+from upload_storage import UploadLimitMiddleware, save_upload
+from pipeline import AnonymizePipeline, parse_config
+from archive_processor import anonymize_archive, list_entries
+from json_response import FastJSONResponse, backend_name, dumps_str
+import metrics
+from response_options import ResponseOptions, parse_fields, format_entities, shape_response
+from rule_anonymizer import get_anonymizer
 from typing import Dict, Any, List, Optional
 from pydantic import BaseModel
 
-app = FastAPI(title="法律文件脱敏智能体", version="1.0.0")
+app = FastAPI(
+    title="法律文件脱敏智能体",
+    version="1.0.0",
+    default_response_class=FastJSONResponse
+)
+
+# 上传压缩包的最大字节数
+MAX_ARCHIVE_BYTES = int(os.getenv("MAX_ARCHIVE_BYTES", 2 * 1024 * 1024 * 1024))
+
+# 声明长度超出上限的上传在读取请求体之前返回 413（放在 CORS 内层，错误响应仍带跨域头）
+app.add_middleware(UploadLimitMiddleware, path_limits={"/api/upload/archive": MAX_ARCHIVE_BYTES})
 
 # 配置CORS
 app.add_middleware(
@@ -25,13 +44,28 @@ app.add_middleware(
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+# 批量脱敏总字符数达到该值且解析器使用进程池时，分发到工作进程并行处理
+BATCH_PARALLEL_CHARS = 2 * 1024 * 1024
+
 # 初始化文件处理器和脱敏器
 file_processor = FileProcessor()
-rule_anonymizer = RuleAnonymizer()
+rule_anonymizer = get_anonymizer()
+pipeline = AnonymizePipeline(file_processor)
+
+# 运行指标：请求耗时、各阶段耗时和执行器排队任务数，在 /metrics 输出
+metrics.install(app, file_processor)
+
+
+@app.on_event("shutdown")
+async def shutdown_executors():
+    """关闭文档解析执行器"""
+    file_processor.shutdown()
 
 
 # 请求模型
-class AnonymizeRequest(BaseModel):
+class AnonymizeRequest(ResponseOptions):
     text: str
     enabled_rules: Optional[List[str]] = None
     mask_char: str = '*'
@@ -39,7 +73,16 @@ class AnonymizeRequest(BaseModel):
     keep_suffix: int = 2
 
 
-class ExtractRequest(BaseModel):
+class BatchAnonymizeRequest(ResponseOptions):
+    """批量文本脱敏请求"""
+    texts: List[str]
+    enabled_rules: Optional[List[str]] = None
+    mask_char: str = '*'
+    keep_prefix: int = 2
+    keep_suffix: int = 2
+
+
+class ExtractRequest(ResponseOptions):
     text: str
     enabled_rules: Optional[List[str]] = None
 
@@ -56,30 +99,27 @@ async def root():
     return {"message": "法律文件脱敏智能体 API"}
 
 @app.post("/api/upload")
-async def upload_file(file: UploadFile = File(...), config: str = '{}'):
+async def upload_file(
+    file: UploadFile = File(...),
+    config: str = '{}',
+    include_original: bool = Query(True, description="是否返回原文"),
+    entity_format: str = Query("full", description="实体格式: full / offsets"),
+    fields: Optional[str] = Query(None, description="只返回指定字段，逗号分隔"),
+    pdf_engine: Optional[str] = Query(None, description="PDF提取引擎: auto / pdfplumber / pdfminer / pypdf，默认按服务配置")
+):
     """
     上传文件并提取内容，自动进行脱敏处理
     支持PDF和Word文档
     """
     try:
+        if pdf_engine is not None and pdf_engine not in PDF_ENGINE_CHOICES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"不支持的PDF提取引擎: {pdf_engine}，可选: {', '.join(PDF_ENGINE_CHOICES)}"
+            )
+        
         # 解析脱敏配置
-        try:
-            import json
-            config_dict = json.loads(config) if config else {}
-            anonymize_config = {
-                'enabled_rules': config_dict.get('enabled_rules'),
-                'mask_char': config_dict.get('mask_char', '●'),
-                'keep_prefix': config_dict.get('keep_prefix', 2),
-                'keep_suffix': config_dict.get('keep_suffix', 2)
-            }
-        except:
-            # 使用默认配置
-            anonymize_config = {
-                'enabled_rules': None,
-                'mask_char': '●',
-                'keep_prefix': 2,
-                'keep_suffix': 2
-            }
+        anonymize_config = parse_config(config)
         
         # 检查文件类型
         allowed_types = {
@@ -100,14 +140,14 @@ async def upload_file(file: UploadFile = File(...), config: str = '{}'):
         filename = f"{file_id}{file_extension}"
         file_path = os.path.join(UPLOAD_DIR, filename)
         
-        # 保存文件
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
+        # 分块保存文件，同时计算摘要
+        file_size, content_hash = await save_upload(file, file_path)
         
         # 提取文件内容
         try:
-            extracted_content = await file_processor.extract_content(file_path, file.content_type)
+            extracted_content = await pipeline.parse(
+                file_path, file.content_type, content_hash=content_hash, pdf_engine=pdf_engine
+            )
         except Exception as e:
             # 删除已保存的文件
             if os.path.exists(file_path):
@@ -117,30 +157,11 @@ async def upload_file(file: UploadFile = File(...), config: str = '{}'):
         # 对提取的文本进行脱敏处理
         original_text = extracted_content["content"]
         try:
-            # 创建脱敏器（根据配置）
-            if anonymize_config['enabled_rules']:
-                anonymizer = RuleAnonymizer(enabled_rules=set(anonymize_config['enabled_rules']))
-            else:
-                anonymizer = rule_anonymizer
-            
-            # 提取敏感实体
-            sensitive_entities = anonymizer.extract_entities(original_text)
-            
-            # 执行脱敏处理
-            anonymized_text, _ = anonymizer.anonymize_text(
-                original_text,
-                mask_char=anonymize_config['mask_char'],
-                keep_prefix=anonymize_config['keep_prefix'],
-                keep_suffix=anonymize_config['keep_suffix']
-            )
+            # 单遍提取敏感实体并执行脱敏处理
+            anonymized_text, sensitive_entities = pipeline.anonymize(original_text, anonymize_config)
             
             # 统计敏感信息
-            entity_stats = {}
-            for entity in sensitive_entities:
-                entity_type = entity['type']
-                if entity_type not in entity_stats:
-                    entity_stats[entity_type] = 0
-                entity_stats[entity_type] += 1
+            entity_stats = sensitive_entities.counts()
                 
         except Exception as e:
             # 如果脱敏失败，使用原文本，但记录错误
@@ -154,7 +175,7 @@ async def upload_file(file: UploadFile = File(...), config: str = '{}'):
             "file_id": file_id,
             "filename": file.filename,
             "content_type": file.content_type,
-            "size": len(content),
+            "size": file_size,
             "upload_time": datetime.now().isoformat(),
             "original_content": original_text,
             "anonymized_content": anonymized_text,
@@ -171,7 +192,18 @@ async def upload_file(file: UploadFile = File(...), config: str = '{}'):
             "message": f"成功提取并脱敏文件内容，原文 {len(original_text)} 字符，发现 {len(sensitive_entities)} 个敏感实体"
         }
         
-        return JSONResponse(content=result)
+        options = ResponseOptions(
+            include_original=include_original,
+            entity_format=entity_format,
+            fields=parse_fields(fields)
+        )
+        result = shape_response(
+            result, options,
+            original_keys=("original_content",),
+            entity_keys=("sensitive_entities",)
+        )
+        
+        return FastJSONResponse(content=result)
         
     except HTTPException:
         raise
@@ -185,6 +217,151 @@ async def upload_file(file: UploadFile = File(...), config: str = '{}'):
             except:
                 pass  # 忽略删除失败
 
+@app.post("/api/upload/archive")
+async def upload_archive(
+    file: UploadFile = File(...),
+    config: str = '{}'
+):
+    """
+    上传 ZIP 压缩包批量脱敏
+    压缩包中的 PDF 和 Word 文档并行解析脱敏，以 ZIP 流式返回脱敏文本和 manifest.json
+    """
+    # 解析脱敏配置
+    anonymize_config = parse_config(config)
+    
+    file_path = os.path.join(UPLOAD_DIR, f"{uuid.uuid4()}.zip")
+    
+    def remove_upload():
+        if os.path.exists(file_path):
+            try:
+                os.remove(file_path)
+            except:
+                pass  # 忽略删除失败
+    
+    try:
+        await save_upload(file, file_path, max_bytes=MAX_ARCHIVE_BYTES)
+        entries = list_entries(file_path)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        remove_upload()
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        remove_upload()
+        raise HTTPException(status_code=500, detail=f"压缩包保存失败: {str(e)}")
+    
+    name, _ = os.path.splitext(os.path.basename(file.filename or "archive.zip"))
+    download_name = quote(f"{name}_脱敏结果.zip")
+    # 上传文件由响应结束后的后台任务清理，客户端在首次迭代前断开时生成器体不会执行
+    return StreamingResponse(
+        anonymize_archive(file_path, file_processor, anonymize_config, entries=entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{download_name}"},
+        background=BackgroundTask(remove_upload)
+    )
+
+@app.post("/api/upload/docx")
+async def upload_docx(
+    file: UploadFile = File(...),
+    config: str = '{}'
+):
+    """
+    上传 Word 文档，在原文档上脱敏后返回 .docx
+    保留段落、表格和字体格式，实体统计见响应头 X-Entity-Statistics
+    """
+    # 解析脱敏配置
+    anonymize_config = parse_config(config)
+    
+    if file.content_type != DOCX_TYPE:
+        raise HTTPException(status_code=400, detail="不支持的文件类型。仅支持 .docx 格式的Word文档")
+    
+    file_path = os.path.join(UPLOAD_DIR, f"{uuid.uuid4()}.docx")
+    output_path = None
+    
+    def remove_files():
+        for path in (file_path, output_path):
+            if path and os.path.exists(path):
+                try:
+                    os.remove(path)
+                except:
+                    pass  # 忽略删除失败
+    
+    try:
+        await save_upload(file, file_path)
+        export = await pipeline.redact_docx(file_path, anonymize_config, export_dir=UPLOAD_DIR)
+        output_path = export["export_path"]
+    except HTTPException:
+        remove_files()
+        raise
+    except Exception as e:
+        remove_files()
+        raise HTTPException(status_code=500, detail=f"Word文档脱敏失败: {str(e)}")
+    
+    name, _ = os.path.splitext(os.path.basename(file.filename or "document.docx"))
+    download_name = quote(f"{name}_脱敏结果.docx")
+    return FileResponse(
+        output_path,
+        media_type=DOCX_TYPE,
+        headers={
+            "Content-Disposition": f"attachment; filename*=UTF-8''{download_name}",
+            "X-Entity-Statistics": dumps_str(export["entity_statistics"]),
+            "X-Entities-Count": str(export["entities_count"]),
+        },
+        background=BackgroundTask(remove_files)
+    )
+
+@app.post("/api/upload/pdf")
+async def upload_pdf(
+    file: UploadFile = File(...),
+    config: str = '{}'
+):
+    """
+    上传 PDF 文档，删除敏感文字并涂黑后返回遮盖后的 PDF
+    版式不变，实体统计见响应头 X-Entity-Statistics
+    """
+    # 解析脱敏配置
+    anonymize_config = parse_config(config)
+    
+    if file.content_type != "application/pdf":
+        raise HTTPException(status_code=400, detail="不支持的文件类型。仅支持PDF文档")
+    
+    file_path = os.path.join(UPLOAD_DIR, f"{uuid.uuid4()}.pdf")
+    output_path = None
+    
+    def remove_files():
+        for path in (file_path, output_path):
+            if path and os.path.exists(path):
+                try:
+                    os.remove(path)
+                except:
+                    pass  # 忽略删除失败
+    
+    try:
+        _, content_hash = await save_upload(file, file_path)
+        result = await pipeline.redact_pdf(
+            file_path, anonymize_config, content_hash=content_hash, export_dir=UPLOAD_DIR
+        )
+        output_path = result.export["export_path"]
+    except HTTPException:
+        remove_files()
+        raise
+    except Exception as e:
+        remove_files()
+        raise HTTPException(status_code=500, detail=f"PDF遮盖失败: {str(e)}")
+    
+    name, _ = os.path.splitext(os.path.basename(file.filename or "document.pdf"))
+    download_name = quote(f"{name}_脱敏结果.pdf")
+    return FileResponse(
+        output_path,
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f"attachment; filename*=UTF-8''{download_name}",
+            "X-Entity-Statistics": dumps_str(result.statistics),
+            "X-Entities-Count": str(len(result.entities)),
+        },
+        background=BackgroundTask(remove_files)
+    )
+
 @app.post("/api/extract-entities")
 async def extract_entities(request: ExtractRequest):
     """
@@ -192,17 +369,21 @@ async def extract_entities(request: ExtractRequest):
     """
     try:
         # 使用指定规则或默认规则
-        entities = quick_extract(request.text, request.enabled_rules)
+        entities = pipeline.detect(request.text, request.enabled_rules)
         
-        return JSONResponse(content={
+        result = shape_response({
             "success": True,
             "entities": entities,
             "count": len(entities),
             "text_length": len(request.text),
             "enabled_rules": request.enabled_rules or list(rule_anonymizer.ALL_RULES),
             "timestamp": datetime.now().isoformat()
-        })
+        }, request, entity_keys=("entities",))
         
+        return FastJSONResponse(content=result)
+        
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"实体提取失败: {str(e)}")
 
@@ -213,21 +394,18 @@ async def anonymize_text(request: AnonymizeRequest):
     对文本进行脱敏处理
     """
     try:
-        # 创建自定义脱敏器（如果指定了规则）
-        if request.enabled_rules:
-            anonymizer = RuleAnonymizer(enabled_rules=set(request.enabled_rules))
-        else:
-            anonymizer = rule_anonymizer
+        # 获取指定规则集的脱敏器
+        anonymizer = get_anonymizer(request.enabled_rules)
         
         # 执行脱敏
-        anonymized_text, entities = anonymizer.anonymize_text(
+        anonymized_text, entities = anonymizer.anonymize_compact(
             request.text,
             mask_char=request.mask_char,
             keep_prefix=request.keep_prefix,
             keep_suffix=request.keep_suffix
         )
         
-        return JSONResponse(content={
+        result = shape_response({
             "success": True,
             "original_text": request.text,
             "anonymized_text": anonymized_text,
@@ -240,18 +418,78 @@ async def anonymize_text(request: AnonymizeRequest):
                 "enabled_rules": request.enabled_rules or list(anonymizer.get_enabled_rules())
             },
             "timestamp": datetime.now().isoformat()
-        })
+        }, request, original_keys=("original_text",), entity_keys=("entities",))
+        
+        return FastJSONResponse(content=result)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"文本脱敏失败: {str(e)}")
 
 
+@app.post("/api/anonymize/batch")
+async def anonymize_batch(request: BatchAnonymizeRequest):
+    """
+    批量文本脱敏，按输入顺序返回结果
+    """
+    try:
+        anonymizer = get_anonymizer(request.enabled_rules)
+        
+        executor = None
+        if (file_processor.backend == "process"
+                and sum(len(text) for text in request.texts) >= BATCH_PARALLEL_CHARS):
+            executor = file_processor.extract_executor
+        
+        # 在线程池中执行，避免大批量文本阻塞事件循环
+        loop = asyncio.get_event_loop()
+        results = await loop.run_in_executor(
+            file_processor.executor,
+            functools.partial(
+                anonymizer.anonymize_many,
+                request.texts,
+                mask_char=request.mask_char,
+                keep_prefix=request.keep_prefix,
+                keep_suffix=request.keep_suffix,
+                executor=executor
+            )
+        )
+        
+        result = shape_response({
+            "success": True,
+            "results": [
+                {
+                    "anonymized_text": anonymized_text,
+                    "entities": format_entities(entities, request.entity_format),
+                    "count": len(entities)
+                }
+                for anonymized_text, entities in results
+            ],
+            "count": len(results),
+            "total_entities": sum(len(entities) for _, entities in results),
+            "settings": {
+                "mask_char": request.mask_char,
+                "keep_prefix": request.keep_prefix,
+                "keep_suffix": request.keep_suffix,
+                "enabled_rules": request.enabled_rules or list(anonymizer.get_enabled_rules())
+            },
+            "timestamp": datetime.now().isoformat()
+        }, request)
+        
+        return FastJSONResponse(content=result)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"批量脱敏失败: {str(e)}")
+
+
 @app.get("/api/rules")
 async def get_rules_info():
     """
     获取所有支持的脱敏规则信息
     """
-    return JSONResponse(content={
+    return FastJSONResponse(content={
         "success": True,
         "supported_rules": list(rule_anonymizer.ALL_RULES),
         "enabled_rules": list(rule_anonymizer.get_enabled_rules()),
@@ -271,7 +509,7 @@ async def validate_entity(entity_text: str, entity_type: str):
         
         is_valid = rule_anonymizer.validate_entity(entity_text, entity_type)
         
-        return JSONResponse(content={
+        return FastJSONResponse(content={
             "success": True,
             "entity_text": entity_text,
             "entity_type": entity_type,
@@ -287,7 +525,12 @@ async def validate_entity(entity_text: str, entity_type: str):
 
 @app.get("/api/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    return {
+        "status": "healthy",
+        "timestamp": datetime.now().isoformat(),
+        "extraction_cache": file_processor.cache.stats(),
+        "json_backend": backend_name()
+    }
 
 if __name__ == "__main__":
     import uvicorn
@@ -2,28 +2,42 @@
 基于 LangChain 的法律文件脱敏智能体 FastAPI 应用
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-import aiofiles
+from starlette.background import BackgroundTask
+import asyncio
 import os
+import sys
 import uuid
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 from pydantic import BaseModel
-import json
 
-from langchain_agent import anonymizer_agent, LegalDocumentAnonymizerAgent
 from langchain_tools import _tools_instance
+from file_processor import PDF_ENGINE_CHOICES
+from upload_storage import UploadLimitMiddleware, save_upload
+from pipeline import EXPORT_FORMATS, parse_config
+from json_response import FastJSONResponse, dumps_str, backend_name
+import metrics
+from session_store import SessionStore
+from job_queue import JobQueue, QueueFullError, QUEUED, RUNNING, COMPLETED
+from response_options import (
+    ResponseOptions, parse_fields, check_options, format_entities, shape_response
+)
 
 # 创建 FastAPI 应用
 app = FastAPI(
     title="LangChain 法律文件脱敏智能体",
     description="基于 LangChain 框架的智能法律文件脱敏系统",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=FastJSONResponse
 )
 
+# 声明长度超出上限的上传在读取请求体之前返回 413（放在 CORS 内层，错误响应仍带跨域头）
+app.add_middleware(UploadLimitMiddleware)
+
 # 配置 CORS
 app.add_middleware(
     CORSMiddleware,
@@ -36,12 +50,82 @@ app.add_middleware(
 # 确保必要目录存在
 UPLOAD_DIR = "uploads"
 EXPORT_DIR = "exports"
+DATA_DIR = "data"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(EXPORT_DIR, exist_ok=True)
+os.makedirs(DATA_DIR, exist_ok=True)
 
 # 挂载静态文件服务（用于下载导出的文件）
 app.mount("/exports", StaticFiles(directory=EXPORT_DIR), name="exports")
 
+# 文档处理直接使用确定性脱敏流水线；LangChain 及智能体在首次对话时才导入和创建
+pipeline = _tools_instance.pipeline
+
+def _remove_upload(payload: Dict[str, Any]):
+    """删除任务对应的上传文件"""
+    file_path = payload["file_path"]
+    if os.path.exists(file_path):
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass  # 忽略删除失败
+
+def _remove_export(result: Dict[str, Any]):
+    """删除任务结果对应的导出文件（任务过期或被删除时调用）"""
+    export_path = (result.get("export_info") or {}).get("export_path")
+    if not export_path:
+        return
+    # 只删除导出目录中的文件
+    if os.path.dirname(os.path.abspath(export_path)) != os.path.abspath(EXPORT_DIR):
+        return
+    if os.path.exists(export_path):
+        try:
+            os.remove(export_path)
+        except OSError:
+            pass  # 忽略删除失败
+
+def _download_url(result: Dict[str, Any]) -> str:
+    """流式处理结果中导出文件的下载地址"""
+    return f"/api/download/{result['export_info']['export_filename']}"
+
+async def run_document_job(payload: Dict[str, Any]):
+    """
+    后台任务：流式处理文档，处理结束后删除上传文件
+    
+    任务结果会写入数据库，提交时未要求保留原文则去掉原文字段
+    """
+    try:
+        async for event in pipeline.process_stream(
+            payload["file_path"], payload["config"], content_hash=payload["content_hash"]
+        ):
+            if event["type"] == "complete":
+                event["result"]["file_info"] = payload["file_info"]
+                event["result"]["download_url"] = _download_url(event["result"])
+                if not payload.get("include_original", False):
+                    event["result"] = shape_response(
+                        event["result"], ResponseOptions(include_original=False), PROCESS_ORIGINAL_KEYS
+                    )
+            yield event
+    finally:
+        _remove_upload(payload)
+
+# 文档处理任务队列，任务记录数据库默认放在 data/ 下
+job_queue = JobQueue.from_env(
+    run_document_job, on_discard=_remove_upload, on_delete=_remove_export,
+    default_db_path=os.path.join(DATA_DIR, "jobs.db")
+)
+
+@app.on_event("startup")
+async def start_job_queue():
+    """启动任务队列 worker"""
+    await job_queue.start()
+
+@app.on_event("shutdown")
+async def shutdown_executors():
+    """停止任务队列并关闭文档解析执行器"""
+    await job_queue.stop()
+    _tools_instance.file_processor.shutdown()
+
 # 请求模型
 class ChatRequest(BaseModel):
     """聊天请求模型"""
@@ -55,23 +139,30 @@ class AnonymizeConfig(BaseModel):
     keep_prefix: int = 2
     keep_suffix: int = 2
 
-class ProcessRequest(BaseModel):
+class ProcessRequest(ResponseOptions):
     """处理请求模型"""
     file_path: str
     config: Optional[AnonymizeConfig] = None
 
-# 用于存储会话
-sessions: Dict[str, LegalDocumentAnonymizerAgent] = {}
+# process_document 结果中存放原文和实体列表的字段
+PROCESS_ORIGINAL_KEYS = ("original_text",)
+PROCESS_ENTITY_KEYS = ("entities_found",)
 
-def get_or_create_session(session_id: Optional[str] = None) -> str:
-    """获取或创建会话"""
-    if not session_id:
-        session_id = str(uuid.uuid4())
-    
-    if session_id not in sessions:
-        sessions[session_id] = LegalDocumentAnonymizerAgent(use_fake_llm=True)
-    
-    return session_id
+def create_agent():
+    """创建会话智能体，首次调用时才导入 LangChain"""
+    from langchain_agent import LegalDocumentAnonymizerAgent
+    return LegalDocumentAnonymizerAgent(use_fake_llm=True, pipeline=pipeline)
+
+# 会话存储：限制会话数、空闲时间和对话记忆占用，超出时按最近最少使用淘汰
+sessions = SessionStore.from_env(create_agent)
+
+# 运行指标：请求耗时、各阶段耗时、执行器和任务队列的排队数、活跃会话数，在 /metrics 输出
+metrics.install(app, _tools_instance.file_processor)
+metrics.register_gauge(
+    "anonymizer_job_queue_pending", "任务队列中等待执行的文档处理任务数",
+    lambda: {(): job_queue.pending}
+)
+metrics.register_gauge("anonymizer_sessions_active", "活跃的智能体会话数", lambda: {(): len(sessions)})
 
 @app.get("/")
 async def root():
@@ -92,14 +183,20 @@ async def root():
 @app.post("/api/chat")
 async def chat_with_agent(request: ChatRequest):
     """与智能体对话"""
+    # 只有服务端创建的会话可以继续对话，未知或已过期的会话 ID 返回 404
+    if request.session_id:
+        session_id, agent = request.session_id, sessions.get(request.session_id)
+        if agent is None:
+            raise HTTPException(status_code=404, detail="会话不存在或已过期，请重新开始对话")
+    else:
+        session_id, agent = sessions.create()
+    
     try:
-        session_id = get_or_create_session(request.session_id)
-        agent = sessions[session_id]
-        
         # 获取智能体回复
         response = await agent.chat(request.message)
+        sessions.update_size(session_id)
         
-        return JSONResponse(content={
+        return FastJSONResponse(content={
             "success": True,
             "response": response,
             "session_id": session_id,
@@ -112,26 +209,36 @@ async def chat_with_agent(request: ChatRequest):
 @app.post("/api/upload-and-process")
 async def upload_and_process(
     file: UploadFile = File(...),
-    config: str = Form("{}")
+    config: str = Form("{}"),
+    include_original: bool = Query(True, description="是否返回原文"),
+    entity_format: str = Query("full", description="实体格式: full / offsets"),
+    fields: Optional[str] = Query(None, description="只返回指定字段，逗号分隔"),
+    export_format: str = Query("text", description="导出格式: text（脱敏文本）/ pdf（遮盖后的PDF，仅PDF文档）"),
+    pdf_engine: Optional[str] = Query(None, description="PDF提取引擎: auto / pdfplumber / pdfminer / pypdf，默认按服务配置")
 ):
     """上传文件并使用 Agent 处理"""
     try:
-        # 解析配置
-        try:
-            config_dict = json.loads(config) if config else {}
-            anonymize_config = {
-                "enabled_rules": config_dict.get("enabled_rules"),
-                "mask_char": config_dict.get("mask_char", "●"),
-                "keep_prefix": config_dict.get("keep_prefix", 2),
-                "keep_suffix": config_dict.get("keep_suffix", 2)
-            }
-        except json.JSONDecodeError:
-            anonymize_config = {
-                "enabled_rules": None,
-                "mask_char": "●",
-                "keep_prefix": 2,
-                "keep_suffix": 2
-            }
+        options = ResponseOptions(
+            include_original=include_original,
+            entity_format=entity_format,
+            fields=parse_fields(fields)
+        )
+        check_options(options)
+        
+        if export_format not in EXPORT_FORMATS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"不支持的导出格式: {export_format}，可选: {', '.join(EXPORT_FORMATS)}"
+            )
+        
+        if pdf_engine is not None and pdf_engine not in PDF_ENGINE_CHOICES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"不支持的PDF提取引擎: {pdf_engine}，可选: {', '.join(PDF_ENGINE_CHOICES)}"
+            )
+        
+        # 解析脱敏配置
+        anonymize_config = parse_config(config)
         
         # 检查文件类型
         allowed_types = {
@@ -146,19 +253,27 @@ async def upload_and_process(
                 detail=f"不支持的文件类型。支持的类型: PDF, Word文档"
             )
         
+        if export_format == "pdf" and file.content_type != "application/pdf":
+            raise HTTPException(status_code=400, detail="仅PDF文档支持导出遮盖后的PDF")
+        
         # 保存上传的文件
         file_id = str(uuid.uuid4())
         file_extension = allowed_types.get(file.content_type, "")
         filename = f"{file_id}{file_extension}"
         file_path = os.path.join(UPLOAD_DIR, filename)
         
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
+        # 分块保存文件，同时计算摘要
+        file_size, content_hash = await save_upload(file, file_path)
         
         try:
-            # 使用 Agent 处理文档
-            result = await anonymizer_agent.process_document(file_path, anonymize_config)
+            # 使用脱敏流水线处理文档
+            result = await pipeline.process(
+                file_path, anonymize_config, content_hash=content_hash,
+                export_format=export_format, pdf_engine=pdf_engine
+            )
+            
+            if result.get("export_info"):
+                result["download_url"] = f"/api/download/{result['export_info']['export_filename']}"
             
             # 添加文件信息
             result.update({
@@ -166,12 +281,13 @@ async def upload_and_process(
                     "original_name": file.filename,
                     "file_id": file_id,
                     "content_type": file.content_type,
-                    "size": len(content),
+                    "size": file_size,
                     "upload_time": datetime.now().isoformat()
                 }
             })
             
-            return JSONResponse(content=result)
+            result = shape_response(result, options, PROCESS_ORIGINAL_KEYS, PROCESS_ENTITY_KEYS)
+            return FastJSONResponse(content=result)
             
         finally:
             # 清理上传的临时文件
@@ -186,6 +302,250 @@ async def upload_and_process(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"文件处理失败: {str(e)}")
 
+@app.post("/api/upload-and-process-stream")
+async def upload_and_process_stream(
+    file: UploadFile = File(...),
+    config: str = Form("{}"),
+    include_original: bool = Query(True, description="是否返回原文"),
+    entity_format: str = Query("full", description="实体格式: full / offsets"),
+    fields: Optional[str] = Query(None, description="只返回指定字段，逗号分隔"),
+    pdf_engine: Optional[str] = Query(None, description="PDF提取引擎: auto / pdfplumber / pdfminer / pypdf，默认按服务配置")
+):
+    """上传文件并以 Server-Sent Events 流式返回处理进度和脱敏文本"""
+    options = ResponseOptions(
+        include_original=include_original,
+        entity_format=entity_format,
+        fields=parse_fields(fields)
+    )
+    check_options(options)
+    
+    if pdf_engine is not None and pdf_engine not in PDF_ENGINE_CHOICES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"不支持的PDF提取引擎: {pdf_engine}，可选: {', '.join(PDF_ENGINE_CHOICES)}"
+        )
+    
+    # 解析脱敏配置
+    anonymize_config = parse_config(config)
+    
+    # 检查文件类型
+    allowed_types = {
+        "application/pdf": ".pdf",
+        "application/vnd.openxmlformats-officedocument.wordprocessingml.document": ".docx",
+        "application/msword": ".doc"
+    }
+    
+    if file.content_type not in allowed_types:
+        raise HTTPException(
+            status_code=400,
+            detail=f"不支持的文件类型。支持的类型: PDF, Word文档"
+        )
+    
+    # 保存上传的文件
+    file_id = str(uuid.uuid4())
+    file_extension = allowed_types.get(file.content_type, "")
+    filename = f"{file_id}{file_extension}"
+    file_path = os.path.join(UPLOAD_DIR, filename)
+    
+    try:
+        # 分块保存文件，同时计算摘要
+        file_size, content_hash = await save_upload(file, file_path)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"文件保存失败: {str(e)}")
+    
+    file_info = {
+        "original_name": file.filename,
+        "file_id": file_id,
+        "content_type": file.content_type,
+        "size": file_size,
+        "upload_time": datetime.now().isoformat()
+    }
+    
+    async def event_stream():
+        async for event in pipeline.process_stream(
+            file_path, anonymize_config, content_hash=content_hash, pdf_engine=pdf_engine
+        ):
+            if event["type"] == "complete":
+                event["result"]["file_info"] = file_info
+                event["result"]["download_url"] = _download_url(event["result"])
+                event["result"] = shape_response(
+                    event["result"], options, PROCESS_ORIGINAL_KEYS, PROCESS_ENTITY_KEYS
+                )
+            elif event["type"] == "chunk":
+                if not options.include_original:
+                    event.pop("original_text", None)
+                event["entities"] = format_entities(event["entities"], options.entity_format)
+            yield f"data: {dumps_str(event)}\n\n"
+    
+    # 上传文件由响应结束后的后台任务清理，客户端在首次迭代前断开时生成器体不会执行
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(_remove_upload, {"file_path": file_path})
+    )
+
+def _job_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    """将任务记录转为接口返回格式"""
+    def iso(timestamp):
+        return datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+    
+    view = {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "created_at": iso(job["created_at"]),
+        "started_at": iso(job["started_at"]),
+        "finished_at": iso(job["finished_at"]),
+        "expires_at": iso(job["expires_at"]),
+        "progress": job.get("progress"),
+        "file_info": job["meta"].get("file_info"),
+    }
+    if job.get("error"):
+        view["error"] = job["error"]
+    return view
+
+@app.post("/api/jobs", status_code=202)
+async def submit_job(
+    file: UploadFile = File(...),
+    config: str = Form("{}"),
+    include_original: bool = Form(False, description="任务结果是否保留原文")
+):
+    """上传文件并提交后台处理任务，立即返回任务 ID"""
+    # 队列已满时在保存文件之前拒绝
+    if job_queue.full:
+        raise HTTPException(
+            status_code=503,
+            detail="任务队列已满，请稍后重试",
+            headers={"Retry-After": "5"}
+        )
+    
+    # 解析脱敏配置
+    anonymize_config = parse_config(config)
+    
+    # 检查文件类型
+    allowed_types = {
+        "application/pdf": ".pdf",
+        "application/vnd.openxmlformats-officedocument.wordprocessingml.document": ".docx",
+        "application/msword": ".doc"
+    }
+    
+    if file.content_type not in allowed_types:
+        raise HTTPException(
+            status_code=400,
+            detail=f"不支持的文件类型。支持的类型: PDF, Word文档"
+        )
+    
+    # 保存上传的文件
+    file_id = str(uuid.uuid4())
+    file_extension = allowed_types.get(file.content_type, "")
+    filename = f"{file_id}{file_extension}"
+    file_path = os.path.join(UPLOAD_DIR, filename)
+    
+    try:
+        # 分块保存文件，同时计算摘要
+        file_size, content_hash = await save_upload(file, file_path)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"文件保存失败: {str(e)}")
+    
+    file_info = {
+        "original_name": file.filename,
+        "file_id": file_id,
+        "content_type": file.content_type,
+        "size": file_size,
+        "upload_time": datetime.now().isoformat()
+    }
+    payload = {
+        "file_path": file_path,
+        "config": anonymize_config,
+        "content_hash": content_hash,
+        "file_info": file_info,
+        "include_original": include_original
+    }
+    
+    try:
+        job_id = await job_queue.submit(payload, meta={"file_info": file_info})
+    except QueueFullError as e:
+        _remove_upload(payload)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except RuntimeError as e:
+        # 任务队列未启动（启动事件尚未执行或服务正在关闭）
+        _remove_upload(payload)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    
+    return FastJSONResponse(status_code=202, content={
+        "success": True,
+        "job_id": job_id,
+        "status": QUEUED,
+        "status_url": f"/api/jobs/{job_id}",
+        "events_url": f"/api/jobs/{job_id}/events",
+        "file_info": file_info
+    })
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    include_original: bool = Query(True, description="是否返回原文"),
+    entity_format: str = Query("full", description="实体格式: full / offsets"),
+    fields: Optional[str] = Query(None, description="只返回指定字段，逗号分隔")
+):
+    """查询任务状态，任务完成时附带处理结果"""
+    options = ResponseOptions(
+        include_original=include_original,
+        entity_format=entity_format,
+        fields=parse_fields(fields)
+    )
+    check_options(options)
+    
+    # 结果可能很大，在线程池中读取和解析
+    loop = asyncio.get_event_loop()
+    job = await loop.run_in_executor(None, job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在或已过期")
+    
+    content = _job_view(job)
+    if job["status"] == COMPLETED and job.get("result") is not None:
+        content["result"] = shape_response(
+            job["result"], options, PROCESS_ORIGINAL_KEYS, PROCESS_ENTITY_KEYS
+        )
+    return FastJSONResponse(content=content)
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """以 Server-Sent Events 订阅任务进度，任务结束后关闭连接"""
+    loop = asyncio.get_event_loop()
+    job = await loop.run_in_executor(None, lambda: job_queue.get(job_id, include_result=False))
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在或已过期")
+    
+    async def event_stream():
+        async for event in job_queue.events(job_id):
+            yield f"data: {dumps_str(event)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.delete("/api/jobs/{job_id}")
+async def delete_job(job_id: str):
+    """取消排队中的任务，或删除已结束的任务"""
+    status = await job_queue.cancel(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="任务不存在或已过期")
+    if status == RUNNING:
+        raise HTTPException(status_code=409, detail="任务正在处理中，无法取消")
+    
+    return FastJSONResponse(content={
+        "success": True,
+        "job_id": job_id,
+        "message": "任务已取消" if status == QUEUED else "任务已删除"
+    })
+
 @app.post("/api/process-document")
 async def process_document(request: ProcessRequest):
     """处理指定路径的文档"""
@@ -197,16 +557,64 @@ async def process_document(request: ProcessRequest):
         # 转换配置
         config_dict = request.config.dict() if request.config else {}
         
-        # 使用 Agent 处理文档
-        result = await anonymizer_agent.process_document(request.file_path, config_dict)
+        # 使用脱敏流水线处理文档
+        result = await pipeline.process(request.file_path, config_dict)
         
-        return JSONResponse(content=result)
+        result = shape_response(result, request, PROCESS_ORIGINAL_KEYS, PROCESS_ENTITY_KEYS)
+        return FastJSONResponse(content=result)
         
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"文档处理失败: {str(e)}")
 
+@app.post("/api/upload-and-redact-docx")
+async def upload_and_redact_docx(
+    file: UploadFile = File(...),
+    config: str = Form("{}")
+):
+    """上传 Word 文档，在原文档上脱敏并导出保留格式的 .docx"""
+    # 解析脱敏配置
+    anonymize_config = parse_config(config)
+    
+    if file.content_type != "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
+        raise HTTPException(status_code=400, detail="不支持的文件类型。仅支持 .docx 格式的Word文档")
+    
+    file_id = str(uuid.uuid4())
+    file_path = os.path.join(UPLOAD_DIR, f"{file_id}.docx")
+    
+    try:
+        file_size, _ = await save_upload(file, file_path)
+        export = await pipeline.redact_docx(file_path, anonymize_config)
+        
+        return FastJSONResponse(content={
+            "success": True,
+            "file_info": {
+                "original_name": file.filename,
+                "file_id": file_id,
+                "content_type": file.content_type,
+                "size": file_size,
+                "upload_time": datetime.now().isoformat()
+            },
+            "entity_statistics": export.pop("entity_statistics"),
+            "entities_count": export.pop("entities_count"),
+            "export_info": {"success": True, **export},
+            "download_url": f"/api/download/{export['export_filename']}",
+            "config_used": anonymize_config
+        })
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Word文档脱敏失败: {str(e)}")
+    finally:
+        # 清理上传的临时文件
+        if os.path.exists(file_path):
+            try:
+                os.remove(file_path)
+            except:
+                pass  # 忽略删除失败
+
 @app.get("/api/download/{filename}")
 async def download_file(filename: str):
     """下载导出的文件"""
@@ -224,13 +632,13 @@ async def download_file(filename: str):
 @app.get("/api/conversation/{session_id}")
 async def get_conversation(session_id: str):
     """获取会话历史"""
-    if session_id not in sessions:
+    agent = sessions.get(session_id)
+    if agent is None:
         raise HTTPException(status_code=404, detail="会话不存在")
     
-    agent = sessions[session_id]
     history = agent.get_conversation_history()
     
-    return JSONResponse(content={
+    return FastJSONResponse(content={
         "success": True,
         "session_id": session_id,
         "conversation": history,
@@ -240,9 +648,11 @@ async def get_conversation(session_id: str):
 @app.delete("/api/conversation/{session_id}")
 async def clear_conversation(session_id: str):
     """清除会话历史"""
-    if session_id in sessions:
-        sessions[session_id].clear_memory()
-        return JSONResponse(content={
+    agent = sessions.get(session_id)
+    if agent is not None:
+        agent.clear_memory()
+        sessions.update_size(session_id)
+        return FastJSONResponse(content={
             "success": True,
             "message": "会话历史已清除",
             "session_id": session_id
@@ -253,7 +663,7 @@ async def clear_conversation(session_id: str):
 @app.get("/api/tools")
 async def get_available_tools():
     """获取可用的工具列表"""
-    return JSONResponse(content={
+    return FastJSONResponse(content={
         "success": True,
         "tools": [
             {
@@ -289,12 +699,20 @@ async def get_available_tools():
 @app.get("/api/health")
 async def health_check():
     """健康检查"""
+    # 任务统计读取 SQLite，在线程池中执行
+    loop = asyncio.get_event_loop()
+    job_stats = await loop.run_in_executor(None, job_queue.stats)
     return {
         "status": "healthy",
         "framework": "LangChain + FastAPI",
         "agent_status": "active",
+        "langchain_loaded": "langchain_agent" in sys.modules,
         "timestamp": datetime.now().isoformat(),
-        "sessions_count": len(sessions)
+        "sessions_count": len(sessions),
+        "sessions": sessions.stats(),
+        "jobs": job_stats,
+        "extraction_cache": _tools_instance.file_processor.cache.stats(),
+        "json_backend": backend_name()
     }
 
 @app.get("/api/export-list")
@@ -314,7 +732,7 @@ async def list_exported_files():
                         "download_url": f"/api/download/{filename}"
                     })
         
-        return JSONResponse(content={
+        return FastJSONResponse(content={
             "success": True,
             "files": files,
             "count": len(files)
@@ -0,0 +1,299 @@
+"""
+运行指标
+轻量的计数器、仪表和直方图，以 Prometheus 文本格式在 /metrics 输出。
+不依赖 prometheus_client；记录一次观测只需一次加锁和一次二分查找，
+可以放在实体识别、遮罩等热路径上。模块本身不导入 FastAPI，工作进程中也可安全导入
+"""
+
+import bisect
+import threading
+import time
+from typing import Dict, Any, Callable, Iterable, List, Optional, Tuple
+
+
+# 耗时直方图的默认分桶（秒）
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+    
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+    
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+    
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """单调递增的计数器"""
+    kind = "counter"
+    
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+    
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in values
+        ]
+
+
+class Gauge(_Metric):
+    """可增可减的仪表；指定 callback 时在输出时调用它取值"""
+    kind = "gauge"
+    
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (),
+                 callback: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None):
+        """
+        Args:
+            callback: 返回 {标签值元组: 数值} 的函数，无标签时键为空元组
+        """
+        super().__init__(name, documentation, labels)
+        self.callback = callback
+        self._values: Dict[Tuple[str, ...], float] = {}
+    
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+    
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+    
+    def collect(self) -> List[str]:
+        if self.callback is not None:
+            try:
+                values = list(self.callback().items())
+            except Exception:
+                values = []
+        else:
+            with self._lock:
+                values = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in values
+        ]
+
+
+class Histogram(_Metric):
+    """分桶直方图，同时记录观测值总和与次数"""
+    kind = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # 标签值 -> [各桶计数（非累计，末位为 +Inf）, 总和, 次数]
+        self._series: Dict[Tuple[str, ...], list] = {}
+    
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+    
+    def collect(self) -> List[str]:
+        with self._lock:
+            series = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+        lines = self.header()
+        for key, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="{}"'.format(_format_value(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class Registry:
+    """指标注册表，按注册顺序输出"""
+    
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+    
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            # 重复注册同名指标时保留新的（如应用模块被重新加载）
+            self._metrics[metric.name] = metric
+        return metric
+    
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "anonymizer_stage_seconds",
+    "各处理阶段耗时（parse / parse_page / redact_docx / redact_pdf / detect / mask / export / serialize）",
+    labels=("stage",)
+))
+
+SCAN_GUARD_TRIPS = REGISTRY.register(Counter(
+    "anonymizer_scan_guard_trips_total", "实体识别扫描超出耗时上限、规则被拆出单独扫描的次数",
+    labels=("rule",)
+))
+
+REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "正在处理的 HTTP 请求数"
+))
+
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP 请求耗时（至响应体发送完毕）",
+    labels=("method", "route", "status")
+))
+
+
+def observe_stage(stage: str, seconds: float):
+    """记录一次阶段耗时"""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+class timed:
+    """
+    记录代码块耗时的上下文管理器
+    
+    用法:
+        with timed("export"):
+            ...
+    """
+    
+    __slots__ = ("stage", "start")
+    
+    def __init__(self, stage: str):
+        self.stage = stage
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        STAGE_SECONDS.observe(time.perf_counter() - self.start, stage=self.stage)
+        return False
+
+
+def register_gauge(name: str, documentation: str, callback: Callable[[], Dict[Tuple[str, ...], float]],
+                   labels: Iterable[str] = ()) -> Gauge:
+    """注册输出时才取值的仪表（如队列深度、会话数）"""
+    return REGISTRY.register(Gauge(name, documentation, labels, callback=callback))
+
+
+class MetricsMiddleware:
+    """
+    记录进行中的请求数和请求耗时的 ASGI 中间件
+    
+    流式响应的耗时计算到响应体发送完毕；路由标签使用路由模板（如 /api/jobs/{job_id}），
+    避免按实际路径产生大量时间序列。
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        status = {"code": 500}
+        
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+        
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=scope["method"], route=_route_name(scope), status=status["code"]
+            )
+
+
+def _route_name(scope) -> str:
+    """请求匹配的路由模板"""
+    route = scope.get("route")
+    if route is None:
+        from starlette.routing import Match
+        for candidate in scope["app"].routes if "app" in scope else ():
+            match, _ = candidate.matches(scope)
+            if match == Match.FULL:
+                route = candidate
+                break
+    return getattr(route, "path", None) or "unmatched"
+
+
+def install(app, file_processor=None):
+    """
+    为 FastAPI 应用添加指标中间件和 /metrics 端点
+    
+    Args:
+        app: FastAPI 应用
+        file_processor: 文件处理器，传入时输出其执行器的排队任务数
+    """
+    from fastapi.responses import Response
+    
+    app.add_middleware(MetricsMiddleware)
+    
+    if file_processor is not None:
+        register_gauge(
+            "anonymizer_executor_queue_depth", "执行器中排队或正在执行的任务数",
+            lambda: {(name,): depth for name, depth in file_processor.queue_depths().items()},
+            labels=("executor",)
+        )
+    
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics_endpoint():
+        # 直接设置 Content-Type：通过 media_type 传入时框架会再追加一次 charset
+        return Response(content=REGISTRY.render(), headers={"Content-Type": CONTENT_TYPE})
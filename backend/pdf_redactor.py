@@ -0,0 +1,353 @@
+"""
+PDF 遮盖输出
+用 pdfplumber 逐页解析时同时得到页面文本和每个字符的坐标，识别实体后把实体偏移量映射回
+字符框，再用 PyMuPDF 的 redaction 删除框内文字、涂黑覆盖区域，输出遮盖后的 PDF。
+解析（extract_pages）按页段在工作进程中并行执行，实体在拼接后的全文上统一识别（analyze_pdf），
+遮盖（redact_pdf）只需一次打开和保存
+
+命令行用法（在 backend 目录下）:
+    python pdf_redactor.py 判决书.pdf -o 判决书_脱敏.pdf --rules PHONE,IDCARD
+"""
+
+import argparse
+import math
+import os
+from array import array
+from bisect import bisect_left
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import pdfplumber
+
+from file_processor import FileProcessor
+from rule_anonymizer import EntityList, get_anonymizer
+
+
+Box = Tuple[float, float, float, float]
+
+# 排版插入的空格和换行没有字符框
+_NO_CHAR = (math.nan,) * 4
+
+
+def masked_ranges(entities: Sequence[Sequence], keep_prefix: int = 2,
+                  keep_suffix: int = 2) -> List[Tuple[int, int]]:
+    """
+    实体中需要遮盖的字符范围，与 mask_value 保留的前后缀一致
+    
+    Args:
+        entities: [[开始位置, 结束位置, 类型], ...]
+    
+    Returns:
+        List[tuple]: [(开始位置, 结束位置), ...]
+    """
+    ranges = []
+    for start, end, _ in entities:
+        if end - start > keep_prefix + keep_suffix:
+            start, end = start + keep_prefix, end - keep_suffix
+        ranges.append((start, end))
+    return ranges
+
+
+def char_positions(tuples: Sequence[tuple]) -> array:
+    """
+    把 pdfplumber 文本映射压缩为字符框数组，便于在进程间传递
+    
+    Args:
+        tuples: pdfplumber TextMap.tuples，与页面文本逐字符对应的 (字符, 字符对象)，
+            排版插入的空格和换行字符对象为 None
+    
+    Returns:
+        array: 每个字符依次 4 个值 x0, top, x1, bottom，无字符对象时为 NaN
+    """
+    positions = array("d")
+    for _, char in tuples:
+        if char is None:
+            positions.extend(_NO_CHAR)
+        else:
+            positions.extend((char["x0"], char["top"], char["x1"], char["bottom"]))
+    return positions
+
+
+def char_boxes(positions: Sequence[float], ranges: Sequence[Tuple[int, int]]) -> List[Box]:
+    """
+    把文本范围映射为字符框，同一行上相邻的字符合并为一个框
+    
+    Args:
+        positions: char_positions 的结果
+        ranges: 页面文本内的范围列表
+    
+    Returns:
+        List[tuple]: [(x0, top, x1, bottom), ...]，pdfplumber 页面坐标
+    """
+    boxes: List[list] = []
+    for start, end in ranges:
+        current = None
+        for index in range(start, end):
+            x0, top, x1, bottom = positions[index * 4:index * 4 + 4]
+            if math.isnan(x0):
+                current = None
+                continue
+            if current is not None and abs(top - current[1]) < (bottom - top) / 2 and x0 >= current[0]:
+                current[2] = max(current[2], x1)
+                current[1] = min(current[1], top)
+                current[3] = max(current[3], bottom)
+            else:
+                current = [x0, top, x1, bottom]
+                boxes.append(current)
+    return [tuple(box) for box in boxes]
+
+
+def extract_pages(file_path: str, first_page: int, last_page: int) -> List[Dict[str, Any]]:
+    """
+    解析PDF页段，得到页面文本和逐字符坐标，可直接提交给进程池
+    
+    页面文本与 FileProcessor 的提取结果逐字相同（同为 extract_text 的文本映射）。
+    实体在拼接后的全文上统一识别（见 locate_entities），跨页的实体不会漏掉。
+    
+    Args:
+        file_path: PDF文件路径
+        first_page: 起始页码（从1开始，含）
+        last_page: 结束页码（含）
+    
+    Returns:
+        List[Dict]: 每页 {"page": 页码, "content": 带页标记的页面文本,
+            "text_start": 页面文本在 content 中的位置, "positions": char_positions 的结果}
+    """
+    pages = []
+    try:
+        with pdfplumber.open(file_path, pages=list(range(first_page, last_page + 1))) as pdf:
+            for page in pdf.pages:
+                textmap = page.get_textmap()
+                page_text = textmap.as_string
+                content = FileProcessor._format_page(page.page_number, page_text)
+                text_start, positions = 0, array("d")
+                if content:
+                    # 页面文本在页标记之后
+                    text_start = content.index(page_text)
+                    positions = char_positions(textmap.tuples)
+                page.flush_cache()
+                pages.append({
+                    "page": page.page_number,
+                    "content": content,
+                    "text_start": text_start,
+                    "positions": positions,
+                })
+    except Exception as e:
+        raise Exception(f"PDF提取失败: {str(e)}")
+    return pages
+
+
+def locate_entities(pages: Sequence[Dict[str, Any]], entities: Sequence[Sequence],
+                    keep_prefix: int = 2, keep_suffix: int = 2):
+    """
+    把全文中的实体映射回各页的字符框，写入每页的 boxes 和 originals
+    
+    跨页实体按页拆开遮盖，页标记部分不在页面上，直接跳过。只有完整落在一页内的实体
+    记入该页的 originals，供 redact_pdf 遮盖后校验；跨页实体的片段可能与正文中的
+    其他文字相同，不参与校验。
+    
+    Args:
+        pages: extract_pages 的结果（按页码顺序拼接即为全文）
+        entities: 全文中的实体 [[开始位置, 结束位置, 类型], ...]，按开始位置排列
+        keep_prefix: 保留前缀字符数
+        keep_suffix: 保留后缀字符数
+    """
+    ranges = masked_ranges(entities, keep_prefix, keep_suffix)
+    starts = [entity[0] for entity in entities]
+    longest = max((end - start for start, end, _ in entities), default=0)
+    
+    base = 0
+    for page in pages:
+        text_start = base + page["text_start"]
+        text_end = text_start + len(page["positions"]) // 4
+        base += len(page["content"])
+        
+        local, originals = [], []
+        first = bisect_left(starts, text_start - longest)
+        last = bisect_left(starts, text_end)
+        for (start, end, _), (mask_start, mask_end) in zip(entities[first:last], ranges[first:last]):
+            if end <= text_start:
+                continue
+            if text_start <= start and end <= text_end:
+                offset = page["text_start"] - text_start
+                originals.append(page["content"][start + offset:end + offset])
+            mask_start, mask_end = max(mask_start, text_start), min(mask_end, text_end)
+            if mask_start < mask_end:
+                local.append((mask_start - text_start, mask_end - text_start))
+        
+        page["boxes"] = char_boxes(page["positions"], local)
+        page["originals"] = originals
+
+
+def analyze_pdf(pages: Sequence[Dict[str, Any]], enabled_rules: Optional[List[str]] = None,
+                keep_prefix: int = 2, keep_suffix: int = 2) -> Tuple[str, EntityList]:
+    """
+    在各页拼接的全文上识别实体并计算遮盖框
+    
+    文本和实体与 FileProcessor 提取后整篇识别的结果相同。
+    
+    Args:
+        pages: extract_pages 的结果，boxes / originals 原位写入
+        enabled_rules: 启用的规则列表
+        keep_prefix: 保留前缀字符数
+        keep_suffix: 保留后缀字符数
+    
+    Returns:
+        tuple: (去除首尾空白的全文, 实体集合)
+    """
+    content = "".join(page["content"] for page in pages)
+    text = content.strip()
+    entities = get_anonymizer(enabled_rules).find_entities(text)
+    lead = len(content) - len(content.lstrip())
+    locate_entities(
+        pages, [[start + lead, end + lead, entity_type] for start, end, entity_type in entities.to_offsets()],
+        keep_prefix, keep_suffix
+    )
+    return text, entities
+
+
+def redact_pdf(file_path: str, output_path: str, pages: Sequence[Dict[str, Any]],
+               keep_prefix: int = 2, keep_suffix: int = 2) -> Dict[str, int]:
+    """
+    删除字符框内的文字并涂黑，另存为新的PDF，可直接提交给进程池
+    
+    遮盖后检查页面文本，实体原文仍可提取时（如坐标换算与页面不一致）改用
+    PyMuPDF 自身提取的字符重新定位实体并遮盖一次（同样保留前后缀），
+    仍失败则抛出异常，不输出未完全遮盖的文件。
+    
+    Args:
+        file_path: 源PDF路径
+        output_path: 输出PDF路径
+        pages: analyze_pdf 处理后的页面（只用到 page / boxes / originals）
+        keep_prefix: 保留前缀字符数，与 analyze_pdf 一致
+        keep_suffix: 保留后缀字符数，与 analyze_pdf 一致
+    
+    Returns:
+        Dict: {"pages_redacted": 有遮盖的页数, "boxes": 遮盖框数}
+    """
+    import fitz  # PyMuPDF，仅输出遮盖后的 PDF 时需要
+    
+    doc = fitz.open(file_path)
+    try:
+        pages_redacted = 0
+        box_count = 0
+        for page_info in pages:
+            if not page_info["boxes"]:
+                continue
+            page = doc[page_info["page"] - 1]
+            for box in page_info["boxes"]:
+                rect = _page_rect(page, box)
+                # 相邻字符的框首尾相接，PyMuPDF 会删除与遮盖区域相交的字符，
+                # 左右各收进一点，避免误删保留的前后缀
+                inset = min(rect.height * 0.1, rect.width / 4)
+                page.add_redact_annot(fitz.Rect(rect.x0 + inset, rect.y0, rect.x1 - inset, rect.y1), fill=(0, 0, 0))
+            page.apply_redactions(images=fitz.PDF_REDACT_IMAGE_PIXELS)
+            pages_redacted += 1
+            box_count += len(page_info["boxes"])
+            
+            remaining = _remaining(page, page_info["originals"])
+            if remaining:
+                for original in remaining:
+                    for rect in _masked_char_rects(page, original, keep_prefix, keep_suffix):
+                        page.add_redact_annot(rect, fill=(0, 0, 0))
+                page.apply_redactions(images=fitz.PDF_REDACT_IMAGE_PIXELS)
+                if _remaining(page, page_info["originals"]):
+                    raise Exception(f"第 {page_info['page']} 页的敏感信息未能完全遮盖")
+        
+        # garbage 清除被替换的旧内容流，避免原文残留在文件中
+        doc.save(output_path, garbage=3, deflate=True)
+    finally:
+        doc.close()
+    
+    return {"pages_redacted": pages_redacted, "boxes": box_count}
+
+
+def _page_rect(page, box: Box):
+    """
+    把 pdfplumber 字符框换算为 PyMuPDF 页面坐标
+    
+    pdfplumber 以旋转后的 MediaBox 左上角为原点，PyMuPDF 的文字和注释坐标以未旋转的
+    CropBox 左上角为原点。先按 MediaBox 尺寸撤销旋转，再减去 CropBox 的偏移；
+    不能直接用 page.derotation_matrix，它按 CropBox 尺寸旋转，CropBox 小于 MediaBox 时会错位。
+    
+    Args:
+        page: PyMuPDF 页面
+        box: (x0, top, x1, bottom)，pdfplumber 页面坐标
+    
+    Returns:
+        fitz.Rect: PyMuPDF 页面坐标中的矩形
+    """
+    import fitz
+    
+    x0, top, x1, bottom = box
+    width, height = page.mediabox.width, page.mediabox.height
+    rotation = page.rotation
+    if rotation == 90:
+        x0, top, x1, bottom = top, height - x1, bottom, height - x0
+    elif rotation == 180:
+        x0, top, x1, bottom = width - x1, height - bottom, width - x0, height - top
+    elif rotation == 270:
+        x0, top, x1, bottom = width - bottom, x0, width - top, x1
+    origin = page.cropbox_position
+    return fitz.Rect(x0 - origin.x, top - origin.y, x1 - origin.x, bottom - origin.y)
+
+
+def _masked_char_rects(page, original: str, keep_prefix: int, keep_suffix: int) -> List:
+    """
+    用 PyMuPDF 提取的字符定位实体原文，返回需遮盖部分（不含保留的前后缀）的字符框
+    
+    与 _remaining 一样忽略空白，实体跨行时同样能找到。
+    """
+    import fitz
+    
+    chars = [
+        (char["c"], char["bbox"])
+        for block in page.get_text("rawdict")["blocks"]
+        for line in block.get("lines", ())
+        for span in line["spans"]
+        for char in span["chars"]
+        if not char["c"].isspace()
+    ]
+    text = "".join(c for c, _ in chars)
+    
+    # 遮盖范围按原文计算，再换算为去掉空白后的位置
+    (start, end), = masked_ranges([(0, len(original), None)], keep_prefix, keep_suffix)
+    compact = "".join(original.split())
+    masked_start = len("".join(original[:start].split()))
+    masked_end = masked_start + len("".join(original[start:end].split()))
+    
+    rects = []
+    position = text.find(compact)
+    while compact and position != -1:
+        rects.extend(fitz.Rect(bbox) for _, bbox in chars[position + masked_start:position + masked_end])
+        position = text.find(compact, position + len(compact))
+    return rects
+
+
+def _remaining(page, originals: Sequence[str]) -> List[str]:
+    """遮盖后仍能从页面提取到的实体原文"""
+    text = "".join(page.get_text().split())
+    return [original for original in set(originals) if "".join(original.split()) in text]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF 遮盖输出")
+    parser.add_argument("input", help="输入 PDF 文件")
+    parser.add_argument("-o", "--output", help="输出 PDF 文件，默认在输入文件名后追加 _脱敏")
+    parser.add_argument("--rules", help="启用的规则，逗号分隔，默认全部规则")
+    parser.add_argument("--keep-prefix", type=int, default=2)
+    parser.add_argument("--keep-suffix", type=int, default=2)
+    args = parser.parse_args()
+    
+    output = args.output or "{}_脱敏{}".format(*os.path.splitext(args.input))
+    pages_total = FileProcessor._read_pdf_metadata(args.input)["pages"]
+    pages = extract_pages(args.input, 1, pages_total)
+    _, entities = analyze_pdf(
+        pages, enabled_rules=args.rules.split(",") if args.rules else None,
+        keep_prefix=args.keep_prefix, keep_suffix=args.keep_suffix
+    )
+    result = redact_pdf(args.input, output, pages, args.keep_prefix, args.keep_suffix)
+    print(f"已输出 {output}：{len(entities)} 个实体，{result['pages_redacted']} 页共 {result['boxes']} 处遮盖")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,699 @@
+"""
+确定性脱敏流水线
+解析 → 识别 → 脱敏 → 导出，只依赖 FileProcessor 和规则脱敏器，不创建任何 LangChain 对象。
+智能体和两个 FastAPI 应用的纯规则处理路径都委托给这里
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Any, List, Optional, AsyncIterator
+
+import aiofiles
+
+from archive_processor import ENTRY_TYPES
+from docx_redactor import redact_docx
+from file_processor import FileProcessor
+from metrics import timed
+from pdf_redactor import analyze_pdf, extract_pages, redact_pdf
+from rule_anonymizer import EntityList, get_anonymizer
+
+
+# 流水线各阶段，与处理结果中 steps 的 action 一一对应
+STAGES = ("解析文档", "识别敏感实体", "脱敏处理", "导出文件")
+
+# 导出格式：脱敏文本 / 遮盖后的PDF
+EXPORT_FORMATS = ("text", "pdf")
+
+DEFAULT_CONFIG = {
+    "enabled_rules": None,
+    "mask_char": "●",
+    "keep_prefix": 2,
+    "keep_suffix": 2
+}
+
+
+def normalize_config(config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """只保留脱敏配置项，缺省项取默认值"""
+    config = config or {}
+    return {key: config.get(key, default) for key, default in DEFAULT_CONFIG.items()}
+
+
+def parse_config(raw: Optional[str]) -> Dict[str, Any]:
+    """解析上传接口中 JSON 字符串形式的脱敏配置，格式错误时使用默认配置"""
+    try:
+        config = json.loads(raw) if raw else {}
+    except ValueError:
+        config = {}
+    return normalize_config(config if isinstance(config, dict) else {})
+
+
+class PipelineError(Exception):
+    """流水线某一阶段失败，stage 为阶段序号（从1开始，见 STAGES）"""
+    
+    def __init__(self, stage: int, message: str):
+        super().__init__(message)
+        self.stage = stage
+
+
+@dataclass
+class PipelineResult:
+    """流水线处理结果，实体以紧凑集合保存"""
+    text: str
+    masked_text: str
+    entities: EntityList
+    metadata: Dict[str, Any]
+    config: Dict[str, Any]
+    export: Optional[Dict[str, Any]] = None
+    statistics: Dict[str, int] = field(default_factory=dict)
+    
+    def steps(self) -> List[Dict[str, Any]]:
+        """各阶段的完成记录"""
+        results = [
+            {"text_length": len(self.text), "metadata": self.metadata},
+            {"entity_count": len(self.entities), "entity_statistics": self.statistics},
+            {
+                "entities_processed": len(self.entities),
+                "original_length": len(self.text),
+                "masked_length": len(self.masked_text)
+            },
+        ]
+        if self.export is not None:
+            results.append({"export_path": self.export["export_path"], "file_size": self.export["file_size"]})
+        return [
+            {"step": step, "action": STAGES[step - 1], "status": "完成", "result": result}
+            for step, result in enumerate(results, 1)
+        ]
+    
+    def to_dict(self, steps: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        转为智能体处理结果的结构（process_document 返回值及流式 complete 事件）
+        
+        Args:
+            steps: 步骤记录，省略时由 steps() 生成
+        """
+        if steps is None:
+            steps = self.steps()
+        return {
+            "success": True,
+            "steps": steps,
+            "timestamp": datetime.now().isoformat(),
+            "original_text": self.text,
+            "masked_text": self.masked_text,
+            "entities_found": self.entities.to_dicts(),
+            "entity_statistics": self.statistics,
+            "export_info": {"success": True, **self.export} if self.export else None,
+            "config_used": self.config,
+            "processing_summary": {
+                "original_length": len(self.text),
+                "masked_length": len(self.masked_text),
+                "entities_count": len(self.entities),
+                "steps_completed": len([s for s in steps if s["status"] == "完成"])
+            }
+        }
+
+
+class AnonymizePipeline:
+    """无状态的脱敏流水线，可在多个智能体会话和请求之间共享"""
+    
+    # 非分页文档流式输出时每块的字符数
+    STREAM_CHUNK_SIZE = 64 * 1024
+    
+    def __init__(self, file_processor: FileProcessor, export_dir: str = "exports"):
+        """
+        初始化流水线
+        
+        Args:
+            file_processor: 文件处理器（解析执行器和解析结果缓存）
+            export_dir: 默认导出目录
+        """
+        self.file_processor = file_processor
+        self.export_dir = export_dir
+    
+    @staticmethod
+    def content_type_for(file_path: str) -> str:
+        """按扩展名确定文件MIME类型"""
+        file_ext = os.path.splitext(file_path)[1].lower()
+        content_type = ENTRY_TYPES.get(file_ext)
+        if not content_type:
+            raise ValueError(f"不支持的文件类型: {file_ext}")
+        return content_type
+    
+    async def parse(self, file_path: str, content_type: Optional[str] = None,
+                    content_hash: Optional[str] = None, pdf_engine: Optional[str] = None) -> Dict[str, Any]:
+        """
+        解析文档
+        
+        Args:
+            file_path: 文档文件路径
+            content_type: 文件MIME类型，省略时按扩展名确定
+            content_hash: 文件内容的 SHA-256（可选，用于解析结果缓存）
+            pdf_engine: PDF提取引擎（见 file_processor.PDF_ENGINE_CHOICES），省略时使用默认引擎
+        
+        Returns:
+            Dict: {"content": 文本, "metadata": 元数据}
+        """
+        content_type = content_type or self.content_type_for(file_path)
+        return await self.file_processor.extract_content(file_path, content_type, content_hash, pdf_engine)
+    
+    @staticmethod
+    def detect(text: str, enabled_rules: Optional[List[str]] = None) -> EntityList:
+        """识别敏感实体"""
+        return get_anonymizer(enabled_rules).find_entities(text)
+    
+    @staticmethod
+    def anonymize(text: str, config: Optional[Dict[str, Any]] = None) -> tuple[str, EntityList]:
+        """
+        单遍识别并脱敏文本
+        
+        Args:
+            text: 输入文本
+            config: 脱敏配置，缺省项取默认值
+        
+        Returns:
+            tuple: (脱敏后的文本, 实体集合)
+        """
+        config = normalize_config(config)
+        return get_anonymizer(config["enabled_rules"]).anonymize_compact(
+            text, config["mask_char"], config["keep_prefix"], config["keep_suffix"]
+        )
+    
+    async def export(self, content: str, filename: str,
+                     export_dir: Optional[str] = None) -> Dict[str, Any]:
+        """
+        导出脱敏文本，文件名追加时间戳避免覆盖
+        
+        Args:
+            content: 要导出的内容
+            filename: 文件名
+            export_dir: 导出目录，省略时使用默认导出目录
+        
+        Returns:
+            Dict: export_path / export_filename / file_size / timestamp
+        """
+        export_path, export_filename = self._export_target(filename, export_dir)
+        
+        with timed("export"):
+            data = content.encode("utf-8")
+            async with aiofiles.open(export_path, "wb") as f:
+                await f.write(data)
+        
+        return {
+            "export_path": export_path,
+            "export_filename": export_filename,
+            "file_size": len(data),
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    async def redact_docx(self, file_path: str, config: Optional[Dict[str, Any]] = None,
+                          export_dir: Optional[str] = None) -> Dict[str, Any]:
+        """
+        在 Word 文档的文本节点上原位脱敏并导出 .docx，保留原有格式
+        
+        一次加载、一次保存，不经过纯文本提取，在解析执行器中执行（见 docx_redactor）。
+        
+        Args:
+            file_path: .docx 文件路径
+            config: 脱敏配置，缺省项取默认值
+            export_dir: 导出目录，省略时使用默认导出目录
+        
+        Returns:
+            Dict: export_path / export_filename / file_size / timestamp / entity_statistics / entities_count
+        """
+        config = normalize_config(config)
+        name, _ = os.path.splitext(os.path.basename(file_path))
+        export_path, export_filename = self._export_target(f"{name}.docx", export_dir)
+        
+        loop = asyncio.get_event_loop()
+        with timed("redact_docx"):
+            stats = await loop.run_in_executor(
+                self.file_processor.extract_executor, redact_docx, file_path, export_path,
+                config["enabled_rules"], config["mask_char"], config["keep_prefix"], config["keep_suffix"]
+            )
+        
+        return {
+            "export_path": export_path,
+            "export_filename": export_filename,
+            "file_size": os.path.getsize(export_path),
+            "timestamp": datetime.now().isoformat(),
+            "entity_statistics": stats["entity_statistics"],
+            "entities_count": stats["entities_count"]
+        }
+    
+    async def redact_pdf(self, file_path: str, config: Optional[Dict[str, Any]] = None,
+                         content_hash: Optional[str] = None,
+                         export_dir: Optional[str] = None) -> PipelineResult:
+        """
+        解析PDF并输出遮盖后的PDF（删除敏感文字并涂黑），而不是脱敏文本
+        
+        页面文本和字符坐标来自同一遍 pdfplumber 解析，不需要第二次解析；进程池模式下
+        页数不少于 parallel_pages 的文档按页段并行解析（见 pdf_redactor）。实体在拼接后的
+        全文上识别再映射回各页的字符框，跨页实体同样遮盖，文本、实体与 run() 的结果相同。
+        传入 content_hash 时顺带写入解析结果缓存。
+        
+        Args:
+            file_path: PDF文件路径
+            config: 脱敏配置，缺省项取默认值
+            content_hash: 文件内容的 SHA-256（可选，用于解析结果缓存）
+            export_dir: 导出目录，省略时使用默认导出目录
+        
+        Returns:
+            PipelineResult: 处理结果，export 为遮盖后的PDF
+        
+        Raises:
+            PipelineError: 某一阶段失败
+        """
+        config = normalize_config(config)
+        processor = self.file_processor
+        loop = asyncio.get_event_loop()
+        
+        try:
+            with timed("parse"):
+                metadata = await loop.run_in_executor(
+                    processor.executor, FileProcessor._read_pdf_metadata, file_path
+                )
+                total_pages = metadata["pages"]
+                chunk_size = max(total_pages, 1)
+                if (processor.backend == "process" and processor.parallel_pages
+                        and processor.max_workers > 1 and total_pages >= processor.parallel_pages):
+                    chunk_size = -(-total_pages // min(processor.max_workers, total_pages))
+                
+                futures = [
+                    loop.run_in_executor(
+                        processor.extract_executor, extract_pages, file_path,
+                        first_page, min(first_page + chunk_size - 1, total_pages)
+                    )
+                    for first_page in range(1, total_pages + 1, chunk_size)
+                ]
+                pages = [page for chunk in await asyncio.gather(*futures) for page in chunk]
+        except Exception as e:
+            raise PipelineError(1, f"文档解析失败: {str(e)}")
+        
+        if not any(page["content"].strip() for page in pages):
+            raise PipelineError(1, "文档解析失败: PDF文件中未找到可提取的文本内容")
+        
+        # 实体在拼接后的全文上识别，跨页实体同样能找到，再按页拆回字符框
+        try:
+            text, entities = await loop.run_in_executor(
+                processor.executor, analyze_pdf, pages,
+                config["enabled_rules"], config["keep_prefix"], config["keep_suffix"]
+            )
+        except Exception as e:
+            raise PipelineError(2, f"实体识别失败: {str(e)}")
+        
+        if content_hash is not None and processor.cache.enabled:
+            await loop.run_in_executor(
+                processor.executor, processor.cache.put,
+                FileProcessor.cache_key(content_hash, "application/pdf"),
+                {"content": text, "metadata": metadata}
+            )
+        
+        result = PipelineResult(
+            text=text,
+            masked_text=entities.mask_text(config["mask_char"], config["keep_prefix"], config["keep_suffix"]),
+            entities=entities,
+            metadata=metadata,
+            config=config,
+            statistics=entities.counts()
+        )
+        
+        name, _ = os.path.splitext(os.path.basename(file_path))
+        try:
+            export_path, export_filename = self._export_target(f"{name}.pdf", export_dir)
+            with timed("redact_pdf"):
+                await loop.run_in_executor(
+                    processor.extract_executor, redact_pdf, file_path, export_path,
+                    [{key: page[key] for key in ("page", "boxes", "originals")} for page in pages if page["boxes"]],
+                    config["keep_prefix"], config["keep_suffix"]
+                )
+            result.export = {
+                "export_path": export_path,
+                "export_filename": export_filename,
+                "file_size": os.path.getsize(export_path),
+                "timestamp": datetime.now().isoformat()
+            }
+        except Exception as e:
+            raise PipelineError(4, f"文件导出失败: {str(e)}")
+        
+        return result
+    
+    def _export_target(self, filename: str, export_dir: Optional[str] = None) -> tuple[str, str]:
+        """导出文件的路径和文件名，文件名追加时间戳避免覆盖"""
+        export_dir = export_dir or self.export_dir
+        os.makedirs(export_dir, exist_ok=True)
+        
+        name, ext = os.path.splitext(filename)
+        export_filename = f"{name}_anonymized_{datetime.now().strftime('%Y%m%d_%H%M%S')}{ext or '.txt'}"
+        return os.path.join(export_dir, export_filename), export_filename
+    
+    @staticmethod
+    def export_name(file_path: str) -> str:
+        """文档对应的脱敏结果文件名"""
+        name, _ = os.path.splitext(os.path.basename(file_path))
+        return f"{name}_脱敏结果.txt"
+    
+    async def run(self, file_path: str, config: Optional[Dict[str, Any]] = None,
+                  content_hash: Optional[str] = None, content_type: Optional[str] = None,
+                  export: bool = True, export_format: str = "text",
+                  pdf_engine: Optional[str] = None) -> PipelineResult:
+        """
+        执行完整流水线
+        
+        Args:
+            file_path: 文档文件路径
+            config: 脱敏配置，缺省项取默认值
+            content_hash: 文件内容的 SHA-256（可选，用于解析结果缓存）
+            content_type: 文件MIME类型，省略时按扩展名确定
+            export: 是否导出脱敏结果
+            export_format: 导出格式，"text" 为脱敏文本，"pdf" 为遮盖后的PDF（仅PDF文档，见 redact_pdf）
+            pdf_engine: PDF提取引擎，省略时使用默认引擎；遮盖输出需要字符坐标，始终使用 pdfplumber
+        
+        Returns:
+            PipelineResult: 处理结果
+        
+        Raises:
+            PipelineError: 某一阶段失败
+        """
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"不支持的导出格式: {export_format}")
+        if export and export_format == "pdf":
+            if (content_type or self.content_type_for(file_path)) != "application/pdf":
+                raise ValueError("仅PDF文档支持导出遮盖后的PDF")
+            return await self.redact_pdf(file_path, config, content_hash=content_hash)
+        
+        config = normalize_config(config)
+        
+        try:
+            extracted = await self.parse(file_path, content_type, content_hash, pdf_engine)
+        except Exception as e:
+            raise PipelineError(1, f"文档解析失败: {str(e)}")
+        text = extracted["content"]
+        
+        # 识别与脱敏为同一遍扫描，在线程池中执行避免阻塞事件循环
+        loop = asyncio.get_event_loop()
+        try:
+            masked_text, entities = await loop.run_in_executor(
+                self.file_processor.executor, self.anonymize, text, config
+            )
+        except Exception as e:
+            raise PipelineError(2, f"实体识别失败: {str(e)}")
+        
+        result = PipelineResult(
+            text=text,
+            masked_text=masked_text,
+            entities=entities,
+            metadata=extracted.get("metadata", {}),
+            config=config,
+            statistics=entities.counts()
+        )
+        
+        if export:
+            try:
+                result.export = await self.export(masked_text, self.export_name(file_path))
+            except Exception as e:
+                raise PipelineError(4, f"文件导出失败: {str(e)}")
+        
+        return result
+    
+    async def process(self, file_path: str, config: Optional[Dict[str, Any]] = None,
+                      content_hash: Optional[str] = None, export_format: str = "text",
+                      pdf_engine: Optional[str] = None) -> Dict[str, Any]:
+        """
+        执行完整流水线，返回智能体处理结果的结构，失败时不抛出异常
+        
+        Args:
+            file_path: 文档文件路径
+            config: 脱敏配置
+            content_hash: 文件内容的 SHA-256（可选，用于解析结果缓存）
+            export_format: 导出格式，"text" 或 "pdf"
+            pdf_engine: PDF提取引擎，省略时使用默认引擎
+            
+        Returns:
+            Dict: 处理结果
+        """
+        try:
+            result = await self.run(
+                file_path, config, content_hash=content_hash,
+                export_format=export_format, pdf_engine=pdf_engine
+            )
+            return result.to_dict()
+            
+        except PipelineError as e:
+            steps = [
+                {"step": step, "action": action, "status": "完成"}
+                for step, action in enumerate(STAGES[:e.stage - 1], 1)
+            ]
+            steps.append({"step": e.stage, "action": STAGES[e.stage - 1], "status": "失败", "error": str(e)})
+            return {
+                "success": False,
+                "steps": steps,
+                "error": str(e),
+                "timestamp": datetime.now().isoformat()
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"处理过程中发生错误: {str(e)}",
+                "timestamp": datetime.now().isoformat()
+            }
+    
+    async def process_stream(self, file_path: str, config: Optional[Dict[str, Any]] = None,
+                             content_hash: Optional[str] = None,
+                             pdf_engine: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        流式处理文档，逐步产出进度事件
+        
+        PDF 逐页解析，每页到达即识别并脱敏，立即产出该页的脱敏文本；
+        其他文档（以及解析结果缓存命中的 PDF）整体解析后按固定长度分块产出。
+        脱敏文本边产出边写入导出文件，实体只累计统计，内存占用与文档长度无关；
+        PDF 的页面文本先写入临时文件，处理完成后再写入解析结果缓存。
+        最后产出的 complete 事件只含统计摘要和导出信息，不重复全文和实体列表。
+        
+        Args:
+            file_path: 文档文件路径
+            config: 脱敏配置
+            content_hash: 文件内容的 SHA-256（可选，用于解析结果缓存）
+            pdf_engine: PDF提取引擎，省略时使用默认引擎
+            
+        Yields:
+            Dict: 事件，type 为 start / progress / chunk / complete / error，
+                逐页进度以 progress 事件携带 page / total_pages 字段；
+                chunk 事件携带 masked_text、对应的 original_text 和 entities（全文偏移量）
+        """
+        config = normalize_config(config)
+        processor = self.file_processor
+        loop = asyncio.get_event_loop()
+        
+        steps = []
+        
+        def progress(step: int, action: str, status: str, message: str, **extra) -> Dict[str, Any]:
+            if len(steps) < step:
+                steps.append({"step": step, "action": action, "status": status})
+            steps[step - 1]["status"] = status
+            if extra:
+                steps[step - 1]["result"] = extra
+            return {
+                "type": "progress",
+                "step": step,
+                "action": action,
+                "status": status,
+                "message": message,
+                **extra
+            }
+        
+        export_file = None
+        export_path = None
+        spool = None
+        try:
+            yield {"type": "start", "message": "开始处理文件", "timestamp": datetime.now().isoformat()}
+            
+            anonymizer = get_anonymizer(config["enabled_rules"])
+            masker = anonymizer.create_stream_masker(
+                config["mask_char"], config["keep_prefix"], config["keep_suffix"]
+            )
+            
+            export_path, export_filename = self._export_target(self.export_name(file_path))
+            export_file = await aiofiles.open(export_path, "wb")
+            
+            statistics: Counter = Counter()
+            entity_count = 0
+            pending_original = ""     # 已送入脱敏器、尚未输出的原文
+            original_length = 0       # 已输出的原文长度（不含末尾空白）
+            original_trailing = 0     # 已输出原文末尾的空白字符数
+            masked_length = 0         # 已写入导出文件的脱敏文本长度
+            masked_trailing = ""      # 已输出脱敏文本末尾的空白，后面还有内容时才写入导出文件
+            leading = True
+            
+            async def mask_chunk(text: str, final: bool = False) -> Optional[Dict[str, Any]]:
+                nonlocal leading, pending_original, original_length, original_trailing
+                nonlocal masked_length, masked_trailing, entity_count
+                # 去掉开头的空白，保证实体位置与整篇提取后 strip 的文本一致
+                if leading:
+                    text = text.lstrip()
+                    leading = not text
+                pending_original += text
+                emitted_before = masker.emitted
+                masked, found = masker.finish() if final else masker.feed(text)
+                if not masked:
+                    return None
+                
+                size = masker.emitted - emitted_before
+                original, pending_original = pending_original[:size], pending_original[size:]
+                entity_count += len(found)
+                statistics.update(found.counts())
+                
+                # 末尾空白暂不计入，与整篇处理后 rstrip 的结果一致
+                stripped = original.rstrip()
+                if stripped:
+                    original_length += original_trailing + len(stripped)
+                    original_trailing = len(original) - len(stripped)
+                else:
+                    original_trailing += len(original)
+                
+                masked_tail = masked_trailing + masked
+                body = masked_tail.rstrip()
+                masked_trailing = masked_tail[len(body):]
+                if body:
+                    await export_file.write(body.encode("utf-8"))
+                    masked_length += len(body)
+                
+                return {"type": "chunk", "masked_text": masked, "original_text": original,
+                        "entities": found.to_dicts()}
+            
+            # 步骤1: 解析文档（PDF 逐页解析并同步完成识别与脱敏）
+            yield progress(1, "解析文档", "进行中", "正在解析文档...")
+            
+            content_type = self.content_type_for(file_path)
+            cached = None
+            cache_key = None
+            if content_type == "application/pdf":
+                engine = None
+                if content_hash is not None and processor.cache.enabled:
+                    engine, cached = await processor.lookup_pdf_cache(content_hash, pdf_engine)
+                if engine is None:
+                    engine, _ = await processor.resolve_pdf_engine(file_path, pdf_engine)
+                if content_hash is not None and processor.cache.enabled:
+                    cache_key = FileProcessor.cache_key(content_hash, content_type, engine)
+            
+            metadata = {}
+            if content_type == "application/pdf" and cached is None:
+                if cache_key is not None:
+                    spool = tempfile.TemporaryFile("w+", encoding="utf-8")
+                async for page in processor.stream_pdf_pages(file_path, metadata, engine):
+                    if spool is not None:
+                        await loop.run_in_executor(processor.executor, spool.write, page["content"])
+                    chunk = await mask_chunk(page["content"])
+                    yield {
+                        "type": "progress",
+                        "step": 1,
+                        "action": "解析文档",
+                        "status": "进行中",
+                        "page": page["page"],
+                        "total_pages": page["total_pages"],
+                        "message": f"已解析第 {page['page']}/{page['total_pages']} 页"
+                    }
+                    if chunk:
+                        yield chunk
+            else:
+                if cached is not None:
+                    parse_result = cached
+                else:
+                    try:
+                        parse_result = await self.parse(file_path, content_type, content_hash, pdf_engine)
+                    except Exception as e:
+                        raise Exception(f"文档解析失败: {str(e)}")
+                metadata = parse_result["metadata"]
+                content = parse_result["content"]
+                for offset in range(0, len(content), self.STREAM_CHUNK_SIZE):
+                    chunk = await mask_chunk(content[offset:offset + self.STREAM_CHUNK_SIZE])
+                    if chunk:
+                        yield chunk
+            
+            chunk = await mask_chunk("", final=True)
+            if chunk:
+                yield chunk
+            
+            if not original_length:
+                raise Exception("文档中未找到可提取的文本内容")
+            
+            if spool is not None:
+                await loop.run_in_executor(
+                    processor.executor, self._cache_spooled, cache_key, spool, metadata
+                )
+            
+            yield progress(1, "解析文档", "完成", f"文档解析完成，共 {original_length} 字符",
+                           text_length=original_length, metadata=metadata)
+            
+            # 步骤2: 识别敏感实体
+            entity_statistics = dict(statistics)
+            yield progress(2, "识别敏感实体", "完成", f"发现 {entity_count} 个敏感实体",
+                           entity_count=entity_count, entity_statistics=entity_statistics)
+            
+            # 步骤3: 脱敏处理
+            yield progress(3, "脱敏处理", "完成", f"已脱敏 {entity_count} 处敏感信息",
+                           entities_processed=entity_count,
+                           original_length=original_length,
+                           masked_length=masked_length)
+            
+            # 步骤4: 导出文件（脱敏文本已在处理过程中写入）
+            yield progress(4, "导出文件", "进行中", "正在导出脱敏结果...")
+            
+            try:
+                await export_file.close()
+                export_file = None
+                export = {
+                    "export_path": export_path,
+                    "export_filename": export_filename,
+                    "file_size": os.path.getsize(export_path),
+                    "timestamp": datetime.now().isoformat()
+                }
+            except Exception as e:
+                steps[-1]["status"] = "失败"
+                steps[-1]["error"] = str(e)
+                raise Exception(f"文件导出失败: {str(e)}")
+            
+            yield progress(4, "导出文件", "完成", f"已导出 {export_filename}",
+                           export_path=export["export_path"], file_size=export["file_size"])
+            export_path = None
+            
+            yield {"type": "complete", "result": {
+                "success": True,
+                "steps": steps,
+                "timestamp": datetime.now().isoformat(),
+                "entity_statistics": entity_statistics,
+                "export_info": {"success": True, **export},
+                "config_used": config,
+                "processing_summary": {
+                    "original_length": original_length,
+                    "masked_length": masked_length,
+                    "entities_count": entity_count,
+                    "steps_completed": len([s for s in steps if s["status"] == "完成"])
+                }
+            }}
+            
+        except Exception as e:
+            yield {
+                "type": "error",
+                "message": f"处理过程中发生错误: {str(e)}",
+                "steps": steps,
+                "timestamp": datetime.now().isoformat()
+            }
+        finally:
+            if spool is not None:
+                spool.close()
+            if export_file is not None:
+                await export_file.close()
+            # 未完成时删除写了一半的导出文件
+            if export_path is not None and os.path.exists(export_path):
+                os.remove(export_path)
+    
+    def _cache_spooled(self, cache_key: str, spool, metadata: Dict[str, Any]):
+        """把临时文件中的页面文本写入解析结果缓存，在线程池中执行"""
+        spool.seek(0)
+        content = spool.read().strip()
+        if content:
+            self.file_processor.cache.put(cache_key, {"content": content, "metadata": metadata})
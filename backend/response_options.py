@@ -0,0 +1,94 @@
+"""
+响应结构选项
+允许调用方省略原文、以紧凑的偏移量格式返回实体，或只保留指定字段，
+减少大文档响应的序列化和传输量
+"""
+
+from typing import Dict, Any, List, Optional, Iterable, Union
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+from rule_anonymizer import EntityList
+
+
+# 实体格式：full 为完整字典；offsets 为 [start, end, type] 三元组，不含原文
+ENTITY_FORMATS = ("full", "offsets")
+
+
+class ResponseOptions(BaseModel):
+    """响应结构选项"""
+    include_original: bool = True
+    entity_format: str = "full"
+    fields: Optional[List[str]] = None
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """解析逗号分隔的字段列表（用于查询参数）"""
+    if not fields:
+        return None
+    return [name.strip() for name in fields.split(",") if name.strip()]
+
+
+def check_options(options: ResponseOptions):
+    """校验响应结构选项，不合法时返回 400"""
+    if options.entity_format not in ENTITY_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"不支持的实体格式: {options.entity_format}，可选: {', '.join(ENTITY_FORMATS)}"
+        )
+
+
+def format_entities(entities: Union[List[Dict[str, Any]], EntityList],
+                    entity_format: str = "full") -> List[Any]:
+    """
+    按指定格式输出实体列表
+    
+    Args:
+        entities: 实体字典列表或紧凑实体集合
+        entity_format: full 或 offsets
+    
+    Returns:
+        List: 格式化后的实体列表
+    """
+    if isinstance(entities, EntityList):
+        if entity_format == "offsets":
+            return entities.to_offsets()
+        return entities.to_dicts()
+    if entity_format == "offsets":
+        return [[entity["start"], entity["end"], entity["type"]] for entity in entities]
+    return entities
+
+
+def shape_response(result: Dict[str, Any], options: ResponseOptions,
+                   original_keys: Iterable[str] = (),
+                   entity_keys: Iterable[str] = ()) -> Dict[str, Any]:
+    """
+    按选项裁剪响应
+    
+    Args:
+        result: 完整响应
+        options: 响应结构选项
+        original_keys: 存放原文的字段名，include_original 为 False 时删除
+        entity_keys: 存放实体列表的字段名，按 entity_format 转换
+    
+    Returns:
+        Dict: 裁剪后的响应
+    """
+    check_options(options)
+    
+    if not options.include_original:
+        for key in original_keys:
+            result.pop(key, None)
+    
+    for key in entity_keys:
+        if key in result:
+            result[key] = format_entities(result[key], options.entity_format)
+    
+    if options.entity_format != "full":
+        result["entity_format"] = options.entity_format
+    
+    if options.fields:
+        result = {key: value for key, value in result.items() if key in options.fields}
+    
+    return result
@@ -1,7 +1,16 @@
+import os
 import re
-from typing import List, Dict, Optional, Set
+import threading
+import time
+from array import array
+from collections import Counter, OrderedDict
+from concurrent.futures import Executor
+from itertools import repeat
+from typing import List, Dict, Optional, Set, FrozenSet, Iterable, Iterator, Sequence
 from dataclasses import dataclass
 
+from metrics import SCAN_GUARD_TRIPS, observe_stage
+
 
 @dataclass
 class MatchEntity:
@@ -12,6 +21,343 @@ class MatchEntity:
     original_text: str
 
 
+class EntityList:
+    """
+    紧凑的实体集合
+    
+    开始、结束位置存放在 64 位整数数组中，类型存为 types 元组下标的单字节编码，
+    原文不单独保存，需要时从 text 中切片得到。大文档的数万个实体只占用三个数组，
+    计数、排序和遮罩都直接在数组上完成，只有在返回给接口调用方时才通过
+    to_dicts 转为字典列表。
+    
+    实体位置所在坐标系中 text 的起点为 base，即实体原文为
+    text[start - base:end - base]。
+    """
+    
+    __slots__ = ('text', 'base', 'types', 'starts', 'ends', 'codes')
+    
+    def __init__(self, text: str, types: Sequence[str], base: int = 0):
+        """
+        Args:
+            text: 实体所在的源文本
+            types: 类型编码对应的类型名称
+            base: text 起点在实体坐标系中的位置
+        """
+        self.text = text
+        self.base = base
+        self.types = tuple(types)
+        self.starts = array('q')
+        self.ends = array('q')
+        self.codes = array('B')
+    
+    def append(self, start: int, end: int, code: int):
+        """追加一个实体，code 为 types 中的下标"""
+        self.starts.append(start)
+        self.ends.append(end)
+        self.codes.append(code)
+    
+    def __len__(self) -> int:
+        return len(self.starts)
+    
+    def __getitem__(self, index: int) -> MatchEntity:
+        start, end = self.starts[index], self.ends[index]
+        return MatchEntity(start, end, self.types[self.codes[index]], self.original(index))
+    
+    def __iter__(self) -> Iterator[MatchEntity]:
+        for index in range(len(self.starts)):
+            yield self[index]
+    
+    def original(self, index: int) -> str:
+        """第 index 个实体的原文"""
+        base = self.base
+        return self.text[self.starts[index] - base:self.ends[index] - base]
+    
+    def counts(self) -> Dict[str, int]:
+        """按类型统计实体数量，类型按首次出现的顺序排列"""
+        tally = Counter(self.codes)
+        codes = sorted(tally, key=self.codes.index)
+        return {self.types[code]: tally[code] for code in codes}
+    
+    def order(self) -> List[int]:
+        """按开始位置排序的实体下标（稳定排序）"""
+        return sorted(range(len(self.starts)), key=self.starts.__getitem__)
+    
+    def sorted(self) -> 'EntityList':
+        """返回按开始位置排序的新集合"""
+        return self.select(self.order())
+    
+    def select(self, indices: Iterable[int]) -> 'EntityList':
+        """
+        按下标选出部分实体
+        
+        Args:
+            indices: 实体下标
+            
+        Returns:
+            EntityList: 与原集合共享源文本的新集合
+        """
+        result = EntityList(self.text, self.types, self.base)
+        starts, ends, codes = self.starts, self.ends, self.codes
+        for index in indices:
+            result.starts.append(starts[index])
+            result.ends.append(ends[index])
+            result.codes.append(codes[index])
+        return result
+    
+    def shifted(self, offset: int) -> 'EntityList':
+        """返回所有位置平移 offset 后的新集合"""
+        result = EntityList(self.text, self.types, self.base + offset)
+        result.starts = array('q', [start + offset for start in self.starts])
+        result.ends = array('q', [end + offset for end in self.ends])
+        result.codes = array('B', self.codes)
+        return result
+    
+    @classmethod
+    def merge(cls, parts: Iterable['EntityList'], text: str, base: int = 0) -> 'EntityList':
+        """
+        依次拼接多个集合，用于合并分块处理的结果
+        
+        Args:
+            parts: 实体位置处于同一坐标系的集合
+            text: 合并后对应的完整源文本
+            base: text 起点在实体坐标系中的位置
+            
+        Returns:
+            EntityList: 合并后的集合
+        """
+        result = cls(text, (), base)
+        types = []
+        for part in parts:
+            codes = part.codes
+            if list(part.types) != types[:len(part.types)]:
+                # 类型编码不一致时重新编号
+                mapping = []
+                for name in part.types:
+                    if name not in types:
+                        types.append(name)
+                    mapping.append(types.index(name))
+                codes = array('B', [mapping[code] for code in codes])
+            result.starts.extend(part.starts)
+            result.ends.extend(part.ends)
+            result.codes.extend(codes)
+        result.types = tuple(types)
+        return result
+    
+    def to_dicts(self) -> List[Dict[str, any]]:
+        """
+        转为接口使用的字典列表
+        
+        Returns:
+            List[Dict]: [{"start": ..., "end": ..., "type": ..., "original": ...}]
+        """
+        text, base, types = self.text, self.base, self.types
+        return [
+            {"start": start, "end": end, "type": types[code], "original": text[start - base:end - base]}
+            for start, end, code in zip(self.starts, self.ends, self.codes)
+        ]
+    
+    def to_offsets(self) -> List[list]:
+        """转为 [start, end, type] 三元组列表，不含原文"""
+        types = self.types
+        return [
+            [start, end, types[code]]
+            for start, end, code in zip(self.starts, self.ends, self.codes)
+        ]
+    
+    def mask_text(self, mask_char: str = '*', keep_prefix: int = 2, keep_suffix: int = 2,
+                  start: Optional[int] = None, end: Optional[int] = None) -> str:
+        """
+        对源文本进行遮罩替换，重叠处理规则与 apply_masks 相同
+        
+        Args:
+            mask_char: 遮罩字符
+            keep_prefix: 保留前缀字符数
+            keep_suffix: 保留后缀字符数
+            start: 输出范围起点（实体坐标），默认为源文本起点
+            end: 输出范围终点（实体坐标），默认为源文本终点
+            
+        Returns:
+            str: [start, end) 范围内脱敏后的文本
+        """
+        started = time.perf_counter()
+        text, base = self.text, self.base
+        cursor = 0 if start is None else start - base
+        stop = len(text) if end is None else end - base
+        starts, ends = self.starts, self.ends
+        
+        parts = []
+        for index in self.order():
+            entity_start, entity_end = starts[index] - base, ends[index] - base
+            if entity_end <= cursor:
+                continue
+            
+            masked = mask_value(text[entity_start:entity_end], mask_char, keep_prefix, keep_suffix)
+            if entity_start >= cursor:
+                parts.append(text[cursor:entity_start])
+                parts.append(masked)
+            else:
+                # 与前一个实体重叠，只输出未覆盖的部分
+                parts.append(masked[cursor - entity_start:])
+            cursor = entity_end
+        
+        parts.append(text[cursor:stop])
+        result = "".join(parts)
+        observe_stage("mask", time.perf_counter() - started)
+        return result
+
+
+def mask_value(original: str, mask_char: str = '*',
+               keep_prefix: int = 2, keep_suffix: int = 2) -> str:
+    """
+    计算单个敏感值的遮罩结果
+    
+    Args:
+        original: 原始文本
+        mask_char: 遮罩字符
+        keep_prefix: 保留前缀字符数
+        keep_suffix: 保留后缀字符数
+        
+    Returns:
+        str: 遮罩后的文本，长度与原文相同
+    """
+    if len(original) <= keep_prefix + keep_suffix:
+        # 如果字符串太短，全部用遮罩字符
+        return mask_char * len(original)
+    
+    # 保留前缀和后缀，中间用遮罩字符
+    prefix = original[:keep_prefix]
+    suffix = original[-keep_suffix:] if keep_suffix > 0 else ""
+    middle_length = len(original) - keep_prefix - keep_suffix
+    return prefix + mask_char * middle_length + suffix
+
+
+def apply_masks(text: str, entities: List[Dict[str, any]], mask_char: str = '*',
+                keep_prefix: int = 2, keep_suffix: int = 2, offset: int = 0) -> str:
+    """
+    按实体位置对文本进行遮罩替换
+    
+    按开始位置顺序单遍扫描，把未改动的片段和遮罩结果收集到列表后一次拼接，
+    耗时与文本长度加实体数成线性关系。实体重叠时，开始位置靠前的实体优先，
+    开始位置相同时列表中靠前的优先，后者只输出超出已覆盖范围的部分。
+    
+    Args:
+        text: 输入文本
+        entities: 实体列表，需包含 start、end、original
+        mask_char: 遮罩字符
+        keep_prefix: 保留前缀字符数
+        keep_suffix: 保留后缀字符数
+        offset: 实体位置相对 text 起点的偏移量
+        
+    Returns:
+        str: 脱敏后的文本
+    """
+    if not entities:
+        return text
+    
+    parts = []
+    cursor = 0
+    for entity in sorted(entities, key=lambda x: x["start"]):
+        start, end = entity["start"] - offset, entity["end"] - offset
+        if end <= cursor:
+            continue
+        
+        masked = mask_value(entity["original"], mask_char, keep_prefix, keep_suffix)
+        if start >= cursor:
+            parts.append(text[cursor:start])
+            parts.append(masked)
+        else:
+            # 与前一个实体重叠，只输出未覆盖的部分
+            parts.append(masked[cursor - start:])
+        cursor = end
+    
+    parts.append(text[cursor:])
+    return "".join(parts)
+
+
+@dataclass(frozen=True)
+class ScanGuard:
+    """
+    实体识别的扫描保护
+    
+    长文本按 window 个起点分段扫描，每段的前瞻最多看到段尾之后 reach 个字符，
+    单个起点的回溯范围因此有上限。某段耗时超过 max_us_per_kb（微秒/KB）时
+    逐条规则计时，超标的规则从组合匹配器中拆出，文档剩余部分改用 guarded_window
+    的小窗口单独扫描，避免一篇病态文档长时间占住工作进程。
+    
+    长度超过 reach 的实体可能被截断或漏识别，与 StreamMasker 的 overlap 限制相同。
+    """
+    window: int = 8192
+    reach: int = 1024
+    max_us_per_kb: float = 5000
+    guarded_window: int = 256
+    
+    @classmethod
+    def from_env(cls) -> Optional['ScanGuard']:
+        """
+        根据环境变量创建扫描保护
+        
+        SCAN_GUARD_WINDOW: 分段长度（字符数），默认 8192，0 表示关闭扫描保护
+        SCAN_GUARD_REACH: 前瞻可越过段尾的字符数，默认 1024
+        SCAN_GUARD_MAX_US_PER_KB: 单段每 KB 耗时上限（微秒），默认 5000
+        """
+        window = int(os.getenv("SCAN_GUARD_WINDOW", cls.window))
+        if window <= 0:
+            return None
+        return cls(
+            window=window,
+            reach=int(os.getenv("SCAN_GUARD_REACH", cls.reach)),
+            max_us_per_kb=float(os.getenv("SCAN_GUARD_MAX_US_PER_KB", cls.max_us_per_kb)),
+        )
+
+
+def scan_rule(pattern: re.Pattern, text: str, start: int, stop: int,
+              window: int, reach: int, last_end: int = 0) -> List[tuple]:
+    """
+    分段查找单条规则在 [start, stop) 内起始的匹配
+    
+    每 window 个起点为一段，段内前瞻最多看到段尾之后 reach 个字符；
+    匹配互不重叠，结果与 pattern.finditer 相同（长度超过 reach 的实体除外）。
+    
+    Args:
+        pattern: 规则正则
+        text: 全文
+        start: 起点范围的开头
+        stop: 起点范围的结尾
+        window: 每段的起点数
+        reach: 前瞻可越过段尾的字符数
+        last_end: 该规则上一个匹配的结束位置，之前的位置不再匹配
+    
+    Returns:
+        List[tuple]: [(开始位置, 结束位置), ...]
+    """
+    found = []
+    length = len(text)
+    pos = max(start, last_end)
+    while pos < stop:
+        segment_end = min(pos + window, stop)
+        next_pos = segment_end
+        for match in pattern.finditer(text, pos, min(segment_end + reach, length)):
+            if match.start() >= segment_end:
+                break
+            found.append(match.span())
+            next_pos = max(segment_end, match.end())
+        pos = next_pos
+    return found
+
+
+DEFAULT_SCAN_GUARD = ScanGuard.from_env()
+
+# 所有支持的规则类型，按声明顺序组合匹配：同一位置命中多条规则时实体按此顺序排列。
+# 不使用集合的迭代顺序，它随字符串哈希的随机种子变化，各工作进程不一致
+RULE_ORDER = (
+    'IDCARD',      # 身份证号
+    'PHONE',       # 手机号
+    'EMAIL',       # 邮箱
+    'BANKCARD',    # 银行卡号
+    'CASE_NUMBER'  # 案号
+)
+
+
 class RuleAnonymizer:
     """
     脱敏规则模块
@@ -26,19 +372,22 @@ class RuleAnonymizer:
             enabled_rules: 启用的规则集合，默认启用所有规则
         """
         # 所有支持的规则类型
-        self.ALL_RULES = {
-            'IDCARD',      # 身份证号
-            'PHONE',       # 手机号
-            'EMAIL',       # 邮箱
-            'BANKCARD',    # 银行卡号
-            'CASE_NUMBER'  # 案号
-        }
+        self.ALL_RULES = set(RULE_ORDER)
         
         # 设置启用的规则
         self.enabled_rules = enabled_rules if enabled_rules is not None else self.ALL_RULES.copy()
         
         # 定义正则表达式规则
         self.patterns = self._init_patterns()
+        
+        # 各规则匹配首字符，用于组合匹配器跳过不可能命中的位置
+        self.start_chars = self._init_start_chars()
+        
+        # 组合匹配器缓存，按启用规则的顺序及其正则对象索引
+        self._combined_cache: Dict[tuple, tuple] = {}
+        
+        # 长文本的分段扫描保护，None 表示整篇一次扫描
+        self.scan_guard: Optional[ScanGuard] = DEFAULT_SCAN_GUARD
     
     def _init_patterns(self) -> Dict[str, re.Pattern]:
         """初始化正则表达式模式"""
@@ -61,9 +410,10 @@ class RuleAnonymizer:
         )
         
         # 邮箱地址
-        # 支持常见的邮箱格式
+        # 支持常见的邮箱格式；用户名和域名按 RFC 5321 限长，
+        # 避免在 "a.a.a..." 这类不含 @ 的长串上逐位置回溯到串尾
         patterns['EMAIL'] = re.compile(
-            r'\b[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}\b'
+            r'\b[a-zA-Z0-9._%+-]{1,64}@[a-zA-Z0-9.-]{1,255}\.[a-zA-Z]{2,}\b'
         )
         
         # 银行卡号 - 13-19位数字，但排除身份证号格式
@@ -76,13 +426,89 @@ class RuleAnonymizer:
         # 案号 - 常见的法院案号格式
         # 格式：(年份)地区法院类型字第数字号
         # 例：(2023)京01民初123号、(2024)沪0101刑初456号
+        # 两段非贪婪匹配限长 30 个字符：不限长时，年份后跟一长段不含括号和“号”的文本
+        # 会使两段嵌套回溯，耗时随文本长度平方增长
         patterns['CASE_NUMBER'] = re.compile(
-            r'\(\d{4}\)[^()]*?(?:民|刑|行|执|赔|知|破|清|仲|调|特|其他)[^()]*?(?:第\d+号|\d+号)',
+            r'\(\d{4}\)[^()]{0,30}?(?:民|刑|行|执|赔|知|破|清|仲|调|特|其他)[^()]{0,30}?(?:第\d+号|\d+号)',
             re.IGNORECASE
         )
         
         return patterns
     
+    def _init_start_chars(self) -> Dict[str, str]:
+        """
+        初始化各规则匹配首字符的字符类
+        
+        新增规则时应同步补充；缺少首字符定义的规则仍可正常匹配，
+        只是组合匹配器会退化为逐位置尝试。
+        """
+        return {
+            'IDCARD': r'[1-9]',
+            'PHONE': r'1',
+            'EMAIL': r'[a-zA-Z0-9._%+-]',
+            'BANKCARD': r'\d',
+            'CASE_NUMBER': r'\(',
+        }
+    
+    @staticmethod
+    def _scoped_pattern(pattern: re.Pattern) -> str:
+        """将编译标志转为局部内联标志，便于拼接进组合正则"""
+        flags = ''.join(
+            letter for flag, letter in (
+                (re.IGNORECASE, 'i'), (re.MULTILINE, 'm'),
+                (re.DOTALL, 's'), (re.VERBOSE, 'x')
+            ) if pattern.flags & flag
+        )
+        if flags:
+            return f'(?{flags}:{pattern.pattern})'
+        return f'(?:{pattern.pattern})'
+    
+    def _rule_order(self) -> tuple:
+        """启用且有正则的规则，按 RULE_ORDER 的声明顺序排列"""
+        return tuple(
+            rule_type for rule_type in RULE_ORDER
+            if rule_type in self.enabled_rules and rule_type in self.patterns
+        )
+    
+    def _get_combined_matcher(self, rule_order: tuple) -> tuple:
+        """
+        获取（必要时编译）覆盖全部启用规则的组合匹配器
+        
+        每条规则包装为一个可选的命名前瞻分组，整体只扫描一遍文本，
+        在每个候选位置一次性得到所有在此处命中的规则。前瞻外层的
+        首字符类让正则引擎直接跳过不可能成为实体开头的字符。
+        
+        Args:
+            rule_order: 启用规则的有序元组
+            
+        Returns:
+            tuple: (组合正则, [(规则类型, 分组序号), ...])
+        """
+        cache_key = tuple((rule_type, self.patterns[rule_type]) for rule_type in rule_order)
+        cached = self._combined_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        if all(rule_type in self.start_chars for rule_type in rule_order):
+            lead = '(?:' + '|'.join(self.start_chars[rule_type] for rule_type in rule_order) + ')'
+        else:
+            lead = '(?s:.)'
+        
+        lookaheads = ''.join(
+            f'(?:(?=(?P<{rule_type}>{self._scoped_pattern(self.patterns[rule_type])}))|)'
+            for rule_type in rule_order
+        )
+        # 至少一条规则命中时才算匹配成功
+        condition = '(?!)'
+        for rule_type in reversed(rule_order):
+            condition = f'(?({rule_type})|{condition})'
+        
+        combined = re.compile(f'{lead}(?<={lookaheads}{lead}){condition}')
+        groups = [(rule_type, combined.groupindex[rule_type]) for rule_type in rule_order]
+        
+        self._combined_cache[cache_key] = (combined, groups)
+        return combined, groups
+    
     def enable_rule(self, rule_type: str) -> bool:
         """
         启用指定规则
@@ -138,6 +564,137 @@ class RuleAnonymizer:
         self.enabled_rules = rules.copy()
         return True
     
+    def find_entities(self, text: str, pos: int = 0) -> EntityList:
+        """
+        从文本中提取敏感实体，返回紧凑集合
+        
+        Args:
+            text: 输入文本
+            pos: 扫描起点，只识别从该位置开始的实体；与先切片再识别不同，
+                \b 等边界判断仍能看到起点之前的字符
+        
+        Returns:
+            EntityList: 按开始位置排列的实体集合
+        """
+        started = time.perf_counter()
+        rule_order = self._rule_order()
+        entities = EntityList(text, rule_order)
+        if not rule_order:
+            return entities
+        
+        guard = self.scan_guard
+        if guard is not None and len(text) - pos > guard.window + guard.reach:
+            self._find_entities_guarded(text, rule_order, entities, guard, pos)
+            observe_stage("detect", time.perf_counter() - started)
+            return entities
+        
+        combined, groups = self._get_combined_matcher(rule_order)
+        
+        # 与逐条规则 finditer 等价：同一规则的匹配互不重叠，
+        # 不同规则之间的重叠全部保留；同一起点按 RULE_ORDER 顺序排列
+        starts, ends, codes = entities.starts, entities.ends, entities.codes
+        last_end = [0] * len(rule_order)
+        for match in combined.finditer(text, pos):
+            regs = match.regs
+            for code, (_, group_index) in enumerate(groups):
+                start, end = regs[group_index]
+                if start >= last_end[code]:
+                    last_end[code] = end
+                    starts.append(start)
+                    ends.append(end)
+                    codes.append(code)
+        
+        observe_stage("detect", time.perf_counter() - started)
+        return entities
+    
+    def _find_entities_guarded(self, text: str, rule_order: tuple,
+                               entities: EntityList, guard: ScanGuard, pos: int = 0):
+        """
+        分段扫描长文本，结果与整篇扫描相同（见 ScanGuard）
+        
+        每段扫描后检查耗时，超标时逐条规则计时，把超标的规则拆出单独扫描。
+        """
+        starts, ends, codes = entities.starts, entities.ends, entities.codes
+        last_end = [0] * len(rule_order)
+        active = list(range(len(rule_order)))   # 由组合匹配器扫描的规则
+        isolated: List[int] = []                 # 已拆出单独扫描的规则
+        length = len(text)
+        
+        for window_start in range(pos, length, guard.window):
+            window_end = min(window_start + guard.window, length)
+            endpos = min(window_end + guard.reach, length)
+            began = time.perf_counter()
+            
+            found = []
+            if active:
+                combined, groups = self._get_combined_matcher(tuple(rule_order[code] for code in active))
+                for match in combined.finditer(text, window_start, endpos):
+                    if match.start() >= window_end:
+                        break
+                    regs = match.regs
+                    for code, (_, group_index) in zip(active, groups):
+                        start, end = regs[group_index]
+                        if start >= last_end[code]:
+                            last_end[code] = end
+                            found.append((start, code, end))
+            
+            for code in isolated:
+                for start, end in scan_rule(self.patterns[rule_order[code]], text, window_start, window_end,
+                                            guard.guarded_window, guard.reach, last_end[code]):
+                    last_end[code] = end
+                    found.append((start, code, end))
+            
+            if isolated:
+                # 合并后恢复“按起点、同一起点按规则顺序”的排列
+                found.sort()
+            for start, code, end in found:
+                starts.append(start)
+                ends.append(end)
+                codes.append(code)
+            
+            kilobytes = (window_end - window_start) / 1024
+            if active and (time.perf_counter() - began) * 1e6 / kilobytes > guard.max_us_per_kb:
+                for code in list(active):
+                    cost = self._time_rule(self.patterns[rule_order[code]], text,
+                                           window_start, window_end, guard)
+                    if cost * 1e6 / kilobytes > guard.max_us_per_kb:
+                        active.remove(code)
+                        isolated.append(code)
+                        SCAN_GUARD_TRIPS.inc(rule=rule_order[code])
+    
+    @staticmethod
+    def _time_rule(pattern: re.Pattern, text: str, start: int, stop: int, guard: ScanGuard) -> float:
+        """单条规则扫描 [start, stop) 的耗时（秒）"""
+        began = time.perf_counter()
+        scan_rule(pattern, text, start, stop, guard.window, guard.reach)
+        return time.perf_counter() - began
+    
+    def profile_rules(self, text: str) -> Dict[str, Dict[str, float]]:
+        """
+        逐条规则单独扫描全文并计时，用于定位耗时异常的规则
+        
+        按扫描保护的分段方式扫描，病态文本上也不会长时间卡住。
+        
+        Args:
+            text: 输入文本
+        
+        Returns:
+            Dict: {规则类型: {"matches": 匹配数, "seconds": 耗时, "us_per_kb": 每 KB 耗时（微秒）}}
+        """
+        guard = self.scan_guard or ScanGuard()
+        kilobytes = max(len(text), 1) / 1024
+        profile = {}
+        for rule_type in self._rule_order():
+            began = time.perf_counter()
+            spans = scan_rule(self.patterns[rule_type], text, 0, len(text), guard.window, guard.reach)
+            seconds = time.perf_counter() - began
+            profile[rule_type] = {
+                "matches": len(spans),
+                "seconds": seconds,
+                "us_per_kb": seconds * 1e6 / kilobytes,
+            }
+        return profile
+    
     def extract_entities(self, text: str) -> List[Dict[str, any]]:
         """
         从文本中提取敏感实体
@@ -149,29 +706,7 @@ class RuleAnonymizer:
             List[Dict]: 匹配的实体列表，格式：
                 [{"start": 10, "end": 28, "type": "IDCARD", "original": "110101199003078765"}]
         """
-        entities = []
-        
-        # 遍历启用的规则
-        for rule_type in self.enabled_rules:
-            if rule_type not in self.patterns:
-                continue
-                
-            pattern = self.patterns[rule_type]
-            
-            # 查找所有匹配
-            for match in pattern.finditer(text):
-                entity = {
-                    "start": match.start(),
-                    "end": match.end(),
-                    "type": rule_type,
-                    "original": match.group()
-                }
-                entities.append(entity)
-        
-        # 按开始位置排序
-        entities.sort(key=lambda x: x["start"])
-        
-        return entities
+        return self.find_entities(text).to_dicts()
     
     def anonymize_text(self, text: str, mask_char: str = '*', 
                       keep_prefix: int = 2, keep_suffix: int = 2) -> tuple[str, List[Dict[str, any]]]:
@@ -187,32 +722,107 @@ class RuleAnonymizer:
         Returns:
             tuple: (脱敏后的文本, 匹配的实体列表)
         """
-        entities = self.extract_entities(text)
+        anonymized_text, entities = self.anonymize_compact(text, mask_char, keep_prefix, keep_suffix)
+        return anonymized_text, entities.to_dicts()
+    
+    def anonymize_compact(self, text: str, mask_char: str = '*',
+                          keep_prefix: int = 2, keep_suffix: int = 2) -> tuple[str, EntityList]:
+        """
+        对文本进行脱敏处理，实体以紧凑集合返回
+        
+        Args:
+            text: 输入文本
+            mask_char: 遮罩字符
+            keep_prefix: 保留前缀字符数
+            keep_suffix: 保留后缀字符数
+            
+        Returns:
+            tuple: (脱敏后的文本, 实体集合)
+        """
+        entities = self.find_entities(text)
         
         if not entities:
             return text, entities
         
-        # 从后往前替换，避免位置偏移
-        anonymized_text = text
-        for entity in reversed(entities):
-            original = entity["original"]
-            start, end = entity["start"], entity["end"]
+        return entities.mask_text(mask_char, keep_prefix, keep_suffix), entities
+    
+    def anonymize_many(self, texts: List[str], mask_char: str = '*',
+                       keep_prefix: int = 2, keep_suffix: int = 2,
+                       executor: Optional[Executor] = None,
+                       chunk_size: int = 256) -> List[tuple[str, List[Dict[str, any]]]]:
+        """
+        批量脱敏多段文本
+        
+        所有文本共用同一个组合匹配器；传入进程池时按 chunk_size 分组分发到
+        工作进程，工作进程通过 get_anonymizer 复用各自已编译的同规则集脱敏器。
+        
+        Args:
+            texts: 文本列表
+            mask_char: 遮罩字符
+            keep_prefix: 保留前缀字符数
+            keep_suffix: 保留后缀字符数
+            executor: 可选的执行器（如进程池），None 表示在当前线程处理
+            chunk_size: 分发到执行器时每组的文本数
             
-            # 计算脱敏规则
-            if len(original) <= keep_prefix + keep_suffix:
-                # 如果字符串太短，全部用遮罩字符
-                masked = mask_char * len(original)
-            else:
-                # 保留前缀和后缀，中间用遮罩字符
-                prefix = original[:keep_prefix]
-                suffix = original[-keep_suffix:] if keep_suffix > 0 else ""
-                middle_length = len(original) - keep_prefix - keep_suffix
-                masked = prefix + mask_char * middle_length + suffix
+        Returns:
+            List[tuple]: 与输入顺序一致的 (脱敏后的文本, 匹配的实体列表) 列表
+        """
+        rules = self._rule_order()
+        
+        if executor is None or len(texts) <= chunk_size or not rules:
+            return [
+                self.anonymize_text(text, mask_char, keep_prefix, keep_suffix)
+                for text in texts
+            ]
+        
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        results = []
+        for part in executor.map(
+            _anonymize_chunk, repeat(rules), chunks,
+            repeat(mask_char), repeat(keep_prefix), repeat(keep_suffix)
+        ):
+            results.extend(part)
+        return results
+    
+    def create_stream_masker(self, mask_char: str = '*', keep_prefix: int = 2,
+                             keep_suffix: int = 2, overlap: int = 256) -> 'StreamMasker':
+        """
+        创建流式脱敏器，用于逐块推送文本（如逐页提取的PDF）
+        
+        Args:
+            mask_char: 遮罩字符
+            keep_prefix: 保留前缀字符数
+            keep_suffix: 保留后缀字符数
+            overlap: 跨块识别窗口大小（字符数）
             
-            # 替换文本
-            anonymized_text = anonymized_text[:start] + masked + anonymized_text[end:]
+        Returns:
+            StreamMasker: 流式脱敏器实例
+        """
+        return StreamMasker(self, mask_char, keep_prefix, keep_suffix, overlap)
+    
+    def anonymize_stream(self, chunks: Iterable[str], mask_char: str = '*',
+                         keep_prefix: int = 2, keep_suffix: int = 2,
+                         overlap: int = 256) -> Iterator[tuple[str, EntityList]]:
+        """
+        对分块到达的文本进行流式脱敏
         
-        return anonymized_text, entities
+        Args:
+            chunks: 文本块迭代器
+            mask_char: 遮罩字符
+            keep_prefix: 保留前缀字符数
+            keep_suffix: 保留后缀字符数
+            overlap: 跨块识别窗口大小（字符数）
+            
+        Yields:
+            tuple: (脱敏后的文本块, 该块内的实体集合)，实体位置为全文偏移量，
+                所有文本块依次拼接即为完整的脱敏文本
+        """
+        masker = self.create_stream_masker(mask_char, keep_prefix, keep_suffix, overlap)
+        for chunk in chunks:
+            masked, entities = masker.feed(chunk)
+            if masked:
+                yield masked, entities
+        yield masker.finish()
     
     def validate_entity(self, text: str, entity_type: str) -> bool:
         """
@@ -240,6 +850,177 @@ class RuleAnonymizer:
         }
 
 
+class StreamMasker:
+    """
+    流式脱敏器
+    
+    每收到一块文本即输出可以确定的脱敏文本，末尾保留 overlap 个字符的窗口
+    与下一块拼接后再识别，因此长度不超过 overlap 的跨块实体仍能被识别；
+    窗口内若有实体跨越切分点，切分点前移到该实体开头。另保留少量已输出的
+    文本作为左侧上下文，保证 \\b 等边界判断与整篇处理一致。
+    """
+    
+    # 保留的已输出文本长度，用于边界判断
+    CONTEXT = 32
+    
+    def __init__(self, anonymizer: RuleAnonymizer, mask_char: str = '*',
+                 keep_prefix: int = 2, keep_suffix: int = 2, overlap: int = 256):
+        self.anonymizer = anonymizer
+        self.mask_char = mask_char
+        self.keep_prefix = keep_prefix
+        self.keep_suffix = keep_suffix
+        self.overlap = overlap
+        
+        self._buffer = ""
+        self._buffer_offset = 0   # buffer 起点在全文中的位置
+        self._emitted = 0         # 全文中已输出到的位置
+    
+    @property
+    def emitted(self) -> int:
+        """全文中已输出到的位置，即已输出的脱敏文本对应的原文长度"""
+        return self._emitted
+    
+    def feed(self, chunk: str) -> tuple[str, EntityList]:
+        """
+        推入一块文本
+        
+        Args:
+            chunk: 文本块
+            
+        Returns:
+            tuple: (可以确定的脱敏文本, 其中的实体集合)，实体位置为全文偏移量；
+                窗口未满时返回空文本
+        """
+        if chunk:
+            self._buffer += chunk
+        if len(self._buffer) - (self._emitted - self._buffer_offset) <= self.overlap:
+            return "", EntityList("", ())
+        return self._flush(final=False)
+    
+    def finish(self) -> tuple[str, EntityList]:
+        """输出窗口中剩余的全部文本"""
+        return self._flush(final=True)
+    
+    def _flush(self, final: bool) -> tuple[str, EntityList]:
+        buffer, buffer_offset = self._buffer, self._buffer_offset
+        emitted_local = self._emitted - buffer_offset
+        
+        # 从已输出位置开始扫描：左侧上下文只用于边界判断，不能产生从中间开始的匹配，
+        # 否则这类匹配会占住同一规则的位置，挡掉与之重叠的真实实体
+        found = self.anonymizer.find_entities(buffer, emitted_local)
+        starts, ends = found.starts, found.ends
+        pending = range(len(found))
+        
+        if final:
+            cut = len(buffer)
+        else:
+            cut = max(emitted_local, len(buffer) - self.overlap)
+            # 切分点不能落在实体内部，出现跨越时前移到实体开头
+            moved = True
+            while moved:
+                moved = False
+                for index in pending:
+                    if starts[index] < cut < ends[index]:
+                        cut = starts[index]
+                        moved = True
+        
+        ready = found.select(
+            index for index in pending if ends[index] <= cut
+        ).shifted(buffer_offset)
+        
+        masked = ready.mask_text(
+            self.mask_char, self.keep_prefix, self.keep_suffix,
+            start=self._emitted, end=buffer_offset + cut
+        )
+        self._emitted = buffer_offset + cut
+        
+        # 保留少量已输出文本作为下一轮的左侧上下文
+        keep_from = max(0, cut - self.CONTEXT)
+        self._buffer = buffer[keep_from:]
+        self._buffer_offset = buffer_offset + keep_from
+        
+        return masked, ready
+
+
+class FrozenRuleAnonymizer(RuleAnonymizer):
+    """
+    规则集固定的只读脱敏器
+    
+    创建时即编译好组合匹配器，之后不允许修改启用的规则，
+    可在多个请求和线程之间安全共享。通过 get_anonymizer 获取。
+    """
+    
+    def __init__(self, enabled_rules: Optional[FrozenSet[str]] = None):
+        super().__init__(enabled_rules=set(enabled_rules) if enabled_rules is not None else None)
+        self.enabled_rules = frozenset(self.enabled_rules)
+        
+        # 预先编译组合匹配器
+        rule_order = self._rule_order()
+        if rule_order:
+            self._get_combined_matcher(rule_order)
+    
+    def enable_rule(self, rule_type: str) -> bool:
+        raise TypeError("共享脱敏器的规则不可修改，请使用 create_anonymizer 创建独立实例")
+    
+    def disable_rule(self, rule_type: str) -> bool:
+        raise TypeError("共享脱敏器的规则不可修改，请使用 create_anonymizer 创建独立实例")
+    
+    def set_enabled_rules(self, rules: Set[str]) -> bool:
+        raise TypeError("共享脱敏器的规则不可修改，请使用 create_anonymizer 创建独立实例")
+
+
+# 共享脱敏器注册表，按规则集做 LRU 淘汰
+_REGISTRY_SIZE = 64
+_registry: "OrderedDict[FrozenSet[str], FrozenRuleAnonymizer]" = OrderedDict()
+_registry_lock = threading.Lock()
+
+
+def get_anonymizer(enabled_rules: Optional[Iterable[str]] = None) -> FrozenRuleAnonymizer:
+    """
+    获取指定规则集的共享脱敏器
+    
+    同一规则集只构建一次，正则和组合匹配器在请求之间复用；
+    注册表容量有限，最久未使用的规则集会被淘汰。
+    
+    Args:
+        enabled_rules: 启用的规则列表，None 或空表示使用所有规则
+        
+    Returns:
+        FrozenRuleAnonymizer: 只读的共享脱敏器
+    """
+    key = frozenset(enabled_rules) if enabled_rules else None
+    
+    with _registry_lock:
+        anonymizer = _registry.get(key)
+        if anonymizer is not None:
+            _registry.move_to_end(key)
+            return anonymizer
+    
+    # 在锁外构建，避免编译正则时阻塞其他规则集的查询
+    anonymizer = FrozenRuleAnonymizer(key)
+    
+    with _registry_lock:
+        existing = _registry.get(key)
+        if existing is not None:
+            _registry.move_to_end(key)
+            return existing
+        _registry[key] = anonymizer
+        while len(_registry) > _REGISTRY_SIZE:
+            _registry.popitem(last=False)
+    
+    return anonymizer
+
+
+def _anonymize_chunk(rules: tuple, texts: List[str], mask_char: str,
+                     keep_prefix: int, keep_suffix: int) -> List[tuple[str, List[Dict[str, any]]]]:
+    """在工作进程中脱敏一组文本，供 RuleAnonymizer.anonymize_many 分发"""
+    anonymizer = get_anonymizer(rules)
+    return [
+        anonymizer.anonymize_text(text, mask_char, keep_prefix, keep_suffix)
+        for text in texts
+    ]
+
+
 # 便捷函数
 def create_anonymizer(enabled_rules: Optional[List[str]] = None) -> RuleAnonymizer:
     """
@@ -266,7 +1047,7 @@ def quick_extract(text: str, rules: Optional[List[str]] = None) -> List[Dict[str
     Returns:
         List[Dict]: 匹配的实体列表
     """
-    anonymizer = create_anonymizer(rules)
+    anonymizer = get_anonymizer(rules)
     return anonymizer.extract_entities(text)
 
 
@@ -283,5 +1064,5 @@ def quick_anonymize(text: str, rules: Optional[List[str]] = None,
     Returns:
         tuple: (脱敏后的文本, 匹配的实体列表)
     """
-    anonymizer = create_anonymizer(rules)
+    anonymizer = get_anonymizer(rules)
     return anonymizer.anonymize_text(text, mask_char=mask_char)
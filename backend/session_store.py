@@ -0,0 +1,190 @@
+"""
+智能体会话存储
+按会话数、空闲时间和对话记忆占用的内存限制会话数量，超出时按最近最少使用淘汰，
+避免长期运行的服务中会话无限增长
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Optional
+
+
+class SessionStore:
+    """
+    LRU + 空闲过期的会话存储
+    
+    会话按最近访问顺序保存，访问时顺带清理已过期的会话，无需后台任务。
+    每个会话的内存占用由 sizeof 估算，在会话内容变化后调用 update_size 刷新。
+    所有方法线程安全。
+    """
+    
+    def __init__(self, factory: Callable[[], Any], max_sessions: int = 1000,
+                 ttl: float = 1800, max_memory_bytes: int = 0,
+                 sizeof: Optional[Callable[[Any], int]] = None):
+        """
+        初始化会话存储
+        
+        Args:
+            factory: 创建新会话对象的函数
+            max_sessions: 最多保留的会话数
+            ttl: 会话空闲多少秒后过期，0 表示不过期
+            max_memory_bytes: 所有会话估算内存占用之和的上限，0 表示不限制
+            sizeof: 估算单个会话内存占用（字节）的函数，默认使用会话对象的 memory_usage 方法
+        """
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_memory_bytes = max_memory_bytes
+        self.sizeof = sizeof or (lambda session: session.memory_usage())
+        
+        self._lock = threading.Lock()
+        # session_id -> [会话对象, 最近访问时间, 估算字节数]
+        self._sessions: "OrderedDict[str, list]" = OrderedDict()
+        self._memory_size = 0
+        
+        self.created = 0
+        self.evicted = 0
+        self.expired = 0
+    
+    @classmethod
+    def from_env(cls, factory: Callable[[], Any]) -> "SessionStore":
+        """
+        根据环境变量创建会话存储
+        
+        SESSION_MAX_COUNT: 最多保留的会话数，默认 1000
+        SESSION_TTL_SECONDS: 会话空闲过期秒数，默认 1800
+        SESSION_MAX_MEMORY_BYTES: 会话对话记忆总占用上限，默认 64MB
+        """
+        return cls(
+            factory,
+            max_sessions=int(os.getenv("SESSION_MAX_COUNT", "1000")),
+            ttl=float(os.getenv("SESSION_TTL_SECONDS", "1800")),
+            max_memory_bytes=int(os.getenv("SESSION_MAX_MEMORY_BYTES", 64 * 1024 * 1024)),
+        )
+    
+    def __len__(self) -> int:
+        return len(self._sessions)
+    
+    def get(self, session_id: str) -> Optional[Any]:
+        """
+        获取会话并刷新访问时间
+        
+        Args:
+            session_id: 会话 ID
+        
+        Returns:
+            Optional: 会话对象，不存在或已过期返回 None
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._purge_expired(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            entry[1] = now
+            self._sessions.move_to_end(session_id)
+            return entry[0]
+    
+    def create(self) -> tuple:
+        """
+        创建新会话
+        
+        会话 ID 只由服务端生成，客户端不能指定，避免任意 ID 创建会话或猜中他人的会话。
+        
+        Returns:
+            tuple: (会话 ID, 会话对象)
+        """
+        session_id = str(uuid.uuid4())
+        session = self.factory()
+        size = self._measure(session)
+        with self._lock:
+            self._sessions[session_id] = [session, time.monotonic(), size]
+            self._memory_size += size
+            self.created += 1
+            self._evict(keep=session_id)
+        return session_id, session
+    
+    def update_size(self, session_id: str):
+        """会话内容（如对话记忆）变化后重新估算其内存占用，超出上限时淘汰其他会话"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return
+            session = entry[0]
+        size = self._measure(session)
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None or entry[0] is not session:
+                return
+            self._memory_size += size - entry[2]
+            entry[2] = size
+            self._evict(keep=session_id)
+    
+    def delete(self, session_id: str) -> bool:
+        """删除会话，返回会话是否存在"""
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            if entry is None:
+                return False
+            self._memory_size -= entry[2]
+            return True
+    
+    def purge_expired(self) -> int:
+        """清理过期会话，返回清理数量"""
+        with self._lock:
+            return self._purge_expired(time.monotonic())
+    
+    def stats(self) -> Dict[str, Any]:
+        """会话统计"""
+        with self._lock:
+            self._purge_expired(time.monotonic())
+            return {
+                "active": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "ttl_seconds": self.ttl,
+                "memory_bytes": self._memory_size,
+                "max_memory_bytes": self.max_memory_bytes,
+                "created": self.created,
+                "evicted": self.evicted,
+                "expired": self.expired,
+            }
+    
+    def _measure(self, session: Any) -> int:
+        try:
+            return int(self.sizeof(session))
+        except Exception:
+            return 0
+    
+    def _purge_expired(self, now: float) -> int:
+        """按访问顺序从最久未访问的会话开始清理，调用方需持有锁"""
+        if not self.ttl:
+            return 0
+        count = 0
+        while self._sessions:
+            session_id, entry = next(iter(self._sessions.items()))
+            if now - entry[1] < self.ttl:
+                break
+            self._sessions.popitem(last=False)
+            self._memory_size -= entry[2]
+            count += 1
+        self.expired += count
+        return count
+    
+    def _evict(self, keep: Optional[str] = None):
+        """超出会话数或内存上限时淘汰最久未访问的会话，调用方需持有锁"""
+        while self._sessions and (
+            len(self._sessions) > self.max_sessions
+            or (self.max_memory_bytes and self._memory_size > self.max_memory_bytes)
+        ):
+            session_id = next(iter(self._sessions))
+            if session_id == keep:
+                if len(self._sessions) == 1:
+                    break
+                self._sessions.move_to_end(session_id)
+                continue
+            entry = self._sessions.pop(session_id)
+            self._memory_size -= entry[2]
+            self.evicted += 1
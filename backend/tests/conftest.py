@@ -0,0 +1,47 @@
+"""
+测试公共配置
+后端模块以平铺方式导入（与服务在 backend 目录下启动时一致），这里把 backend 目录加入 sys.path
+"""
+
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# 随机文本的组成片段：各类实体、容易与实体粘连的字母数字串，以及普通文字
+_FILLER = "abcxyz0123456789._-@() 号民初京中文，。\n"
+
+
+def _random_piece(rng: random.Random) -> str:
+    roll = rng.random()
+    if roll < 0.15:
+        return f"1{rng.randint(3, 9)}{rng.randint(0, 10 ** 9 - 1):09d}"
+    if roll < 0.3:
+        local = "".join(rng.choice("abcx0123456789._") for _ in range(rng.randint(1, 80)))
+        return f"{local}@{rng.choice(('example.com', 'court.gov.cn'))}"
+    if roll < 0.4:
+        return f"({rng.randint(2000, 2024)}){rng.choice(('京01', '沪0101'))}民初{rng.randint(1, 999)}号"
+    if roll < 0.5:
+        return "".join(rng.choice("0123456789") for _ in range(rng.randint(10, 20)))
+    if roll < 0.55:
+        return f"110101{rng.randint(1950, 2005)}0{rng.randint(1, 9)}1{rng.randint(0, 9)}{rng.randint(100, 999)}X"
+    return "".join(rng.choice(_FILLER) for _ in range(rng.randint(1, 30)))
+
+
+@pytest.fixture
+def random_text():
+    """生成实体密集的随机文本：random_text(seed, min_size, max_size)"""
+    def make(seed: int, min_size: int = 200, max_size: int = 3000) -> str:
+        rng = random.Random(seed)
+        size = rng.randint(min_size, max_size)
+        parts, length = [], 0
+        while length < size:
+            piece = _random_piece(rng)
+            parts.append(piece)
+            length += len(piece)
+        return "".join(parts)
+    return make
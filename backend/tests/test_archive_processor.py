@@ -0,0 +1,173 @@
+import asyncio
+import io
+import json
+import os
+import zipfile
+
+import pytest
+
+pytest.importorskip("docx")
+
+import archive_processor
+from archive_processor import MANIFEST_NAME, anonymize_archive
+from extraction_cache import ExtractionCache
+from file_processor import FileProcessor
+
+
+PHONE = "13812345678"
+EMAIL = "zhang.san@example.com"
+
+
+def docx_bytes(*paragraphs):
+    from docx import Document
+
+    document = Document()
+    for paragraph in paragraphs:
+        document.add_paragraph(paragraph)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def write_zip(path, entries):
+    with zipfile.ZipFile(path, "w") as archive:
+        for name, data in entries:
+            archive.writestr(name, data)
+    return str(path)
+
+
+@pytest.fixture
+def processor():
+    processor = FileProcessor(backend="thread", cache=ExtractionCache(memory_bytes=0))
+    yield processor
+    processor.shutdown()
+
+
+def run(archive_path, processor, **options):
+    async def collect():
+        return b"".join([chunk async for chunk in anonymize_archive(archive_path, processor, **options)])
+    return zipfile.ZipFile(io.BytesIO(asyncio.run(collect())))
+
+
+def test_manifest_offsets_point_into_masked_text(tmp_path, processor):
+    path = write_zip(tmp_path / "in.zip", [
+        ("案卷/笔录.docx", docx_bytes(f"联系电话 {PHONE}", f"邮箱 {EMAIL}，电话同上 {PHONE}")),
+    ])
+
+    result = run(path, processor)
+
+    manifest = json.loads(result.read(MANIFEST_NAME))
+    record, = manifest["files"]
+    masked = result.read(record["output"]).decode("utf-8")
+    assert record["output"] == "案卷/笔录_脱敏结果.txt"
+    assert record["entity_statistics"] == {"PHONE": 2, "EMAIL": 1}
+    assert [masked[start:end] for start, end, _ in record["entities"]] == [
+        "13●●●●●●●78", "zh" + "●" * (len(EMAIL) - 4) + "om", "13●●●●●●●78",
+    ]
+    assert [entity_type for _, _, entity_type in record["entities"]] == ["PHONE", "EMAIL", "PHONE"]
+
+
+def test_skipped_failed_and_colliding_entries(tmp_path, processor, monkeypatch):
+    monkeypatch.setattr(archive_processor, "MAX_ENTRY_BYTES", 64 * 1024)
+    path = write_zip(tmp_path / "in.zip", [
+        ("a.docx", docx_bytes(f"电话 {PHONE}")),
+        ("说明.txt", b"plain text"),
+        ("大文件.docx", b"x" * (64 * 1024 + 1)),
+        ("损坏.docx", b"not a docx"),
+        ("../a.docx", docx_bytes(f"邮箱 {EMAIL}")),
+    ])
+
+    result = run(path, processor)
+
+    manifest = json.loads(result.read(MANIFEST_NAME))
+    records = {record["name"]: record for record in manifest["files"]}
+    assert [record["name"] for record in manifest["files"]] == [
+        "a.docx", "说明.txt", "大文件.docx", "损坏.docx", "../a.docx",
+    ]
+    assert records["说明.txt"]["status"] == "skipped"
+    assert records["大文件.docx"]["status"] == "skipped"
+    assert records["大文件.docx"]["error"] == "文件过大，最大支持 0 MB"
+    assert records["损坏.docx"]["status"] == "failed"
+    assert records["a.docx"]["output"] == "a_脱敏结果.txt"
+    assert records["../a.docx"]["output"] == "a_脱敏结果_2.txt"
+    assert sorted(result.namelist()) == sorted([MANIFEST_NAME, "a_脱敏结果.txt", "a_脱敏结果_2.txt"])
+    assert manifest["summary"] == {
+        **manifest["summary"],
+        "files": 5, "completed": 2, "failed": 1, "skipped": 2, "entities": 2,
+    }
+
+
+def test_inflight_bytes_are_bounded(tmp_path, processor, monkeypatch):
+    data = docx_bytes(f"电话 {PHONE}")
+    path = write_zip(tmp_path / "in.zip", [(f"{index}.docx", data) for index in range(6)] + [("跳过.txt", b"x")])
+    process_entry = archive_processor._process_entry
+    running = []
+    peak = []
+
+    async def tracked(archive, info, *args):
+        if info.filename.endswith(".txt"):
+            return await process_entry(archive, info, *args)
+        running.append(info.filename)
+        peak.append(len(running))
+        try:
+            await asyncio.sleep(0.01)
+            return await process_entry(archive, info, *args)
+        finally:
+            running.remove(info.filename)
+    monkeypatch.setattr(archive_processor, "_process_entry", tracked)
+
+    # 额度只够两个条目，并发数不再起作用
+    result = run(path, processor, concurrency=8, max_inflight_bytes=2 * len(data))
+    assert max(peak) == 2
+    # 单个条目超出额度时独自处理
+    result = run(path, processor, concurrency=8, max_inflight_bytes=1)
+    assert max(peak[-6:]) == 1
+    assert json.loads(result.read(MANIFEST_NAME))["summary"]["completed"] == 6
+
+
+def test_closing_stream_cancels_pending_entries(tmp_path, processor, monkeypatch):
+    data = docx_bytes(f"电话 {PHONE}")
+    path = write_zip(tmp_path / "in.zip", [(f"{index}.docx", data) for index in range(8)])
+    process_entry = archive_processor._process_entry
+    started = []
+    cancelled = []
+
+    async def slow(archive, info, *args):
+        started.append(info.filename)
+        try:
+            if info.filename != "0.docx":
+                await asyncio.sleep(10)
+            return await process_entry(archive, info, *args)
+        except asyncio.CancelledError:
+            cancelled.append(info.filename)
+            raise
+    monkeypatch.setattr(archive_processor, "_process_entry", slow)
+
+    async def first_chunk():
+        stream = anonymize_archive(path, processor, concurrency=4)
+        await stream.__anext__()
+        await stream.aclose()
+        await asyncio.sleep(0)
+    asyncio.run(first_chunk())
+
+    # 已开始的条目收到取消，尚未开始的条目不再执行
+    assert started[0] == "0.docx" and len(started) > 1
+    assert sorted(cancelled) == sorted(started[1:])
+
+
+def test_upload_archive_removes_upload(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    monkeypatch.chdir(tmp_path)
+    import main
+
+    path = write_zip(tmp_path / "in.zip", [("a.docx", docx_bytes(f"电话 {PHONE}"))])
+    with open(path, "rb") as f:
+        response = TestClient(main.app).post(
+            "/api/upload/archive", files={"file": ("证据.zip", f.read(), "application/zip")}
+        )
+
+    assert response.status_code == 200
+    manifest = json.loads(zipfile.ZipFile(io.BytesIO(response.content)).read(MANIFEST_NAME))
+    assert manifest["summary"]["completed"] == 1
+    assert os.listdir(main.UPLOAD_DIR) == []
@@ -0,0 +1,116 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("docx")
+
+import batch_anonymize
+from batch_anonymize import MANIFEST_NAME, run
+
+
+PHONE = "13812345678"
+CONFIG = {"enabled_rules": None, "mask_char": "●", "keep_prefix": 2, "keep_suffix": 2}
+
+
+def write_docx(path, *paragraphs):
+    from docx import Document
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    document = Document()
+    for paragraph in paragraphs:
+        document.add_paragraph(paragraph)
+    document.save(path)
+
+
+def manifest(output_dir):
+    with open(os.path.join(output_dir, MANIFEST_NAME), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    input_dir, output_dir = str(tmp_path / "in"), str(tmp_path / "out")
+    write_docx(os.path.join(input_dir, "卷一", "笔录.docx"), f"电话 {PHONE}")
+    return input_dir, output_dir
+
+
+def test_unchanged_mtime_skips_file(dirs):
+    input_dir, output_dir = dirs
+    first = run(input_dir, output_dir, CONFIG, workers=1)
+    assert (first["completed"], first["unchanged"]) == (1, 0)
+    assert read(os.path.join(output_dir, "卷一", "笔录_脱敏结果.txt")) == "电话 13●●●●●●●78"
+
+    second = run(input_dir, output_dir, CONFIG, workers=1)
+    assert (second["completed"], second["unchanged"]) == (0, 1)
+    assert manifest(output_dir)["files"]["卷一/笔录.docx"]["status"] == "completed"
+
+
+def test_changed_mtime_with_same_content_is_unchanged(dirs):
+    input_dir, output_dir = dirs
+    source = os.path.join(input_dir, "卷一", "笔录.docx")
+    run(input_dir, output_dir, CONFIG, workers=1)
+    before = manifest(output_dir)["files"]["卷一/笔录.docx"]
+
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    stats = run(input_dir, output_dir, CONFIG, workers=1)
+
+    after = manifest(output_dir)["files"]["卷一/笔录.docx"]
+    assert (stats["completed"], stats["unchanged"]) == (0, 1)
+    assert after == {**before, "mtime_ns": stat.st_mtime_ns + 10 ** 9}
+
+
+def test_config_change_forces_reprocessing(dirs):
+    input_dir, output_dir = dirs
+    run(input_dir, output_dir, CONFIG, workers=1)
+
+    stats = run(input_dir, output_dir, {**CONFIG, "mask_char": "*"}, workers=1)
+
+    assert (stats["completed"], stats["unchanged"]) == (1, 0)
+    assert read(os.path.join(output_dir, "卷一", "笔录_脱敏结果.txt")) == "电话 13*******78"
+
+
+def test_output_name_collisions_get_numbered(dirs):
+    input_dir, output_dir = dirs
+    # 同名的 .doc 与 .docx 输出名相同；.doc 解析失败也占用输出名
+    with open(os.path.join(input_dir, "卷一", "笔录.doc"), "wb") as f:
+        f.write(b"not a doc")
+
+    stats = run(input_dir, output_dir, CONFIG, workers=1)
+
+    files = manifest(output_dir)["files"]
+    assert files["卷一/笔录.doc"]["output"] == "卷一/笔录_脱敏结果.txt"
+    assert files["卷一/笔录.doc"]["status"] == "failed"
+    assert files["卷一/笔录.docx"]["output"] == "卷一/笔录_脱敏结果_2.txt"
+    assert (stats["completed"], stats["failed"]) == (1, 1)
+    assert read(os.path.join(output_dir, "卷一", "笔录_脱敏结果_2.txt")) == "电话 13●●●●●●●78"
+
+
+def test_outputs_of_deleted_sources_are_removed(dirs):
+    input_dir, output_dir = dirs
+    write_docx(os.path.join(input_dir, "卷二", "判决书.docx"), f"原告电话 {PHONE}")
+    run(input_dir, output_dir, CONFIG, workers=1)
+
+    os.remove(os.path.join(input_dir, "卷二", "判决书.docx"))
+    stats = run(input_dir, output_dir, CONFIG, workers=1)
+
+    assert (stats["removed"], stats["unchanged"]) == (1, 1)
+    assert list(manifest(output_dir)["files"]) == ["卷一/笔录.docx"]
+    assert not os.path.exists(os.path.join(output_dir, "卷二"))
+    assert os.path.exists(os.path.join(output_dir, "卷一", "笔录_脱敏结果.txt"))
+
+
+def test_prune_outputs_stays_inside_output_dir(tmp_path):
+    outside = tmp_path / "outside.txt"
+    outside.write_text("x")
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+
+    assert batch_anonymize.prune_outputs(str(output_dir), ["../outside.txt", "missing.txt"]) == 0
+    assert outside.exists()
@@ -0,0 +1,138 @@
+import io
+
+import pytest
+
+pytest.importorskip("docx")
+
+from docx import Document
+from docx.opc.constants import CONTENT_TYPE as CT, RELATIONSHIP_TYPE as RT
+from docx.opc.packuri import PackURI
+from docx.opc.part import Part
+from docx.oxml import parse_xml
+from docx.shared import Pt
+from lxml import etree
+
+from docx_redactor import W_NS, redact_docx
+
+
+PHONE = "13812345678"
+EMAIL = "zhang.san@example.com"
+NSDECL = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+
+def save(document):
+    buffer = io.BytesIO()
+    document.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def redact(document, **options):
+    output = io.BytesIO()
+    result = redact_docx(save(document), output, **options)
+    output.seek(0)
+    return result, Document(output)
+
+
+def paragraph_text(element):
+    return "".join(node.text or "" for node in element.iter(W_NS + "t"))
+
+
+def test_entity_split_across_runs_keeps_run_formatting():
+    document = Document()
+    paragraph = document.add_paragraph("电话：")
+    bold = paragraph.add_run(PHONE[:5])
+    bold.bold = True
+    italic = paragraph.add_run(PHONE[5:])
+    italic.italic = True
+    italic.font.size = Pt(15)
+    paragraph.add_run("，请回电。")
+
+    result, redacted = redact(document)
+
+    runs = redacted.paragraphs[0].runs
+    assert result["entity_statistics"] == {"PHONE": 1}
+    assert [run.text for run in runs] == ["电话：", "13***", "****78", "，请回电。"]
+    assert runs[1].bold and not runs[1].italic
+    assert runs[2].italic and runs[2].font.size == Pt(15) and not runs[2].bold
+
+
+def test_entity_split_across_hyperlink_runs():
+    document = Document()
+    paragraph = document.add_paragraph("邮箱 ")
+    link = parse_xml(
+        f'<w:hyperlink {NSDECL} w:history="1">'
+        f'<w:r><w:t>{EMAIL[:9]}</w:t></w:r>'
+        f'<w:r><w:rPr><w:b/></w:rPr><w:t>{EMAIL[9:]}</w:t></w:r>'
+        '</w:hyperlink>'
+    )
+    paragraph._p.append(link)
+    paragraph.add_run(" 已停用")
+
+    result, redacted = redact(document)
+
+    element = redacted.paragraphs[0]._p
+    link, = element.iter(W_NS + "hyperlink")
+    assert result["entity_statistics"] == {"EMAIL": 1}
+    assert paragraph_text(element) == "邮箱 zh" + "*" * (len(EMAIL) - 4) + "om 已停用"
+    assert [node.text for node in link.iter(W_NS + "t")] == ["zh*******", "*" * (len(EMAIL) - 11) + "om"]
+    assert link.find(f"{W_NS}r/{W_NS}rPr/{W_NS}b") is not None
+
+
+def test_field_instructions_are_not_masked():
+    document = Document()
+    paragraph = document.add_paragraph()
+    for xml in (
+        '<w:r><w:fldChar w:fldCharType="begin"/></w:r>',
+        f'<w:r><w:instrText xml:space="preserve"> HYPERLINK "mailto:{EMAIL}" </w:instrText></w:r>',
+        '<w:r><w:fldChar w:fldCharType="separate"/></w:r>',
+        f'<w:r><w:t>{EMAIL}</w:t></w:r>',
+        '<w:r><w:fldChar w:fldCharType="end"/></w:r>',
+    ):
+        paragraph._p.append(parse_xml(xml.replace("<w:r>", f"<w:r {NSDECL}>", 1)))
+
+    result, redacted = redact(document)
+
+    element = redacted.paragraphs[0]._p
+    instruction, = element.iter(W_NS + "instrText")
+    assert result["entity_statistics"] == {"EMAIL": 1}
+    assert instruction.text == f' HYPERLINK "mailto:{EMAIL}" '
+    assert paragraph_text(element) == "zh" + "*" * (len(EMAIL) - 4) + "om"
+
+
+def add_notes_part(document, content_type, reltype, partname, tag):
+    """python-docx 不能新建脚注、尾注，直接添加部件"""
+    blob = (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<w:{tag}s {NSDECL}><w:{tag} w:id="1"><w:p>'
+        f'<w:r><w:t>联系电话 {PHONE[:3]}</w:t></w:r><w:r><w:t>{PHONE[3:]}</w:t></w:r>'
+        f'</w:p></w:{tag}></w:{tag}s>'
+    ).encode("utf-8")
+    part = Part(PackURI(partname), content_type, blob, document.part.package)
+    document.part.relate_to(part, reltype)
+
+
+def test_redacts_headers_footers_and_notes():
+    document = Document()
+    document.add_paragraph("正文无敏感信息")
+    document.sections[0].header.paragraphs[0].text = f"页眉 {EMAIL}"
+    document.sections[0].footer.paragraphs[0].text = f"页脚 {PHONE}"
+    add_notes_part(document, CT.WML_FOOTNOTES, RT.FOOTNOTES, "/word/footnotes.xml", "footnote")
+    add_notes_part(document, CT.WML_ENDNOTES, RT.ENDNOTES, "/word/endnotes.xml", "endnote")
+
+    result, redacted = redact(document)
+
+    assert result["entity_statistics"] == {"EMAIL": 1, "PHONE": 3}
+    assert result["parts"] == 5
+    assert redacted.sections[0].header.paragraphs[0].text == "页眉 zh" + "*" * (len(EMAIL) - 4) + "om"
+    assert redacted.sections[0].footer.paragraphs[0].text == "页脚 13*******78"
+    for reltype in (RT.FOOTNOTES, RT.ENDNOTES):
+        root = etree.fromstring(redacted.part.part_related_by(reltype).blob)
+        assert paragraph_text(root) == "联系电话 13*******78"
+
+
+def test_redaction_does_not_change_python_docx_part_types():
+    from docx.opc.part import PartFactory
+
+    assert CT.WML_FOOTNOTES not in PartFactory.part_type_for
+    assert CT.WML_ENDNOTES not in PartFactory.part_type_for
@@ -0,0 +1,119 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+from extraction_cache import ExtractionCache
+from file_processor import FileProcessor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from synthetic import generate_text, write_pdf
+
+
+@pytest.fixture(scope="module")
+def pdf_path(tmp_path_factory):
+    pytest.importorskip("reportlab")
+    path = str(tmp_path_factory.mktemp("pdf") / "doc.pdf")
+    write_pdf(generate_text(3000, density=8, seed=5)[0], path)
+    return path
+
+
+@pytest.fixture
+def make_processor():
+    processors = []
+
+    def make(**options):
+        options.setdefault("cache", ExtractionCache(memory_bytes=64 * 1024 * 1024))
+        processor = FileProcessor(backend="thread", **options)
+        processors.append(processor)
+        return processor
+    yield make
+    for processor in processors:
+        processor.shutdown()
+
+
+@pytest.fixture
+def forbid_open(monkeypatch):
+    """命中缓存后不应再打开或解析PDF"""
+    def fail(*args, **kwargs):
+        raise AssertionError("缓存命中时打开了PDF")
+
+    def forbid():
+        monkeypatch.setattr(FileProcessor, "_read_pdf_metadata", staticmethod(fail))
+        monkeypatch.setattr(FileProcessor, "_iter_pdf_pages", staticmethod(fail))
+    return forbid
+
+
+def extract(processor, path, **options):
+    return asyncio.run(processor.extract_content(path, "application/pdf", "a" * 64, **options))
+
+
+@pytest.mark.parametrize("fast_pdf_pages", [0, 1, 1000])
+def test_auto_cache_hit_does_not_open_pdf(make_processor, pdf_path, forbid_open, fast_pdf_pages):
+    processor = make_processor(fast_pdf_pages=fast_pdf_pages)
+    first = extract(processor, pdf_path)
+
+    forbid_open()
+    assert extract(processor, pdf_path) == first
+
+
+def test_extract_bytes_cache_hit_does_not_open_pdf(make_processor, pdf_path, forbid_open):
+    processor = make_processor(fast_pdf_pages=1)
+    with open(pdf_path, "rb") as f:
+        data = f.read()
+    first = asyncio.run(processor.extract_bytes(data, "application/pdf"))
+
+    forbid_open()
+    assert asyncio.run(processor.extract_bytes(data, "application/pdf")) == first
+
+
+def test_auto_uses_page_count_from_other_engine_entry(make_processor, pdf_path):
+    processor = make_processor(fast_pdf_pages=1)
+    # pdfplumber 的结果已缓存（如 PDF 遮盖输出写入），auto 模式按其中的页数选择快速引擎
+    extract(processor, pdf_path, pdf_engine="pdfplumber")
+
+    engine, cached = asyncio.run(processor.lookup_pdf_cache("a" * 64))
+    assert (engine, cached) == ("pdfminer", None)
+
+    result = extract(processor, pdf_path)
+    assert result["metadata"]["extraction_method"] == "pdfminer"
+    assert asyncio.run(processor.lookup_pdf_cache("a" * 64)) == ("pdfminer", result)
+
+
+def test_lookup_miss_leaves_engine_undecided(make_processor):
+    processor = make_processor()
+    assert asyncio.run(processor.lookup_pdf_cache("b" * 64)) == (None, None)
+    assert asyncio.run(processor.lookup_pdf_cache("b" * 64, "pypdf")) == ("pypdf", None)
+
+
+def test_queue_depths_count_running_and_queued_tasks(make_processor):
+    import threading
+
+    processor = make_processor()
+    release = threading.Event()
+    futures = [processor.executor.submit(release.wait) for _ in range(6)]
+    # 4 个线程都在执行，另有 2 个在排队
+    assert processor.queue_depths() == {"io": 6}
+
+    release.set()
+    for future in futures:
+        future.result()
+    processor.executor.shutdown(wait=True)
+    # 完成回调在 result() 返回后才可能执行，等线程池退出后再检查
+    assert processor.queue_depths() == {"io": 0}
+
+
+@pytest.mark.parametrize("engine", ["pdfplumber", "pdfminer"])
+def test_extraction_error_is_prefixed_once(tmp_path, engine):
+    path = str(tmp_path / "broken.pdf")
+    with open(path, "wb") as f:
+        f.write(b"not a pdf")
+
+    with pytest.raises(Exception) as excinfo:
+        list(FileProcessor._iter_pdf_pages(path, engine=engine))
+    assert str(excinfo.value).count("PDF提取失败") == 1
+
+    with pytest.raises(Exception) as excinfo:
+        FileProcessor._extract_pdf_page_range(path, 1, 1, engine)
+    assert str(excinfo.value).count("PDF提取失败") == 1
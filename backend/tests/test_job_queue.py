@@ -0,0 +1,151 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+
+import pytest
+
+from job_queue import COMPLETED, FAILED, QUEUED, RUNNING, JobQueue, JobStore
+
+
+async def noop_handler(payload):
+    yield {"type": "complete", "result": {"success": True}}
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_start_fails_only_jobs_of_exited_processes(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    host = socket.gethostname()
+    owners = {
+        "dead": f"{host}:{dead_pid()}",
+        "alive": f"{host}:{os.getppid()}",
+        "remote": "other-host:1",
+        "legacy": None,
+    }
+    for job_id, owner in owners.items():
+        store.create(job_id, owner=owner)
+    store.update("alive", status=RUNNING)
+
+    queue = JobQueue(noop_handler, store=store)
+
+    async def start_and_stop():
+        await queue.start()
+        await queue.stop()
+    asyncio.run(start_and_stop())
+
+    statuses = {job_id: store.get(job_id)["status"] for job_id in owners}
+    assert statuses == {"dead": FAILED, "alive": RUNNING, "remote": QUEUED, "legacy": FAILED}
+
+
+def test_submitted_jobs_record_owner(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    queue = JobQueue(noop_handler, store=store)
+
+    async def run():
+        await queue.start()
+        job_id = await queue.submit({})
+        await queue._queue.join()
+        await queue.stop()
+        return job_id
+    job_id = asyncio.run(run())
+
+    job = store.get(job_id)
+    assert job["owner"] == f"{socket.gethostname()}:{os.getpid()}"
+    assert job["status"] == COMPLETED
+
+
+def test_adds_owner_column_to_old_database(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "jobs.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE jobs (job_id TEXT PRIMARY KEY, status TEXT NOT NULL, created_at REAL NOT NULL, "
+        "started_at REAL, finished_at REAL, expires_at REAL, progress TEXT, result TEXT, error TEXT, meta TEXT)"
+    )
+    conn.execute("INSERT INTO jobs (job_id, status, created_at, meta) VALUES ('old', 'running', 0, '{}')")
+    conn.commit()
+    conn.close()
+
+    store = JobStore(path)
+    assert store.get("old")["owner"] is None
+    assert store.fail_unfinished("中断", 60, JobQueue._owner_alive) == 1
+
+
+def test_cancel_queued_job_is_skipped_by_worker(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    discarded = []
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def blocking_handler(payload):
+        started.set()
+        await release.wait()
+        yield {"type": "complete", "result": {"success": True}}
+
+    queue = JobQueue(blocking_handler, store=store, workers=1, on_discard=discarded.append)
+
+    async def run():
+        await queue.start()
+        first = await queue.submit({"n": 1})
+        await started.wait()
+        second = await queue.submit({"n": 2})
+        assert await queue.cancel(first) == RUNNING
+        assert await queue.cancel(second) == QUEUED
+        release.set()
+        await queue._queue.join()
+        await queue.stop()
+        return first, second
+    first, second = asyncio.run(run())
+
+    assert store.get(first)["status"] == COMPLETED
+    assert store.get(second)["status"] == "cancelled"
+    assert discarded == [{"n": 2}]
+
+
+def test_submit_after_stop_raises_and_leaves_no_record(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    queue = JobQueue(noop_handler, store=store)
+
+    async def run():
+        await queue.start()
+        await queue.stop()
+        with pytest.raises(RuntimeError):
+            await queue.submit({})
+    asyncio.run(run())
+
+    assert store.counts() == {}
+
+
+def test_purged_and_deleted_jobs_release_results(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    released = []
+
+    async def export_handler(payload):
+        yield {"type": "complete", "result": {"export": payload["n"]}}
+
+    queue = JobQueue(export_handler, store=store, ttl=0, on_delete=released.append)
+
+    async def run():
+        await queue.start()
+        deleted = await queue.submit({"n": 1})
+        expired = await queue.submit({"n": 2})
+        await queue._queue.join()
+        assert await queue.cancel(deleted) == COMPLETED
+        store.create("failed")
+        store.update("failed", status=FAILED, expires_at=0)
+        await queue._in_thread(queue._purge_expired)
+        await queue.stop()
+        return deleted, expired
+    deleted, expired = asyncio.run(run())
+
+    assert released == [{"export": 1}, {"export": 2}]
+    assert store.get(deleted) is None and store.get(expired) is None
+    assert store.counts() == {}
+
@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def app_dir(tmp_path_factory):
+    # 服务使用相对路径的 uploads/ exports/ data/，在临时目录中导入和运行
+    path = tmp_path_factory.mktemp("app")
+    cwd = os.getcwd()
+    os.chdir(path)
+    try:
+        import main_langchain
+        yield path, main_langchain
+    finally:
+        os.chdir(cwd)
+
+
+DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+def test_submit_before_queue_starts_returns_503_and_removes_upload(app_dir):
+    from fastapi.testclient import TestClient
+
+    path, main_langchain = app_dir
+    # 不进入 with 块，启动事件不执行，任务队列未启动
+    client = TestClient(main_langchain.app)
+    response = client.post("/api/jobs", files={"file": ("a.docx", b"PK\x03\x04", DOCX)})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+    assert os.listdir(path / "uploads") == []
+
+
+def test_remove_export_only_deletes_files_in_export_dir(app_dir, tmp_path):
+    path, main_langchain = app_dir
+    inside = os.path.join("exports", "a.txt")
+    outside = str(tmp_path / "b.txt")
+    for file_path in (inside, outside):
+        with open(file_path, "w") as f:
+            f.write("x")
+
+    main_langchain._remove_export({"export_info": {"export_path": inside}})
+    main_langchain._remove_export({"export_info": {"export_path": outside}})
+    # 文件已不存在或结果中没有导出信息时忽略
+    main_langchain._remove_export({"export_info": {"export_path": inside}})
+    main_langchain._remove_export({"success": False})
+
+    assert not os.path.exists(path / inside)
+    assert os.path.exists(outside)
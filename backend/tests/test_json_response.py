@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+import json_response
+from json_response import FastJSONResponse, dumps, stdlib_dumps
+
+orjson = pytest.importorskip("orjson")
+
+
+CONTENT = {
+    "masked_text": "张三，手机：13●●●●●●●78\n\t\"引号\" \\ / é 😀   \x1f",
+    "entities": [[4, 15, "PHONE"], {"start": 0, "end": 2, "type": "NAME", "original": "张三"}],
+    "entity_statistics": {"PHONE": 1},
+    1: "非字符串键",
+    "numbers": [0, -1, 2 ** 63 - 1, 1.5, 0.1 + 0.2, -0.0, 1e20, 1e-7],
+    "flags": [True, False, None],
+    "nested": {"空": {}, "列表": []},
+}
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def backend(request, monkeypatch):
+    monkeypatch.setattr(json_response, "USE_ORJSON", request.param == "orjson")
+    return request.param
+
+
+def test_backends_produce_equivalent_json():
+    fast = orjson.dumps(CONTENT, option=orjson.OPT_NON_STR_KEYS)
+    slow = stdlib_dumps(CONTENT)
+
+    assert json.loads(fast) == json.loads(slow)
+    # 浮点数的指数写法不同（1e20 / 1e+20），其余部分逐字节相同
+    without_numbers = {key: value for key, value in CONTENT.items() if key != "numbers"}
+    assert orjson.dumps(without_numbers, option=orjson.OPT_NON_STR_KEYS) == stdlib_dumps(without_numbers)
+    # 中文不转义为 \u 序列
+    assert "张三，手机".encode("utf-8") in slow
+
+
+def test_non_finite_floats_become_null(backend):
+    content = {"score": float("nan"), "values": (1.0, float("inf"), -float("inf")), "text": "NaN"}
+
+    assert json.loads(dumps(content)) == {"score": None, "values": [1.0, None, None], "text": "NaN"}
+
+
+def test_stdlib_still_rejects_circular_references():
+    content = []
+    content.append(content)
+
+    with pytest.raises(ValueError, match="Circular"):
+        stdlib_dumps(content)
+
+
+def test_orjson_falls_back_for_unsupported_values(backend):
+    assert dumps({"big": 2 ** 70}) == b'{"big":1180591620717411303424}'
+
+
+def test_response_renders_with_selected_backend(backend):
+    response = FastJSONResponse(content={"中文": [1, 2]})
+
+    assert response.body == '{"中文":[1,2]}'.encode("utf-8")
+    assert response.headers["content-type"] == "application/json"
@@ -0,0 +1,77 @@
+import re
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import metrics
+from metrics import CONTENT_TYPE, Counter, Gauge, Histogram, Registry
+
+
+def samples(text):
+    """解析文本格式中的样本行为 {指标名和标签: 数值}"""
+    return {
+        line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1].replace("+Inf", "inf"))
+        for line in text.splitlines() if line and not line.startswith("#")
+    }
+
+
+def test_histogram_buckets_are_cumulative_and_inclusive():
+    histogram = Histogram("t_seconds", "测试", labels=("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 1.0, 3.0):
+        histogram.observe(value, stage="parse")
+
+    lines = histogram.collect()
+
+    assert lines[:2] == ["# HELP t_seconds 测试", "# TYPE t_seconds histogram"]
+    # 桶按 le（小于等于）累计计数，边界值计入该桶
+    assert samples("\n".join(lines)) == {
+        't_seconds_bucket{stage="parse",le="0.1"}': 2,
+        't_seconds_bucket{stage="parse",le="1.0"}': 4,
+        't_seconds_bucket{stage="parse",le="+Inf"}': 5,
+        't_seconds_sum{stage="parse"}': 4.65,
+        't_seconds_count{stage="parse"}': 5,
+    }
+
+
+def test_counter_gauge_and_label_escaping():
+    registry = Registry()
+    counter = registry.register(Counter("t_total", "计数", labels=("rule",)))
+    gauge = registry.register(Gauge("t_depth", "深度", labels=("executor",),
+                                    callback=lambda: {("io",): 3, ("extract",): 0}))
+    counter.inc(rule='a"b\\c\nd')
+    counter.inc(2, rule='a"b\\c\nd')
+
+    text = registry.render()
+
+    assert text.endswith("\n")
+    assert 't_total{rule="a\\"b\\\\c\\nd"} 3' in text.splitlines()
+    assert samples(text)['t_depth{executor="io"}'] == 3
+    assert text.index("# TYPE t_total counter") < text.index("# TYPE t_depth gauge")
+
+
+def test_metrics_endpoint_exposition_format():
+    app = FastAPI()
+    metrics.install(app)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        metrics.observe_stage("detect", 0.003)
+        return {"id": item_id}
+
+    client = TestClient(app)
+    before = samples(client.get("/metrics").text)
+    for item_id in ("a", "b"):
+        assert client.get(f"/items/{item_id}").status_code == 200
+
+    response = client.get("/metrics")
+
+    assert response.headers["content-type"] == CONTENT_TYPE
+    after = samples(response.text)
+    # 路由标签使用模板，不按实际路径产生新序列
+    series = 'http_request_duration_seconds_count{method="GET",route="/items/{item_id}",status="200"}'
+    assert after[series] == before.get(series, 0) + 2
+    bucket = 'anonymizer_stage_seconds_bucket{stage="detect",le="0.005"}'
+    assert after[bucket] == before.get(bucket, 0) + 2
+    # 每个指标先输出 HELP 和 TYPE，样本行符合 名称{标签} 数值 的格式
+    for line in response.text.splitlines():
+        assert re.fullmatch(r"# (HELP|TYPE) \w+ .+|\w+(\{.*\})? [-+\w.]+", line), line
@@ -0,0 +1,180 @@
+import pytest
+
+fitz = pytest.importorskip("fitz")
+pytest.importorskip("reportlab")
+pytest.importorskip("pypdf")
+
+from pdf_redactor import _page_rect, analyze_pdf, extract_pages, masked_ranges, redact_pdf
+
+
+PHONE = "13812345678"
+EMAIL = "zhang.san@example.com"
+
+# (旋转角度, CropBox)；CropBox 偏离 MediaBox 原点且小于 MediaBox
+LAYOUTS = [
+    (0, None),
+    (90, None),
+    (0, (50, 300, 500, 750)),
+    (90, (50, 300, 500, 750)),
+]
+
+
+@pytest.fixture(params=LAYOUTS, ids=lambda layout: f"rotate{layout[0]}-{'crop' if layout[1] else 'full'}")
+def pdf_path(request, tmp_path):
+    from pypdf import PdfReader, PdfWriter
+    from pypdf.generic import RectangleObject
+    from reportlab.pdfgen import canvas
+
+    rotate, cropbox = request.param
+    base = str(tmp_path / "base.pdf")
+    pdf = canvas.Canvas(base)
+    pdf.setFont("Helvetica", 12)
+    pdf.drawString(72, 700, f"Contact phone {PHONE} today.")
+    pdf.drawString(100, 500, f"Mail {EMAIL} please.")
+    pdf.showPage()
+    pdf.save()
+
+    writer = PdfWriter()
+    for page in PdfReader(base).pages:
+        if rotate:
+            page.rotate(rotate)
+        if cropbox:
+            page.cropbox = RectangleObject(cropbox)
+        writer.add_page(page)
+    path = str(tmp_path / "doc.pdf")
+    writer.write(path)
+    return path
+
+
+def fitz_chars(page):
+    """PyMuPDF 提取的非空白字符及其字符框"""
+    return [
+        (char["c"], fitz.Rect(char["bbox"]))
+        for block in page.get_text("rawdict")["blocks"]
+        for line in block.get("lines", ())
+        for span in line["spans"]
+        for char in span["chars"]
+        if not char["c"].isspace()
+    ]
+
+
+def entity_chars(chars, original):
+    """实体原文在字符列表中对应的 (保留部分, 遮盖部分) 字符框"""
+    text = "".join(c for c, _ in chars)
+    position = text.index(original)
+    (start, end), = masked_ranges([(0, len(original), None)])
+    rects = [rect for _, rect in chars[position:position + len(original)]]
+    return rects[:start] + rects[end:], rects[start:end]
+
+
+def covered(rect, boxes):
+    center = (rect.tl + rect.br) / 2
+    return any(center in box for box in boxes)
+
+
+def compact_text(path):
+    with fitz.open(path) as doc:
+        return "".join(doc[0].get_text().split())
+
+
+def analyze(path, pages_total, **options):
+    pages = extract_pages(path, 1, pages_total)
+    analyze_pdf(pages, **options)
+    return pages
+
+
+def test_boxes_cover_masked_characters(pdf_path):
+    page_info, = analyze(pdf_path, 1)
+    assert sorted(page_info["originals"]) == sorted([PHONE, EMAIL])
+
+    with fitz.open(pdf_path) as doc:
+        page = doc[0]
+        boxes = [_page_rect(page, box) for box in page_info["boxes"]]
+        chars = fitz_chars(page)
+        for original in (PHONE, EMAIL):
+            kept, masked = entity_chars(chars, original)
+            assert all(covered(rect, boxes) for rect in masked)
+            assert not any(covered(rect, boxes) for rect in kept)
+
+
+def test_redacted_pdf_keeps_prefix_and_suffix(pdf_path, tmp_path):
+    pages = analyze(pdf_path, 1)
+    output = str(tmp_path / "redacted.pdf")
+
+    result = redact_pdf(pdf_path, output, pages)
+
+    text = compact_text(output)
+    assert result["pages_redacted"] == 1
+    assert PHONE not in text and EMAIL not in text
+    assert "phone13" in text and "78today." in text
+    assert "Mailzh" in text and "omplease." in text
+
+
+def test_fallback_keeps_prefix_and_suffix(pdf_path, tmp_path):
+    pages = analyze(pdf_path, 1)
+    # 字符框落在页面空白处，首次遮盖不生效，由 PyMuPDF 的字符定位补遮
+    pages[0]["boxes"] = [(0, 0, 1, 1)]
+    output = str(tmp_path / "redacted.pdf")
+
+    redact_pdf(pdf_path, output, pages, keep_prefix=3, keep_suffix=1)
+
+    text = compact_text(output)
+    assert PHONE not in text and EMAIL not in text
+    assert "phone138" in text and "8today." in text
+    assert "Mailzha" in text and "mplease." in text
+
+
+def test_entity_across_page_break(tmp_path):
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+    from reportlab.pdfgen import canvas
+
+    pdfmetrics.registerFont(UnicodeCIDFont("STSong-Light"))
+    path = str(tmp_path / "two_pages.pdf")
+    pdf = canvas.Canvas(path)
+    for line in ("本案案号为(2023)京01", "民初123号，原告到庭。"):
+        pdf.setFont("STSong-Light", 12)
+        pdf.drawString(72, 700, line)
+        pdf.showPage()
+    pdf.save()
+
+    pages = extract_pages(path, 1, 2)
+    text, entities = analyze_pdf(pages)
+    # 案号跨过页标记，逐页识别时两页都找不到
+    assert [entity[2] for entity in entities.to_offsets()] == ["CASE_NUMBER"]
+    assert all(page["boxes"] for page in pages)
+
+    output = str(tmp_path / "redacted.pdf")
+    redact_pdf(path, output, pages)
+    with fitz.open(output) as doc:
+        first, second = ("".join(page.get_text().split()) for page in doc)
+    assert first == "本案案号为(2"
+    assert second == "3号，原告到庭。"
+
+
+def test_pipeline_redact_pdf_matches_run(tmp_path):
+    import asyncio
+    import os
+    import sys
+
+    from extraction_cache import ExtractionCache
+    from file_processor import FileProcessor
+    from pipeline import AnonymizePipeline
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+    from synthetic import generate_text, write_pdf
+
+    path = str(tmp_path / "doc.pdf")
+    # 每页两行、实体密集，其中两个实体跨页
+    write_pdf(generate_text(3000, density=30, seed=0)[0], path, lines_per_page=2)
+    processor = FileProcessor(backend="thread", cache=ExtractionCache(memory_bytes=0))
+    pipeline = AnonymizePipeline(processor, export_dir=str(tmp_path / "exports"))
+    try:
+        expected = asyncio.run(pipeline.run(path, export=False))
+        redacted = asyncio.run(pipeline.redact_pdf(path))
+    finally:
+        processor.shutdown()
+
+    assert redacted.text == expected.text
+    assert redacted.entities.to_dicts() == expected.entities.to_dicts()
+    assert redacted.masked_text == expected.masked_text
@@ -0,0 +1,95 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+from extraction_cache import ExtractionCache
+from file_processor import FileProcessor
+from pipeline import AnonymizePipeline
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from synthetic import generate_text, write_docx, write_pdf
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    processor = FileProcessor(backend="thread", cache=ExtractionCache(memory_bytes=64 * 1024 * 1024))
+    yield AnonymizePipeline(processor, export_dir=str(tmp_path / "exports"))
+    processor.shutdown()
+
+
+@pytest.fixture(scope="module")
+def document_text():
+    text, _ = generate_text(20000, density=8, seed=7)
+    return text
+
+
+@pytest.fixture
+def pdf_path(tmp_path, document_text):
+    pytest.importorskip("reportlab")
+    path = str(tmp_path / "doc.pdf")
+    write_pdf(document_text, path)
+    return path
+
+
+@pytest.fixture
+def docx_path(tmp_path, document_text):
+    path = str(tmp_path / "doc.docx")
+    write_docx(document_text, path)
+    return path
+
+
+def collect(pipeline, file_path, content_hash=None):
+    async def run():
+        return [event async for event in pipeline.process_stream(file_path, content_hash=content_hash)]
+    return asyncio.run(run())
+
+
+def read_export(result):
+    with open(result["export_info"]["export_path"], encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("path_fixture", ["pdf_path", "docx_path"])
+def test_stream_matches_run(pipeline, request, path_fixture):
+    file_path = request.getfixturevalue(path_fixture)
+    expected = asyncio.run(pipeline.run(file_path, export=False))
+    
+    events = collect(pipeline, file_path)
+    chunks = [event for event in events if event["type"] == "chunk"]
+    result = events[-1]["result"]
+    
+    assert events[-1]["type"] == "complete"
+    assert read_export(result) == expected.masked_text
+    assert "".join(chunk["original_text"] for chunk in chunks).rstrip() == expected.text
+    assert "".join(chunk["masked_text"] for chunk in chunks).rstrip() == expected.masked_text
+    assert [entity for chunk in chunks for entity in chunk["entities"]] == expected.entities.to_dicts()
+    assert result["entity_statistics"] == expected.statistics
+    assert result["processing_summary"]["original_length"] == len(expected.text)
+    assert result["processing_summary"]["masked_length"] == len(expected.masked_text)
+    # 结束事件不重复全文和实体列表
+    assert not {"original_text", "masked_text", "entities_found"} & set(result)
+
+
+def test_stream_fills_and_replays_pdf_cache(pipeline, pdf_path):
+    cache = pipeline.file_processor.cache
+    
+    first = collect(pipeline, pdf_path, content_hash="a" * 64)
+    assert cache.stats()["memory_entries"] == 1
+    
+    second = collect(pipeline, pdf_path, content_hash="a" * 64)
+    assert cache.stats()["hits"] == 1
+    # 命中缓存时按固定长度分块回放，不再产出逐页进度
+    assert not any("page" in event for event in second)
+    assert read_export(second[-1]["result"]) == read_export(first[-1]["result"])
+
+
+def test_failed_stream_removes_partial_export(pipeline, tmp_path):
+    empty = tmp_path / "empty.docx"
+    write_docx("", str(empty))
+    
+    events = collect(pipeline, str(empty))
+    
+    assert events[-1]["type"] == "error"
+    assert os.listdir(pipeline.export_dir) == []
@@ -0,0 +1,71 @@
+import pytest
+from fastapi import HTTPException
+
+from response_options import ResponseOptions, format_entities, parse_fields, shape_response
+from rule_anonymizer import get_anonymizer
+
+
+TEXT = "张三，手机：13812345678，邮箱 zhang.san@example.com"
+
+
+def full_result():
+    masked_text, entities = get_anonymizer().anonymize_text(TEXT)
+    return {
+        "success": True,
+        "original_text": TEXT,
+        "masked_text": masked_text,
+        "entities": entities,
+        "entity_statistics": {"PHONE": 1, "EMAIL": 1},
+    }
+
+
+def test_parse_fields():
+    assert parse_fields(None) is None
+    assert parse_fields("") is None
+    assert parse_fields(" masked_text, ,entities ") == ["masked_text", "entities"]
+
+
+def test_offsets_format_matches_full_entities():
+    _, entities = get_anonymizer().anonymize_compact(TEXT)
+    full = format_entities(entities.to_dicts())
+
+    offsets = format_entities(entities, "offsets")
+
+    assert offsets == [[entity["start"], entity["end"], entity["type"]] for entity in full]
+    assert format_entities(full, "offsets") == offsets
+    assert format_entities(entities) == full
+    assert [TEXT[start:end] for start, end, _ in offsets] == ["13812345678", "zhang.san@example.com"]
+
+
+def test_shape_response_drops_original_and_uses_offsets():
+    options = ResponseOptions(include_original=False, entity_format="offsets")
+
+    result = shape_response(full_result(), options, original_keys=["original_text"], entity_keys=["entities"])
+
+    assert "original_text" not in result
+    assert result["entity_format"] == "offsets"
+    assert result["entities"] == [[6, 17, "PHONE"], [21, 42, "EMAIL"]]
+
+
+def test_shape_response_keeps_only_requested_fields():
+    options = ResponseOptions(fields=["masked_text", "entities", "unknown"])
+
+    result = shape_response(full_result(), options, original_keys=["original_text"], entity_keys=["entities"])
+
+    assert list(result) == ["masked_text", "entities"]
+    assert result["entities"][0] == {"start": 6, "end": 17, "type": "PHONE", "original": "13812345678"}
+
+
+def test_fields_filter_applies_after_entity_format():
+    options = ResponseOptions(entity_format="offsets", fields=["entities"])
+
+    result = shape_response(full_result(), options, entity_keys=["entities"])
+
+    # 只保留指定字段时 entity_format 标记也被过滤
+    assert result == {"entities": [[6, 17, "PHONE"], [21, 42, "EMAIL"]]}
+
+
+def test_unknown_entity_format_is_rejected():
+    with pytest.raises(HTTPException) as excinfo:
+        shape_response(full_result(), ResponseOptions(entity_format="compact"))
+    assert excinfo.value.status_code == 400
@@ -0,0 +1,78 @@
+import pytest
+
+from rule_anonymizer import RULE_ORDER, RuleAnonymizer, ScanGuard
+
+
+def per_rule_entities(anonymizer, text):
+    """参照实现：逐条规则 finditer 全文，按开始位置稳定排序（同一起点保持 RULE_ORDER 顺序）"""
+    entities = []
+    for rule_type in RULE_ORDER:
+        if rule_type not in anonymizer.enabled_rules:
+            continue
+        for match in anonymizer.patterns[rule_type].finditer(text):
+            entities.append({
+                "start": match.start(),
+                "end": match.end(),
+                "type": rule_type,
+                "original": match.group()
+            })
+    entities.sort(key=lambda entity: entity["start"])
+    return entities
+
+
+# 随机文本中的实体最长约 100 个字符，reach 需大于实体长度
+GUARDS = {
+    "whole": None,
+    "windowed": ScanGuard(window=64, reach=128),
+    # 每段都超出耗时上限，第一段之后所有规则拆出，以小窗口单独扫描
+    "isolated": ScanGuard(window=64, reach=128, max_us_per_kb=0, guarded_window=16),
+}
+
+
+@pytest.fixture(params=list(GUARDS), scope="module")
+def anonymizer(request):
+    anonymizer = RuleAnonymizer()
+    anonymizer.scan_guard = GUARDS[request.param]
+    return anonymizer
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_matches_per_rule_scan(anonymizer, random_text, seed):
+    text = random_text(seed)
+
+    assert anonymizer.extract_entities(text) == per_rule_entities(anonymizer, text)
+
+
+@pytest.mark.parametrize("rules", [["EMAIL"], ["PHONE", "IDCARD"], ["CASE_NUMBER", "PHONE", "EMAIL"]])
+def test_matches_per_rule_scan_with_rule_subset(anonymizer, random_text, rules):
+    text = random_text(1000, 3000, 6000)
+    enabled_rules = anonymizer.enabled_rules
+    anonymizer.enabled_rules = rules
+    try:
+        assert anonymizer.extract_entities(text) == per_rule_entities(anonymizer, text)
+    finally:
+        anonymizer.enabled_rules = enabled_rules
+
+
+
+def test_rule_order_does_not_depend_on_hash_seed():
+    import os
+    import subprocess
+    import sys
+
+    # 15 位身份证号同时匹配银行卡号的分组格式；工作进程的字符串哈希种子各不相同，
+    # 同一位置的实体顺序不能随之变化
+    script = (
+        "from rule_anonymizer import get_anonymizer\n"
+        "print([entity['type'] for entity in get_anonymizer(['BANKCARD', 'IDCARD', 'PHONE'])"
+        ".anonymize_text('号码 110101900307123 止')[1]])\n"
+    )
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    outputs = set()
+    for seed in range(6):
+        env = dict(os.environ, PYTHONHASHSEED=str(seed))
+        outputs.add(subprocess.run(
+            [sys.executable, "-c", script], cwd=backend, env=env,
+            capture_output=True, text=True, check=True
+        ).stdout)
+    assert outputs == {"['IDCARD', 'BANKCARD']\n"}
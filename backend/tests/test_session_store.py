@@ -0,0 +1,98 @@
+import uuid
+
+import pytest
+
+import session_store
+from session_store import SessionStore
+
+
+class Session:
+    def __init__(self, size=0):
+        self.size = size
+
+    def memory_usage(self):
+        return self.size
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(session_store.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_create_generates_ids_and_get_ignores_unknown(clock):
+    store = SessionStore(Session)
+
+    session_id, session = store.create()
+
+    assert uuid.UUID(session_id).version == 4
+    assert store.get(session_id) is session
+    assert store.get("client-chosen-id") is None
+    assert len(store) == 1
+
+
+def test_evicts_least_recently_used_session(clock):
+    store = SessionStore(Session, max_sessions=2)
+    first, _ = store.create()
+    second, _ = store.create()
+    # 访问后 first 变为最近使用，再创建时淘汰 second
+    store.get(first)
+
+    third, _ = store.create()
+
+    assert store.get(second) is None
+    assert store.get(first) is not None and store.get(third) is not None
+    assert store.stats()["evicted"] == 1
+
+
+def test_evicts_by_memory_but_keeps_current_session(clock):
+    sizes = iter([40, 40])
+    store = SessionStore(lambda: Session(next(sizes)), max_memory_bytes=100)
+    first, _ = store.create()
+    second, session = store.create()
+
+    session.size = 90
+    store.update_size(second)
+
+    assert store.get(first) is None
+    assert store.get(second) is session
+    assert store.stats()["memory_bytes"] == 90
+
+    # 只剩当前会话时即使超出上限也保留
+    session.size = 200
+    store.update_size(second)
+    assert store.get(second) is session
+
+
+def test_idle_sessions_expire(clock):
+    store = SessionStore(Session, ttl=60)
+    idle, _ = store.create()
+    clock[0] += 30
+    active, _ = store.create()
+    clock[0] += 29
+    store.get(idle)
+
+    clock[0] += 59
+    assert store.get(active) is None
+    assert store.get(idle) is not None
+
+    clock[0] += 60
+    assert store.purge_expired() == 1
+    assert store.stats()["expired"] == 2
+    assert len(store) == 0
+
+
+def test_chat_with_unknown_session_returns_404(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    monkeypatch.chdir(tmp_path)
+    import main_langchain
+
+    before = len(main_langchain.sessions)
+    response = TestClient(main_langchain.app).post(
+        "/api/chat", json={"message": "你好", "session_id": "client-chosen-id"}
+    )
+
+    assert response.status_code == 404
+    assert len(main_langchain.sessions) == before
@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from rule_anonymizer import RuleAnonymizer
+
+
+@pytest.fixture(scope="module")
+def anonymizer():
+    return RuleAnonymizer()
+
+
+def split_randomly(text: str, rng: random.Random, max_chunk: int = 400):
+    chunks, offset = [], 0
+    while offset < len(text):
+        size = rng.randint(1, max_chunk)
+        chunks.append(text[offset:offset + size])
+        offset += size
+    return chunks
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_stream_matches_whole_document(anonymizer, random_text, seed):
+    text = random_text(seed)
+    chunks = split_randomly(text, random.Random(seed))
+    
+    expected, expected_entities = anonymizer.anonymize_text(text, "●")
+    results = list(anonymizer.anonymize_stream(chunks, "●", overlap=256))
+    
+    assert "".join(masked for masked, _ in results) == expected
+    assert [entity for _, found in results for entity in found.to_offsets()] == [
+        [entity["start"], entity["end"], entity["type"]] for entity in expected_entities
+    ]
+
+
+def test_context_does_not_start_a_match(anonymizer):
+    # 第二轮扫描的缓冲区从一个 token 中间开始时，不能把截断的 token 当作邮箱开头
+    text = "中" * 300 + "x" * 30 + "foo.bar@example.com)" + "。" * 300
+    chunks = [text[:336], text[336:]]
+    
+    streamed = "".join(masked for masked, _ in anonymizer.anonymize_stream(chunks, overlap=4))
+    
+    assert streamed == anonymizer.anonymize_text(text)[0]
+
+
+def test_find_entities_pos_sees_preceding_character(anonymizer):
+    text = "a13800138000"
+    
+    # 从第 1 位开始扫描时 \b 仍看到前面的字母，不识别为手机号
+    assert len(anonymizer.find_entities(text, 1)) == 0
+    assert len(anonymizer.find_entities(text[1:])) == 1
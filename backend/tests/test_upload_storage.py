@@ -0,0 +1,79 @@
+import asyncio
+import io
+import json
+import os
+
+import pytest
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.testclient import TestClient
+
+from upload_storage import MULTIPART_OVERHEAD, UploadLimitMiddleware, save_upload
+
+
+def test_declared_length_over_limit_is_rejected_before_reading_body():
+    received = []
+
+    async def app(scope, receive, send):
+        received.append(await receive())
+
+    middleware = UploadLimitMiddleware(app, max_bytes=1024, path_limits={"/archive": 1024 * 1024})
+
+    def call(path, length):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        scope = {"type": "http", "method": "POST", "path": path,
+                 "headers": [(b"content-length", str(length).encode())]}
+        asyncio.run(middleware(scope, receive, send))
+        return sent
+
+    start, body = call("/upload", 1024 + MULTIPART_OVERHEAD + 1)
+    assert start["status"] == 413
+    assert json.loads(body["body"])["detail"].startswith("文件过大")
+    assert received == []
+
+    # 在上限内的请求和按路径放宽的上传交给应用处理
+    assert call("/upload", 1024 + MULTIPART_OVERHEAD) == []
+    assert call("/archive", 1024 + MULTIPART_OVERHEAD + 1) == []
+    assert len(received) == 2
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = FastAPI()
+    app.add_middleware(UploadLimitMiddleware, max_bytes=1024 * 1024)
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        size, _ = await save_upload(file, str(tmp_path / "upload.bin"), max_bytes=1024)
+        return {"size": size}
+    return TestClient(app)
+
+
+def test_app_rejects_oversized_upload(client, tmp_path):
+    response = client.post("/upload", files={"file": ("a.bin", b"x" * (2 * 1024 * 1024))})
+
+    assert response.status_code == 413
+    assert response.json()["detail"] == "文件过大，最大支持 1 MB"
+
+
+def test_save_upload_checks_known_size_and_streamed_bytes(client, tmp_path):
+    assert client.post("/upload", files={"file": ("a.bin", b"x" * 1024)}).json() == {"size": 1024}
+
+    os.remove(tmp_path / "upload.bin")
+
+    # 表单解析时已知大小，超出后不写入文件
+    response = client.post("/upload", files={"file": ("a.bin", b"x" * 1025)})
+    assert response.status_code == 413
+    assert not os.path.exists(tmp_path / "upload.bin")
+
+    # 大小未知时逐块检查，超出后删除已写入部分
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(save_upload(UploadFile(io.BytesIO(b"x" * 1025)), str(tmp_path / "stream.bin"), max_bytes=1024))
+    assert excinfo.value.status_code == 413
+    assert not os.path.exists(tmp_path / "stream.bin")
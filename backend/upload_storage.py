@@ -0,0 +1,110 @@
+"""
+上传文件存储
+将上传内容分块写入磁盘并在写入过程中计算摘要，
+单个上传占用的内存与文件大小无关
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, Optional, Tuple
+
+import aiofiles
+from fastapi import HTTPException, UploadFile
+
+
+# 单个上传文件的最大字节数
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 256 * 1024 * 1024))
+
+# 每次从请求中读取的字节数
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# multipart 请求体中文件内容以外的部分（分隔符、字段头和表单字段）允许的字节数
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def _too_large_detail(max_bytes: int) -> str:
+    return f"文件过大，最大支持 {max_bytes // (1024 * 1024)} MB"
+
+
+class UploadLimitMiddleware:
+    """
+    按 Content-Length 预先拒绝超大上传的 ASGI 中间件
+    
+    上传表单在端点执行前就被完整接收并写入临时文件，save_upload 的逐块检查
+    只能在接收之后生效；请求声明的长度已超过上限时直接返回 413，不读取请求体。
+    未声明长度（分块传输）的请求照常交给端点，由 save_upload 检查。
+    """
+    
+    def __init__(self, app, max_bytes: int = MAX_UPLOAD_BYTES,
+                 path_limits: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            app: ASGI 应用
+            max_bytes: 单个上传文件的默认最大字节数
+            path_limits: 按路径单独设置的最大字节数（如压缩包上传）
+        """
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_limits = path_limits or {}
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            max_bytes = self.path_limits.get(scope["path"], self.max_bytes)
+            length = dict(scope["headers"]).get(b"content-length")
+            if length is not None and length.isdigit() and int(length) > max_bytes + MULTIPART_OVERHEAD:
+                body = json.dumps({"detail": _too_large_detail(max_bytes)}, ensure_ascii=False).encode("utf-8")
+                await send({
+                    "type": "http.response.start",
+                    "status": 413,
+                    "headers": [
+                        (b"content-type", b"application/json"),
+                        (b"content-length", str(len(body)).encode()),
+                        (b"connection", b"close"),
+                    ],
+                })
+                await send({"type": "http.response.body", "body": body})
+                return
+        await self.app(scope, receive, send)
+
+
+async def save_upload(file: UploadFile, file_path: str,
+                      max_bytes: int = MAX_UPLOAD_BYTES) -> Tuple[int, str]:
+    """
+    分块保存上传文件
+    
+    Args:
+        file: 上传的文件
+        file_path: 保存路径
+        max_bytes: 允许的最大字节数，超出时删除已写入部分并返回 413
+    
+    Returns:
+        Tuple[int, str]: (文件字节数, SHA-256 十六进制摘要)
+    """
+    # 表单解析时已知文件大小的，不再读取和写入
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(status_code=413, detail=_too_large_detail(max_bytes))
+    
+    digest = hashlib.sha256()
+    size = 0
+    
+    try:
+        async with aiofiles.open(file_path, 'wb') as f:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=_too_large_detail(max_bytes))
+                digest.update(chunk)
+                await f.write(chunk)
+    except BaseException:
+        if os.path.exists(file_path):
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass  # 忽略删除失败
+        raise
+    
+    return size, digest.hexdigest()
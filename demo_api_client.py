@@ -14,7 +14,8 @@ class LangChainAgentClient:
     
     def __init__(self, base_url: str = "http://localhost:8001"):
         self.base_url = base_url
-        self.session_id = f"demo-{int(time.time())}"
+        # 会话由服务端在首次对话时创建
+        self.session_id = None
     
     def health_check(self) -> Dict[str, Any]:
         """健康检查"""
@@ -34,7 +35,13 @@ class LangChainAgentClient:
                     "session_id": self.session_id
                 }
             )
-            return response.json()
+            result = response.json()
+            if response.status_code == 404:
+                # 会话已过期，下次对话重新创建
+                self.session_id = None
+            elif result.get("session_id"):
+                self.session_id = result["session_id"]
+            return result
         except Exception as e:
             return {"error": str(e)}
     
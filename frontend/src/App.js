@@ -156,6 +156,10 @@ function App() {
     const decoder = new TextDecoder();
     let buffer = '';
     let finalResult = null;
+    // 脱敏文本和实体随 chunk 事件分块到达，结束事件只含统计摘要
+    const originalParts = [];
+    const maskedParts = [];
+    const entities = [];
 
     try {
       while (true) {
@@ -183,6 +187,10 @@ function App() {
                     ? { ...msg, content: progressContent }
                     : msg
                 ));
+              } else if (data.type === 'chunk') {
+                originalParts.push(data.original_text || '');
+                maskedParts.push(data.masked_text);
+                entities.push(...(data.entities || []));
               } else if (data.type === 'complete') {
                 finalResult = data.result;
               } else if (data.type === 'error') {
@@ -212,7 +220,7 @@ function App() {
       
       if (data.success) {
         // 构建最终完成消息
-        const entityCount = data.entities_found ? data.entities_found.length : 0;
+        const entityCount = data.processing_summary?.entities_count ?? entities.length;
         const entityStats = data.entity_statistics || {};
         const statsText = Object.entries(entityStats).map(([type, count]) => {
           const typeNames = {
@@ -230,16 +238,17 @@ function App() {
         // 构建文件数据
         const fileData = {
           filename: data.file_info?.original_name || file.name,
-          originalContent: data.original_text || '无法获取原始内容',
-          anonymizedContent: data.masked_text || '无法获取脱敏内容',
-          sensitiveEntities: data.entities_found || [],
+          originalContent: originalParts.join('').trim() || '无法获取原始内容',
+          anonymizedContent: maskedParts.join('').trim() || '无法获取脱敏内容',
+          sensitiveEntities: entities,
           entityStatistics: data.entity_statistics || {},
           processingInfo: data.processing_summary || { message: '处理完成' },
           anonymizeConfig: data.config_used || anonymizeSettings,
           metadata: { 
             extraction_method: 'langchain',
             steps: data.steps || [],
-            export_info: data.export_info
+            export_info: data.export_info,
+            download_url: data.download_url
           },
           size: data.file_info?.size || file.size,
           contentType: data.file_info?.content_type || file.type
@@ -401,6 +410,11 @@ function App() {
     } catch (error) {
       let errorMessage = '发送消息失败，请稍后重试。';
       
+      // 会话已过期，下一条消息重新创建会话
+      if (error.response?.status === 404) {
+        setSessionId(null);
+      }
+      
       if (error.response?.data?.detail) {
         errorMessage = error.response.data.detail;
       } else if (error.message) {